@@ -0,0 +1,44 @@
+"""
+Agent registry
+Agent modules are imported when an agent of their type is first created,
+so runs without DQN agents never load TensorFlow.
+
+Every agent takes (name, params) and draws all its randomness from its
+own generators: before each game the driver (modules.runner.GameRunner)
+calls agent.seed(seed) with the seed of the agent's seat stream
+(modules.seeding.GameSeeder.seat_seed), so a game is replayable from the
+env's root seed alone whatever the other agents do.
+
+Agents that read the engine state of their game (Solver, ISMCTS) set
+needs_env: the drivers assign the env they play in to agent.env when
+the params did not
+"""
+import importlib
+
+# agent type -> (module, class)
+AGENT_TYPES = {
+    'Random': ('.random', 'RandomAI'),
+    'Human': ('.human', 'Human'),
+    'DQNv1': ('.dqn_v1', 'DQNAgent'),
+    'DQNv2': ('.dqn_v2', 'ImprovedDQNAgent'),
+    'DQNv3': ('.dqn_v3', 'DQNv3Agent'),
+    'Solver': ('.solver', 'SolverAgent'),
+    'ISMCTS': ('.ismcts', 'ISMCTSAgent'),
+    'Heuristic': ('.heuristic', 'HeuristicAgent'),
+}
+
+
+def register_agent(agent_type, module, class_name):
+    """Make a new agent type available to create_agent (module is an absolute import path)"""
+    AGENT_TYPES[agent_type] = (module, class_name)
+
+
+def agent_class(agent_type):
+    if agent_type not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type: {agent_type}")
+    module, class_name = AGENT_TYPES[agent_type]
+    return getattr(importlib.import_module(module, __name__), class_name)
+
+
+def create_agent(agent_type, name, params=None):
+    return agent_class(agent_type)(name, params)
@@ -0,0 +1,225 @@
+"""
+Actor processes for actor/learner training
+Every actor plays BriscolaEnv games with its own NumPy copy of the DQNv3
+networks of the learner seats (modules.kernel forward pass, TensorFlow is
+never imported in the actors) and streams the transitions of those seats
+to the learner, which owns the replay memory, trains and pushes fresh
+weights back
+"""
+import multiprocessing as mp
+import queue
+import random
+import time
+
+import numpy as np
+
+from modules.briscola import BriscolaEnv
+from modules.events import PLAY_TURN, SHOW_TURN_END
+from modules.kernel import q_values
+from modules.runner import GameRunner
+
+
+def apex_epsilons(num_actors, base=0.4, alpha=7.0):
+    """Fixed exploration of every actor, from base down to base^(1 + alpha) (Ape-X ladder)"""
+    if num_actors == 1:
+        return [base]
+    return [base ** (1 + alpha * i / (num_actors - 1)) for i in range(num_actors)]
+
+
+class NetPolicyAgent:
+    """
+    Actor-side copy of a DQNv3 learner: epsilon-greedy on the Q-values of
+    weights packed by modules.kernel.pack_net (net), from v3_arrays
+    observations
+    """
+
+    def __init__(self, name, epsilon=0.0):
+        self.name = name
+        self.type = 'actor'
+        self.net = None
+        self.epsilon = epsilon
+
+        self.rng = random.Random()
+
+        self.events = {PLAY_TURN}
+        self.state_key = 'state_v3'
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def act(self, observation):
+        if observation['event_name'] != 'PlayTurn':
+            return None
+
+        hand_size = observation['data']['hand_size']
+        if self.rng.random() <= self.epsilon:
+            choose_card = self.rng.randrange(hand_size)
+        else:
+            state = observation['data']['state_v3']
+            q = q_values(np.concatenate((np.ravel(state['hand']), state['context'])), self.net)
+            choose_card = int(np.argmax(q[:hand_size]))
+
+        return {
+                "event_name" : "PlayTurn_Action",
+                "data" : {
+                    'playerName': self.name,
+                    'action': {'card': choose_card}
+                }
+            }
+
+
+def _actor(actor_id, player_names, seat_types, learner_seats, epsilon, root_seed, card_counting,
+           transitions, weights, stop):
+    from . import create_agent
+
+    env = BriscolaEnv(player_names, observation_mode='v3_arrays', root_seed=root_seed,
+                      worker_id=actor_id + 1, card_counting=card_counting)
+    players = []
+    for seat, (name, agent_type) in enumerate(zip(player_names, seat_types)):
+        if seat in learner_seats:
+            players.append(NetPolicyAgent(name))
+        else:
+            agent = create_agent(agent_type, name, {'print_info': False})
+            if getattr(agent, 'needs_env', False) and agent.env is None:
+                agent.env = env
+            players.append(agent)
+    runner = GameRunner(env, players)
+
+    # transitions of the learner seats, recorded like train.py does
+    pending = {}
+    trajectories = {seat: [] for seat in learner_seats}
+
+    def remember_decision(seat, observation, card):
+        if seat in learner_seats:
+            state = observation['data']['state_v3']
+            pending[seat] = (state['hand'].copy(), state['context'].copy(), card)
+
+    def remember_turn(observation, reward):
+        state = observation['data']['state_v3']
+        for seat, (hand, context, card) in pending.items():
+            trajectories[seat].append((hand, context, card, reward[seat], state['hand'].copy(), state['context'].copy()))
+        pending.clear()
+
+    runner.on_decision(remember_decision)
+    runner.subscribe(SHOW_TURN_END, remember_turn)
+
+    has_weights = False
+    while not stop.is_set():
+        # the latest weights, the first ones are waited for, None stops
+        messages = [] if has_weights else [weights.get()]
+        while True:
+            try:
+                messages.append(weights.get_nowait())
+            except queue.Empty:
+                break
+        if any(message is None for message in messages):
+            return
+        if messages:
+            nets, learner_epsilons = messages[-1]
+            for seat in learner_seats:
+                players[seat].net = nets[seat]
+                players[seat].epsilon = learner_epsilons[seat] if epsilon is None else epsilon
+            has_weights = True
+
+        trajectories = {seat: [] for seat in learner_seats}
+        result = runner.play_game()
+
+        batch = {}
+        for seat, steps in trajectories.items():
+            hands, contexts, cards, rewards, next_hands, next_contexts = zip(*steps)
+            batch[seat] = (np.array(hands), np.array(contexts), np.array(cards, dtype=np.int64),
+                           np.array(rewards, dtype=np.float32), np.array(next_hands), np.array(next_contexts))
+
+        # wait for room in the queue, unless the pool is closing
+        while not stop.is_set():
+            try:
+                transitions.put((actor_id, result.winner, batch), timeout=0.1)
+                break
+            except queue.Full:
+                continue
+
+
+class ActorPool:
+    """
+    num_actors processes playing games for the learner seats:
+    - seat_types: agent type of every seat, learner seats must be 'DQNv3'
+      (their networks run in NumPy), the other seats are created in every
+      actor with agents.create_agent
+    - epsilons: exploration of every actor, a float or None to follow the
+      learners' epsilons sent by push() (see apex_epsilons)
+
+    push(nets, epsilons) sends {seat: pack_net(weights)} and {seat:
+    epsilon} to every actor, actors pick the latest before each game.
+    recv() returns (actor_id, winner, {seat: (hand, context, action,
+    reward, next_hand, next_context)}) arrays of one game. Actor i deals
+    the games of BriscolaEnv(root_seed, worker_id=i + 1)
+    """
+
+    def __init__(self, num_actors, player_names, seat_types, learner_seats, epsilons=None,
+                 root_seed=None, card_counting=False, context=None):
+        for seat in learner_seats:
+            if seat_types[seat] != 'DQNv3':
+                raise ValueError(f"Actors only run DQNv3 learners, seat {seat} is {seat_types[seat]}")
+        if not learner_seats:
+            raise ValueError("At least one seat must be a learner")
+        if epsilons is None or isinstance(epsilons, float):
+            epsilons = [epsilons] * num_actors
+        if len(epsilons) != num_actors:
+            raise ValueError("One epsilon per actor expected")
+
+        self.num_actors = num_actors
+        self.epsilons = list(epsilons)
+
+        # bounded: actors wait when the learner falls behind
+        ctx = mp.get_context(context)
+        self._transitions = ctx.Queue(maxsize=4 * num_actors)
+        self._stop = ctx.Event()
+        self._weights = []
+        self._actors = []
+        for actor_id in range(num_actors):
+            weights = ctx.Queue()
+            actor = ctx.Process(target=_actor, daemon=True,
+                                args=(actor_id, list(player_names), list(seat_types), list(learner_seats),
+                                      epsilons[actor_id], root_seed, card_counting,
+                                      self._transitions, weights, self._stop))
+            actor.start()
+            self._weights.append(weights)
+            self._actors.append(actor)
+
+        self.games = 0
+        self.transitions = 0
+        self.start_time = time.perf_counter()
+
+    def push(self, nets, epsilons):
+        for weights in self._weights:
+            weights.put((nets, epsilons))
+
+    def recv(self):
+        actor_id, winner, batch = self._transitions.get()
+        self.games += 1
+        self.transitions += sum(len(arrays[2]) for arrays in batch.values())
+        return actor_id, winner, batch
+
+    def throughput(self):
+        """(games, transitions) received per second since the start"""
+        elapsed = time.perf_counter() - self.start_time
+        return self.games / elapsed, self.transitions / elapsed
+
+    def close(self):
+        self._stop.set()
+        for weights in self._weights:
+            weights.put(None)
+        # keep draining so that no actor stays blocked on a full queue
+        while any(actor.is_alive() for actor in self._actors):
+            try:
+                self._transitions.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for actor in self._actors:
+            actor.join()
+        # weights nobody will read must not block the exit of this process
+        for weights in self._weights:
+            weights.cancel_join_thread()
+        self._transitions.cancel_join_thread()
+        self._actors = []
+        self._weights = []
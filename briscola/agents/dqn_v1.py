@@ -1,36 +1,51 @@
-import tensorflow as tf
-import os
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress TensorFlow warnings
-tf.get_logger().setLevel('ERROR')
-
 from datetime import datetime
 import numpy as np
-import collections
 import random
 
+from modules.events import player_events
+from .networks import LazyNetworks, load_tensorflow, make_train_step
+from .replay import MAX_STATE_ROWS, ReplayBuffer
+
 
-class DQNAgent:
+class DQNAgent(LazyNetworks):
     def __init__(self,  name, params = None):
-        random.seed()  # Use system time automatically
         self.name = name
         self.type = 'learning'
         
         if params != None:
             self.print_info = params['print_info']
+            seed = params.get('seed')
+            replay_dir = params.get('replay_dir')
         else:
             self.print_info = False
+            seed = None
+            replay_dir = None
+
+        self.rng = random.Random(seed)
+        self.sample_rng = np.random.default_rng(seed)
+
+        self.events = player_events(self.print_info)
+        self.state_key = 'state'  # observation encoding read by the network
 
         self.state_size = (None, 3)
         self.action_size = 3
-        self.memory = collections.deque(maxlen=2000)
+        # the network only learns from the state and the reward of the trick
+        # in memory-mapped files under replay_dir when given (flush_replay(), resumable)
+        self.memory = ReplayBuffer(2000, {
+            'state': ((MAX_STATE_ROWS, 3), np.float32),
+            'state_length': ((), np.int8),
+            'action': ((), np.int64),
+            'reward': ((), np.float32),
+        }, replay_dir)
         self.gamma = 0.95
         self.epsilon = 1.0
         self.epsilon_decay = 0.995
         self.epsilon_min = 0.01
         self.learning_rate = 0.001
-        self.model = self._build_model()
+        # self.model is built on first use (LazyNetworks)
  
     def _build_model(self):
+        tf = load_tensorflow()
         model = tf.keras.Sequential()
         model.add(tf.keras.layers.Dense(16, activation='relu', input_shape=self.state_size))
         model.add(tf.keras.layers.LSTM(16))
@@ -39,23 +54,27 @@ class DQNAgent:
         model.compile(loss="mse", optimizer=tf.keras.optimizers.Adam(learning_rate=self.learning_rate))
         return model
  
+    def _build_train_step(self):
+        return make_train_step(self.model, self.action_size)
+ 
+    def seed(self, seed):
+        self.rng.seed(seed)
+        self.sample_rng = np.random.default_rng(seed)
+
     def remember(self, state, action, reward, next_state, done): 
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.append(state=state, state_length=len(state), action=action, reward=reward)
 
     def train(self, batch_size):
-        minibatch = random.sample(self.memory, batch_size)
+        indices = self.memory.sample(batch_size, self.sample_rng)
 
-        for state, action, reward, next_state, done in minibatch:
+        # one gradient step on the minibatch, states cut to the longest
+        states = self.memory.rows(indices, 'state', 'state_length')
+        actions, rewards = self.memory.batch(indices, 'action', 'reward')
             
-            target_f = self.model.predict(np.array([state]), verbose=0)
-
-            # maybe make this a little better
-            if reward > 0:
-                target_f[0][action] = 1
-            else:
-                target_f[0][action] = 0
+        # maybe make this a little better
+        targets = (rewards > 0).astype(np.float32)
 
-            self.model.fit(np.array([state]), np.array(target_f), epochs=1, verbose=0) 
+        self.train_step(states, actions, targets, self.memory.weights(indices))
 
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
@@ -77,12 +96,12 @@ class DQNAgent:
                 print(observation)
 
             state = observation['data']['state']
-            hand_size = len(observation['data']['hand'])
+            hand_size = observation['data']['hand_size']
 
-            if np.random.rand() <= self.epsilon:
-                choose_card = random.randrange(hand_size)
+            if self.rng.random() <= self.epsilon:
+                choose_card = self.rng.randrange(hand_size)
             else:
-                pred = self.model.predict(np.array([state]), verbose=0)
+                pred = self.act_predict(np.array([state]))
                 # Only consider valid actions (cards in hand)
                 valid_pred = pred[0][:hand_size]
                 choose_card = np.argmax(valid_pred)
@@ -109,5 +128,12 @@ class DQNAgent:
             if self.print_info:
                 print(observation)
 
+    def flush_replay(self):
+        self.memory.flush({'epsilon': self.epsilon})
+
+    def resume_learner(self):
+        # epsilon saved by flush_replay(), only meaningful with the weights of that run
+        self.epsilon = self.memory.state.get('epsilon', self.epsilon)
+
     def save(self, name): 
         self.model.save_weights(name)
\ No newline at end of file
@@ -5,35 +5,61 @@ Improved DQN Agent for Briscola
 - Better feedforward architecture
 - Experience replay
 """
-import tensorflow as tf
 import numpy as np
-import collections
 import random
 from datetime import datetime
 
+from modules.events import player_events
+from .networks import LazyNetworks, load_tensorflow, make_train_step
+from .replay import MAX_STATE_ROWS, PrioritizedReplayBuffer, ReplayBuffer, TargetCache
 
-class ImprovedDQNAgent:
+
+class ImprovedDQNAgent(LazyNetworks):
     """
     Deep Q-Network agent with modern best practices
     """
     
     def __init__(self, name, params=None):
-        random.seed()  # Use system time for randomness
         self.name = name
         self.type = 'learning'
         
         # Parse parameters
         if params is not None:
             self.print_info = params.get('print_info', False)
+            seed = params.get('seed')
+            prioritized_replay = params.get('prioritized_replay', False)
+            replay_dir = params.get('replay_dir')
+            replay_capacity = params.get('replay_capacity', 10000)
         else:
             self.print_info = False
+            seed = None
+            prioritized_replay = False
+            replay_dir = None
+            replay_capacity = 10000
+        
+        self.rng = random.Random(seed)
+        self.sample_rng = np.random.default_rng(seed)
+        
+        self.events = player_events(self.print_info)
+        self.state_key = 'state'  # observation encoding read by the network
         
         # State and action space
         self.state_size = (None, 3)  # Variable number of cards, each with 3 features
         self.action_size = 3  # Can play card 0, 1, or 2
         
         # Hyperparameters
-        self.memory = collections.deque(maxlen=10000)  # Increased from 2000
+        # prioritized_replay samples transitions by TD error instead of uniformly,
+        # replay_dir keeps the memory in memory-mapped files (flush_replay(), resumable)
+        replay_buffer = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.memory = replay_buffer(replay_capacity, {  # Increased from 2000
+            'state': ((MAX_STATE_ROWS, 3), np.float32),
+            'state_length': ((), np.int8),
+            'action': ((), np.int64),
+            'reward': ((), np.float32),
+            'next_state': ((MAX_STATE_ROWS, 3), np.float32),
+            'next_state_length': ((), np.int8),
+            'done': ((), np.float32),
+        }, replay_dir)
         self.gamma = 0.95  # Discount factor for future rewards
         self.epsilon = 1.0  # Exploration rate (start with full exploration)
         self.epsilon_decay = 0.995  # Decay exploration over time
@@ -45,10 +71,11 @@ class ImprovedDQNAgent:
         self.target_update_frequency = 10  # Update target network every N training calls
         self.training_count = 0
         
-        # Build main and target networks
-        self.model = self._build_model()
-        self.target_model = self._build_model()
-        self.update_target_model()  # Initially, both networks are the same
+        # max Q_target(next_state) of sampled transitions, until the next target update
+        self.target_cache = TargetCache(self.memory.capacity)
+        
+        # Main and target networks are built on first use (LazyNetworks),
+        # the target starts as a copy of the main network
     
     def _build_model(self):
         """
@@ -64,6 +91,7 @@ class ImprovedDQNAgent:
         - Multiple dense layers allow learning complex patterns
         - Final layer has 3 outputs (Q-value for each card choice)
         """
+        tf = load_tensorflow()
         model = tf.keras.Sequential([
             # Input layer - accepts variable-length card sequences
             tf.keras.layers.Input(shape=self.state_size),
@@ -100,6 +128,19 @@ class ImprovedDQNAgent:
         for several training steps, preventing the "moving target" problem
         """
         self.target_model.set_weights(self.model.get_weights())
+        self.target_cache.invalidate()
+    
+    def _build_train_step(self):
+        return make_train_step(self.model, self.action_size)
+    
+    def _next_values(self, indices):
+        """max Q_target(next_state) of replay slots missing in the target cache"""
+        return self.target_max(self.memory.rows(indices, 'next_state', 'next_state_length'))
+    
+    def seed(self, seed):
+        """Reseed the exploration and sampling streams"""
+        self.rng.seed(seed)
+        self.sample_rng = np.random.default_rng(seed)
     
     def remember(self, state, action, reward, next_state, done):
         """
@@ -112,7 +153,9 @@ class ImprovedDQNAgent:
             next_state: State after action
             done: Whether episode ended
         """
-        self.memory.append((state, action, reward, next_state, done))
+        index = self.memory.append(state=state, state_length=len(state), action=action, reward=reward,
+                                   next_state=next_state, next_state_length=len(next_state), done=done)
+        self.target_cache.forget(index)
     
     def train(self, batch_size=None):
         """
@@ -133,48 +176,20 @@ class ImprovedDQNAgent:
             return
         
         # Sample random batch from memory
-        minibatch = random.sample(self.memory, batch_size)
+        indices = self.memory.sample(batch_size, self.sample_rng)
         
-        # Prepare batch data - need to pad states to same length
-        states = []
-        targets = []
+        # States cut to the longest of the batch, the update of the action
+        # taken runs in one compiled step
+        states = self.memory.rows(indices, 'state', 'state_length')
+        actions, rewards, dones = self.memory.batch(indices, 'action', 'reward', 'done')
         
-        # Find max state length in batch for padding
-        max_len = max(len(state) for state, _, _, _, _ in minibatch)
+        # Bellman targets, the target network only runs on transitions not
+        # sampled since its last update
+        next_values = self.target_cache.next_values(indices, self._next_values)
+        targets = rewards + self.gamma * next_values * (1.0 - dones)
         
-        for state, action, reward, next_state, done in minibatch:
-            # Pad state to max_len
-            padded_state = self._pad_state(state, max_len)
-            padded_next_state = self._pad_state(next_state, max_len)
-            
-            # Current Q-values from main network
-            current_q_values = self.model.predict(np.array([padded_state]), verbose=0)[0]
-            
-            if done:
-                # If episode ended, there's no future reward
-                target_q_value = reward
-            else:
-                # Use TARGET network to get Q-values for next state
-                # This is the key to stability!
-                next_q_values = self.target_model.predict(np.array([padded_next_state]), verbose=0)[0]
-                
-                # Bellman equation: Q(s,a) = reward + gamma * max(Q(next_state, a'))
-                target_q_value = reward + self.gamma * np.max(next_q_values)
-            
-            # Update only the Q-value for the action that was taken
-            current_q_values[action] = target_q_value
-            
-            states.append(padded_state)
-            targets.append(current_q_values)
-        
-        # Train on the batch
-        self.model.fit(
-            np.array(states),
-            np.array(targets),
-            batch_size=batch_size,
-            epochs=1,
-            verbose=0
-        )
+        errors = self.train_step(states, actions, targets, self.memory.weights(indices))
+        self.memory.update_priorities(indices, errors)
         
         # Decay exploration rate
         if self.epsilon > self.epsilon_min:
@@ -187,24 +202,6 @@ class ImprovedDQNAgent:
             if self.print_info:
                 print(f"Target network updated (training count: {self.training_count})")
     
-    def _pad_state(self, state, target_len):
-        """
-        Pad state to target length with zeros
-        
-        Args:
-            state: List of cards (each card is [suit, value, position])
-            target_len: Desired length
-        
-        Returns:
-            Padded state as numpy array
-        """
-        state = np.array(state)
-        if len(state) < target_len:
-            # Pad with zeros
-            padding = np.zeros((target_len - len(state), 3))
-            state = np.vstack([state, padding])
-        return state
-    
     def act(self, observation):
         """
         Choose an action based on the current observation
@@ -229,17 +226,17 @@ class ImprovedDQNAgent:
                 print(f"\n{self.name}'s turn")
             
             state = observation['data']['state']
-            hand_size = len(observation['data']['hand'])
+            hand_size = observation['data']['hand_size']
             
             # Epsilon-greedy action selection
-            if np.random.rand() <= self.epsilon:
+            if self.rng.random() <= self.epsilon:
                 # Explore: choose random valid action
-                choose_card = random.randrange(hand_size)
+                choose_card = self.rng.randrange(hand_size)
                 if self.print_info:
                     print(f"  Exploring (ε={self.epsilon:.3f}): chose card {choose_card}")
             else:
                 # Exploit: use Q-values to choose best action
-                q_values = self.model.predict(np.array([state]), verbose=0)[0]
+                q_values = self.act_predict(np.array([state]))[0]
                 
                 # Only consider valid actions (cards in hand)
                 valid_q_values = q_values[:hand_size]
@@ -269,6 +266,18 @@ class ImprovedDQNAgent:
             if self.print_info:
                 print(observation)
     
+    def flush_replay(self):
+        """Write the replay memory and the learner state back to replay_dir"""
+        self.memory.flush({'epsilon': self.epsilon, 'training_count': self.training_count})
+    
+    def resume_learner(self):
+        """
+        Epsilon and training count saved by flush_replay(), for a run that
+        also resumes the weights of that run
+        """
+        self.epsilon = self.memory.state.get('epsilon', self.epsilon)
+        self.training_count = self.memory.state.get('training_count', self.training_count)
+    
     def save(self, filepath):
         """Save model weights"""
         self.model.save_weights(filepath)
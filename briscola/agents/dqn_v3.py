@@ -2,13 +2,16 @@
 DQN v3 Agent for Briscola - Multi-Input Architecture
 Separates hand cards from global game context for better learning
 """
-import tensorflow as tf
 import numpy as np
-import collections
 import random
 
+from modules.events import PLAY_TURN
+from modules.counting import COUNTING_SIZE
+from .networks import LazyNetworks, load_tensorflow, make_train_step
+from .replay import PrioritizedReplayBuffer, ReplayBuffer, TargetCache
 
-class DQNv3Agent:
+
+class DQNv3Agent(LazyNetworks):
     """
     Deep Q-Network with multi-input architecture:
     - Input 1: Cards in hand (LSTM) - variable length
@@ -16,24 +19,53 @@ class DQNv3Agent:
     """
     
     def __init__(self, name, params=None):
-        random.seed()
         self.name = name
         self.type = 'learning'
         
         # Parse parameters
         if params is not None:
             self.print_info = params.get('print_info', False)
+            seed = params.get('seed')
+            card_counting = params.get('card_counting', False)
+            prioritized_replay = params.get('prioritized_replay', False)
+            replay_dir = params.get('replay_dir')
+            replay_capacity = params.get('replay_capacity', 10000)
         else:
             self.print_info = False
+            seed = None
+            card_counting = False
+            prioritized_replay = False
+            replay_dir = None
+            replay_capacity = 10000
+        
+        self.rng = random.Random(seed)
+        self.sample_rng = np.random.default_rng(seed)
+        
+        # only acts on its own turn
+        self.events = {PLAY_TURN}
+        self.state_key = 'state_v3'  # observation encoding read by the network
         
         # State and action space
         self.max_hand_size = 3  # Maximum cards in hand
         self.card_features = 3  # [suit, value, points]
         self.context_size = 15  # Fixed context features
+        if card_counting:
+            self.context_size += COUNTING_SIZE  # env built with card_counting=True
         self.action_size = 3  # Can play card 0, 1, or 2
         
         # Hyperparameters
-        self.memory = collections.deque(maxlen=10000)
+        # prioritized_replay samples transitions by TD error instead of uniformly,
+        # replay_dir keeps the memory in memory-mapped files (flush_replay(), resumable)
+        replay_buffer = PrioritizedReplayBuffer if prioritized_replay else ReplayBuffer
+        self.memory = replay_buffer(replay_capacity, {
+            'hand': ((self.max_hand_size, self.card_features), np.float32),
+            'context': ((self.context_size,), np.float32),
+            'action': ((), np.int64),
+            'reward': ((), np.float32),
+            'next_hand': ((self.max_hand_size, self.card_features), np.float32),
+            'next_context': ((self.context_size,), np.float32),
+            'done': ((), np.float32),
+        }, replay_dir)
         self.gamma = 0.95  # Discount factor
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_decay = 0.995
@@ -45,10 +77,10 @@ class DQNv3Agent:
         self.target_update_frequency = 10
         self.training_count = 0
         
-        # Build networks
-        self.model = self._build_model()
-        self.target_model = self._build_model()
-        self.update_target_model()
+        # max Q_target(next_state) of sampled transitions, until the next target update
+        self.target_cache = TargetCache(self.memory.capacity)
+        
+        # Networks are built on first use (LazyNetworks)
     
     def _build_model(self):
         """
@@ -57,6 +89,8 @@ class DQNv3Agent:
         - Input 2: Game context (fixed length, Dense)
         - Output: Q-values for 3 actions
         """
+        tf = load_tensorflow()
+        
         # Input 1: Hand cards (variable length)
         hand_input = tf.keras.Input(shape=(None, self.card_features), name='hand_input')
         
@@ -90,6 +124,7 @@ class DQNv3Agent:
     def update_target_model(self):
         """Copy weights from main model to target model"""
         self.target_model.set_weights(self.model.get_weights())
+        self.target_cache.invalidate()
     
     def _pad_hand(self, hand):
         """Pad hand to max_hand_size with zeros"""
@@ -113,9 +148,23 @@ class DQNv3Agent:
         context = np.array(state['context'])
         return hand, context
     
+    def _build_train_step(self):
+        return make_train_step(self.model, self.action_size)
+    
+    def _next_values(self, indices):
+        """max Q_target(next_state) of replay slots missing in the target cache"""
+        return self.target_max(self.memory.batch(indices, 'next_hand', 'next_context'))
+    
+    def seed(self, seed):
+        """Reseed the exploration and sampling streams"""
+        self.rng.seed(seed)
+        self.sample_rng = np.random.default_rng(seed)
+    
     def remember(self, state, action, reward, next_state, done):
-        """Store experience in replay memory"""
-        self.memory.append((state, action, reward, next_state, done))
+        """Store experience in replay memory, encoded into its fixed-shape slots"""
+        index = self.memory.append(hand=state['hand'], context=state['context'], action=action, reward=reward,
+                                   next_hand=next_state['hand'], next_context=next_state['context'], done=done)
+        self.target_cache.forget(index)
     
     def act(self, observation):
         """
@@ -123,48 +172,46 @@ class DQNv3Agent:
         """
         event_name = observation['event_name']
         
+        # PlayTurn only reaches the agent of the seat to play
         if event_name == 'PlayTurn':
-            player_name = observation['data']['playerName']
+            # Get multi-input state (use state_v3 key)
+            state = observation['data']['state_v3']
+            hand_size = observation['data']['hand_size']
             
-            if player_name == self.name:
-                # Get multi-input state (use state_v3 key)
-                state = observation['data']['state_v3']
-                hand_size = len(state['hand'])
+            # Epsilon-greedy action selection
+            if self.rng.random() <= self.epsilon:
+                # Explore: random valid action
+                action_index = self.rng.randrange(hand_size)
+                if self.print_info:
+                    print(f"{self.name}'s turn")
+                    print(f"  Exploring (ε={self.epsilon:.3f}): chose card {action_index}")
+            else:
+                # Exploit: choose best action
+                hand, context = self._prepare_state(state)
                 
-                # Epsilon-greedy action selection
-                if np.random.rand() <= self.epsilon:
-                    # Explore: random valid action
-                    action_index = random.randrange(hand_size)
-                    if self.print_info:
-                        print(f"{self.name}'s turn")
-                        print(f"  Exploring (ε={self.epsilon:.3f}): chose card {action_index}")
-                else:
-                    # Exploit: choose best action
-                    hand, context = self._prepare_state(state)
+                # Predict Q-values
+                q_values = self.act_predict([
+                    np.array([hand]),
+                    np.array([context])
+                ])[0]
                     
-                    # Predict Q-values
-                    q_values = self.model.predict([
-                        np.array([hand]),
-                        np.array([context])
-                    ], verbose=0)[0]
+                # Only consider valid actions (cards in hand)
+                valid_q_values = q_values[:hand_size]
+                action_index = np.argmax(valid_q_values)
                     
-                    # Only consider valid actions (cards in hand)
-                    valid_q_values = q_values[:hand_size]
-                    action_index = np.argmax(valid_q_values)
+                if self.print_info:
+                    print(f"{self.name}'s turn")
+                    print(f"  Exploiting: Q-values={valid_q_values}, chose card {action_index}")
                     
-                    if self.print_info:
-                        print(f"{self.name}'s turn")
-                        print(f"  Exploiting: Q-values={valid_q_values}, chose card {action_index}")
-                
-                # Return action
-                return {
-                    'event_name': 'PlayTurn_Action',
-                    'broadcast': False,
-                    'data': {
-                        'playerName': self.name,
-                        'action': {'card': action_index}
-                    }
+            # Return action
+            return {
+                'event_name': 'PlayTurn_Action',
+                'broadcast': False,
+                'data': {
+                    'playerName': self.name,
+                    'action': {'card': action_index}
                 }
+            }
         
         return None
     
@@ -176,48 +223,19 @@ class DQNv3Agent:
             return
         
         # Sample random minibatch
-        minibatch = random.sample(self.memory, batch_size)
+        indices = self.memory.sample(batch_size, self.sample_rng)
         
-        # Prepare batch data
-        hands_batch = []
-        contexts_batch = []
-        targets_batch = []
+        # The update of the action taken runs in one compiled step
+        hands, contexts, actions, rewards, dones = self.memory.batch(
+            indices, 'hand', 'context', 'action', 'reward', 'done')
         
-        for state, action, reward, next_state, done in minibatch:
-            hand, context = self._prepare_state(state)
-            
-            # Get current Q-values
-            current_q_values = self.model.predict([
-                np.array([hand]),
-                np.array([context])
-            ], verbose=0)[0]
-            
-            # Calculate target Q-value using Bellman equation
-            if done:
-                target_q_value = reward
-            else:
-                next_hand, next_context = self._prepare_state(next_state)
-                next_q_values = self.target_model.predict([
-                    np.array([next_hand]),
-                    np.array([next_context])
-                ], verbose=0)[0]
-                target_q_value = reward + self.gamma * np.max(next_q_values)
-            
-            # Update Q-value for the action taken
-            current_q_values[action] = target_q_value
-            
-            # Add to batch
-            hands_batch.append(hand)
-            contexts_batch.append(context)
-            targets_batch.append(current_q_values)
-        
-        # Train on batch
-        self.model.fit(
-            [np.array(hands_batch), np.array(contexts_batch)],
-            np.array(targets_batch),
-            epochs=1,
-            verbose=0
-        )
+        # Bellman targets, the target network only runs on transitions not
+        # sampled since its last update
+        next_values = self.target_cache.next_values(indices, self._next_values)
+        targets = rewards + self.gamma * next_values * (1.0 - dones)
+        
+        errors = self.train_step((hands, contexts), actions, targets, self.memory.weights(indices))
+        self.memory.update_priorities(indices, errors)
         
         # Decay epsilon after training
         if self.epsilon > self.epsilon_min:
@@ -228,6 +246,22 @@ class DQNv3Agent:
         if self.training_count % self.target_update_frequency == 0:
             self.update_target_model()
     
+    def export_weights(self):
+        """Weights of every layer by name, for inference outside TensorFlow (modules.kernel.pack_net)"""
+        return {layer.name: layer.get_weights() for layer in self.model.layers if layer.weights}
+    
+    def flush_replay(self):
+        """Write the replay memory and the learner state back to replay_dir"""
+        self.memory.flush({'epsilon': self.epsilon, 'training_count': self.training_count})
+    
+    def resume_learner(self):
+        """
+        Epsilon and training count saved by flush_replay(), for a run that
+        also resumes the weights of that run
+        """
+        self.epsilon = self.memory.state.get('epsilon', self.epsilon)
+        self.training_count = self.memory.state.get('training_count', self.training_count)
+    
     def save(self, filepath):
         """Save model weights"""
         self.model.save_weights(filepath)
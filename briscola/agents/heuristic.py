@@ -0,0 +1,70 @@
+"""
+Rule-based agent
+Classic act() interface over the batched rules of modules.heuristics,
+a cheap ladder of opponents: 'discard' < 'greedy' < 'saver'
+"""
+import random
+
+import numpy as np
+
+from modules.events import GAME_START, PLAY_TURN
+from modules.heuristics import HEURISTIC_POLICIES, v3_actions
+
+
+class HeuristicAgent:
+    """
+    Plays params['policy'] (default 'saver') from the state_v3 of its
+    observations. The number of players (for the tricks left in a round)
+    comes from GameStart, or params['num_players'] when the driver does
+    not send it
+    """
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.type = 'heuristic'
+
+        if params is None:
+            params = {}
+        self.print_info = params.get('print_info', False)
+        self.policy = params.get('policy', 'saver')
+        if self.policy not in HEURISTIC_POLICIES:
+            raise ValueError(f"Unknown heuristic policy '{self.policy}', expected one of {HEURISTIC_POLICIES}")
+        self._set_players(params.get('num_players', 4))
+
+        # rules are deterministic, the stream only follows the agent protocol
+        self.rng = random.Random(params.get('seed'))
+
+        self.events = {GAME_START, PLAY_TURN}
+        self.state_key = 'state_v3'
+
+    def _set_players(self, num_players):
+        # with 3 players the 2 of Hearts is removed from the deck
+        self.turns = (40 - (num_players == 3)) // num_players
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def act(self, observation):
+        if observation['event_name'] == 'GameStart':
+            self._set_players(len(observation['data']['players']))
+            return None
+        if observation['event_name'] != 'PlayTurn':
+            return None
+
+        state = observation['data']['state_v3']
+        hand = np.zeros((1, 3, 3), dtype=np.float32)
+        rows = np.asarray(state['hand'], dtype=np.float32).reshape(-1, 3)
+        hand[0, :len(rows)] = rows
+        context = np.asarray(state['context'], dtype=np.float32).reshape(1, -1)
+
+        choose_card = int(v3_actions(self.policy, hand, context, self.turns)[0])
+        if self.print_info:
+            print(self.name, ' choose card: ', choose_card)
+
+        return {
+                "event_name" : "PlayTurn_Action",
+                "data" : {
+                    'playerName': self.name,
+                    'action': {'card': choose_card}
+                }
+            }
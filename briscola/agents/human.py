@@ -1,7 +1,14 @@
+from modules.events import ALL_EVENTS
+
+
 class Human:
     def __init__(self, name, params):
         self.name = name
         self.type = 'human'
+        self.events = ALL_EVENTS  # prints everything
+    
+    def seed(self, seed):
+        pass  # no randomness
     
     def act(self, observation):
         if observation['event_name'] == 'GameStart':
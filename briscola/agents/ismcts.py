@@ -0,0 +1,241 @@
+"""
+Information-set Monte Carlo tree search agent
+Non-learned benchmark opponent: every iteration deals the cards the agent
+has not seen at random (a determinization), walks one shared tree of
+card choices and finishes the round with random play
+"""
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from modules.events import PLAY_TURN
+
+
+def unseen_mask(state, seat):
+    """
+    Bitmask of the cards seat has not seen: the other hands and the deck,
+    without the briscola (face up under the deck, then drawn in view of
+    everyone, see briscola_holder). The same cards as all cards minus the
+    ones played, held or shown, so no hidden information
+    """
+    mask = 0
+    for other, hand in enumerate(state.hands):
+        if other != seat:
+            for card in hand:
+                mask |= 1 << card
+    for card in state.deck[state.deck_pos:]:
+        mask |= 1 << card
+    return mask & ~(1 << state.briscola)
+
+
+def briscola_holder(state, seat):
+    """
+    Other seat that drew the briscola and still holds it, None while it is
+    under the deck, once played or when seat holds it. The last card of the
+    deck is drawn face up, so every seat knows where it went
+    """
+    if state.deck_remaining() > 0:
+        return None
+    for other, hand in enumerate(state.hands):
+        if other != seat and state.briscola in hand:
+            return other
+    return None
+
+
+def _mask_cards(mask):
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(low.bit_length() - 1)
+        mask ^= low
+    return cards
+
+
+def determinize(state, seat, unseen, rng):
+    """
+    Clone of state with the unseen cards dealt at random to the other hands
+    and the deck, a drawn briscola stays in the hand of its holder
+    """
+    cards = unseen[:]
+    rng.shuffle(cards)
+    holder = briscola_holder(state, seat)
+
+    det = state.clone()
+    dealt = 0
+    for other, hand in enumerate(state.hands):
+        if other == holder:
+            det.hands[other] = cards[dealt:dealt + len(hand) - 1] + [state.briscola]
+            dealt += len(hand) - 1
+        elif other != seat:
+            det.hands[other] = cards[dealt:dealt + len(hand)]
+            dealt += len(hand)
+
+    # the briscola stays the last card of the deck
+    if state.deck_remaining() > 0:
+        det.deck = state.deck[:state.deck_pos] + cards[dealt:] + [state.briscola]
+    return det
+
+
+class _Node:
+    __slots__ = ('card', 'seat', 'parent', 'children', 'visits', 'availability', 'reward')
+
+    def __init__(self, card, seat, parent):
+        self.card = card
+        self.seat = seat  # seat that played card to reach the node
+        self.parent = parent
+        self.children = {}
+        self.visits = 0
+        self.availability = 1
+        self.reward = 0.0
+
+
+def search(state, seat, budget=0.01, iterations=None, exploration=0.7, seed=None):
+    """
+    Single-observer ISMCTS from the point of view of seat, the seat to play
+
+    Runs until budget seconds have passed or iterations are done (the
+    first limit reached, None disables it). Rewards are the share of the
+    points left in the round each seat takes. Returns {card: visits} of
+    the root, module-level so that it runs in thread and process pools
+    """
+    rng = random.Random(seed)
+    unseen = _mask_cards(unseen_mask(state, seat))
+    start_points = state.points
+    root = _Node(None, None, None)
+    deadline = time.perf_counter() + budget if budget is not None else None
+    random_index = rng.random  # cheaper than randrange in the rollouts
+
+    count = 0
+    while (iterations is None or count < iterations) and (deadline is None or time.perf_counter() < deadline):
+        count += 1
+        det = determinize(state, seat, unseen, rng)
+        node = root
+
+        # selection among the cards held in this determinization, then expansion
+        while not det.round_over():
+            hand = det.hands[det.current_seat()]
+            untried = []
+            best, best_score = None, -1.0
+            for card in hand:
+                child = node.children.get(card)
+                if child is None:
+                    untried.append(card)
+                    continue
+                child.availability += 1
+                score = child.reward / child.visits + exploration * math.sqrt(math.log(child.availability) / child.visits)
+                if score > best_score:
+                    best, best_score = child, score
+
+            if untried:
+                card = rng.choice(untried)
+                child = _Node(card, det.current_seat(), node)
+                node.children[card] = child
+                det.make_move(hand.index(card))
+                node = child
+                break
+
+            det.make_move(hand.index(best.card))
+            node = best
+
+        # random rollout to the end of the round
+        while not det.round_over():
+            det.make_move(int(random_index() * len(det.hands[det.current_seat()])))
+
+        total = sum(det.points) - sum(start_points) or 1
+        while node is not root:
+            node.visits += 1
+            node.reward += (det.points[node.seat] - start_points[node.seat]) / total
+            node = node.parent
+
+    return {card: child.visits for card, child in root.children.items()}
+
+
+class ISMCTSAgent:
+    """
+    Plays the card most visited by ISMCTS within a wall-clock budget per
+    decision (params['budget_ms'], default 10) or a fixed number of
+    iterations (params['iterations'], reproducible with the seat stream).
+
+    params['workers'] > 0 runs that many searches in parallel with
+    params['pool'] ('process' or 'thread') and adds their root visits.
+
+    Like SolverAgent it reads the engine state of its game (needs_env):
+    params['env'] or agent.env = env.unwrapped, only the cards it could
+    have seen are used
+    """
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.type = 'search'
+        self.needs_env = True
+
+        if params is None:
+            params = {}
+        self.print_info = params.get('print_info', False)
+        self.env = params.get('env')
+        self.budget = params.get('budget_ms', 10) / 1000
+        self.iterations = params.get('iterations')
+        self.exploration = params.get('exploration', 0.7)
+        self.workers = params.get('workers', 0)
+        self.pool = params.get('pool', 'process')
+        if self.pool not in ('process', 'thread'):
+            raise ValueError(f"Unknown pool: {self.pool}")
+
+        self.rng = random.Random(params.get('seed'))
+        self._executor = None
+
+        self.events = {PLAY_TURN}
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _search(self, state, seat):
+        budget = None if self.iterations is not None else self.budget
+        if self.workers <= 0:
+            return search(state, seat, budget, self.iterations, self.exploration, self.rng.getrandbits(64))
+
+        if self._executor is None:
+            executor = ProcessPoolExecutor if self.pool == 'process' else ThreadPoolExecutor
+            self._executor = executor(max_workers=self.workers)
+        futures = [self._executor.submit(search, state, seat, budget, self.iterations, self.exploration,
+                                         self.rng.getrandbits(64))
+                   for _ in range(self.workers)]
+
+        visits = {}
+        for future in futures:
+            for card, count in future.result().items():
+                visits[card] = visits.get(card, 0) + count
+        return visits
+
+    def act(self, observation):
+        if observation['event_name'] != 'PlayTurn':
+            return None
+        if self.env is None:
+            raise ValueError("ISMCTSAgent needs the env it plays in (params['env'] or agent.env)")
+
+        state = self.env.state
+        seat = observation['data']['seat']
+        hand = state.hands[seat]
+
+        if len(hand) == 1:
+            choose_card = 0
+        else:
+            visits = self._search(state, seat)
+            best = max(hand, key=lambda card: visits.get(card, 0))
+            choose_card = hand.index(best)
+            if self.print_info:
+                print(self.name, ' visits: ', visits, ' choose card: ', choose_card)
+
+        return {
+                "event_name" : "PlayTurn_Action",
+                "data" : {
+                    'playerName': self.name,
+                    'action': {'card': choose_card}
+                }
+            }
@@ -0,0 +1,118 @@
+"""
+Background learner for pipelined training
+A thread stores the transitions of the learning agents and trains them
+while the games go on in the main thread. The games act with
+double-buffered copies of the networks (networks.ActingNetworks) swapped
+every sync_frequency updates, and the number of updates follows the
+transitions played (updates_per_step), not the episode boundaries
+"""
+import queue
+import threading
+import time
+
+
+class LearnerThread(threading.Thread):
+    """
+    Trains agents ({seat: learning agent}) in the background:
+    - store(seat, state, action, reward, next_state, done) queues a
+      transition of the seat, the thread passes it to agent.remember()
+    - updates_per_step: train(batch_size) calls per stored transition,
+      counted once the agent's memory holds more than batch_size (0.25:
+      one minibatch every 4 cards played). Transitions are stored only
+      when no update is due, store() waits when max_queued are pending:
+      the ratio holds even when the learner is the slower side
+    - sync_frequency: updates between two swaps of the acting networks,
+      agents sharing a model (shadow agents) share them
+
+    Holding lock pauses the learner between two updates (saving the
+    models, flushing the replay memory). The daemon thread starts with
+    the object, close() stores what is queued and stops it
+    """
+
+    def __init__(self, agents, batch_size, updates_per_step, sync_frequency, max_queued=256):
+        if updates_per_step <= 0:
+            raise ValueError(f"updates_per_step must be positive, got {updates_per_step}")
+        if sync_frequency < 1:
+            raise ValueError(f"sync_frequency must be at least 1, got {sync_frequency}")
+        super().__init__(name='learner', daemon=True)
+
+        self.agents = dict(agents)
+        self.batch_size = batch_size
+        self.updates_per_step = updates_per_step
+        self.sync_frequency = sync_frequency
+        self.lock = threading.Lock()
+
+        # one pair of acting networks per model, built here in the main thread
+        acting = {}
+        for agent in self.agents.values():
+            if id(agent.model) in acting:
+                agent.acting = acting[id(agent.model)]
+            else:
+                acting[id(agent.model)] = agent.build_acting()
+        self._pending_syncs = {id(networks): 0 for networks in acting.values()}
+
+        self._transitions = queue.Queue(maxsize=max_queued)
+        self._credit = {seat: 0.0 for seat in self.agents}  # updates due
+        self.updates = 0
+        self.busy_time = 0.0  # seconds spent in train()
+        self.error = None
+        self.start()
+
+    def run(self):
+        try:
+            while True:
+                due = [seat for seat, credit in self._credit.items() if credit >= 1]
+                if due:
+                    for seat in due:
+                        self._update(seat)
+                    continue
+
+                item = self._transitions.get()
+                if item is None:
+                    return
+                seat, transition = item
+                agent = self.agents[seat]
+                with self.lock:
+                    agent.remember(*transition)
+                if len(agent.memory) > self.batch_size:
+                    self._credit[seat] += self.updates_per_step
+        except BaseException as error:
+            self.error = error
+            raise
+
+    def _update(self, seat):
+        agent = self.agents[seat]
+        start = time.perf_counter()
+        with self.lock:
+            agent.train(self.batch_size)
+            self._credit[seat] -= 1
+            self.updates += 1
+
+            networks = agent.acting
+            self._pending_syncs[id(networks)] += 1
+            if self._pending_syncs[id(networks)] >= self.sync_frequency:
+                networks.sync(agent.model)
+                self._pending_syncs[id(networks)] = 0
+        self.busy_time += time.perf_counter() - start
+
+    def _put(self, item):
+        while True:
+            if self.error is not None:
+                raise RuntimeError("The learner thread failed") from self.error
+            try:
+                self._transitions.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def store(self, seat, state, action, reward, next_state, done):
+        """Queue a transition of seat, waits while max_queued are pending"""
+        self._put((seat, (state, action, reward, next_state, done)))
+
+    def close(self):
+        """Store the queued transitions (and run the updates they are due), then stop"""
+        if self.is_alive():
+            self._put(None)
+            self.join()
+        if self.error is not None:
+            raise RuntimeError("The learner thread failed") from self.error
@@ -0,0 +1,161 @@
+"""
+Deferred TensorFlow for the DQN agents
+TensorFlow is imported and the networks are built the first time an agent
+needs them, not when the agent module is imported or the agent created.
+The learner update is one compiled gradient step per minibatch, with the
+target network values cached between target updates
+"""
+import os
+import atexit
+import threading
+import weakref
+
+# Agents holding a compiled step, released before the interpreter shuts
+# down (TensorFlow errors when it collects tf.functions during teardown)
+_compiled = weakref.WeakSet()
+
+
+@atexit.register
+def _release_train_steps():
+    for networks in list(_compiled):
+        networks._train_step = None
+        networks._target_max = None
+
+
+def load_tensorflow():
+    """Import TensorFlow on first use, quietly"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')  # Suppress TensorFlow warnings
+    import tensorflow as tf
+    tf.get_logger().setLevel('ERROR')
+    return tf
+
+
+class LazyNetworks:
+    """
+    model and target_model properties built by _build_model() on first
+    access, the target starts as a copy of the model. Assigning them (as
+    shadow agents sharing a main agent's networks do) skips the build.
+    """
+
+    _model = None
+    _target_model = None
+    _train_step = None
+    _target_max = None
+
+    # ActingNetworks act() predicts with while a background learner trains
+    # model (build_acting()), None acts with model itself
+    acting = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self._build_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._train_step = None
+
+    @property
+    def target_model(self):
+        if self._target_model is None:
+            self._target_model = self._build_model()
+            self._target_model.set_weights(self.model.get_weights())
+        return self._target_model
+
+    @target_model.setter
+    def target_model(self, model):
+        self._target_model = model
+        self._target_max = None
+
+    @property
+    def train_step(self):
+        """Compiled update of the agent (_build_train_step), traced on first use"""
+        if self._train_step is None:
+            self._train_step = self._build_train_step()
+            _compiled.add(self)
+        return self._train_step
+
+    @property
+    def target_max(self):
+        """Compiled max_a' Q_target(s', a') of a batch of next states"""
+        if self._target_max is None:
+            self._target_max = make_max_q(self.target_model)
+            _compiled.add(self)
+        return self._target_max
+
+    def build_acting(self):
+        """Double-buffered copies of model for act(), returns them (shadow agents assign them)"""
+        self.acting = ActingNetworks(self.model, self._build_model)
+        return self.acting
+
+    def act_predict(self, inputs):
+        """Q-values of a batch of observations for act()"""
+        if self.acting is None:
+            return self.model.predict(inputs, verbose=0)
+        return self.acting.predict(inputs)
+
+
+class ActingNetworks:
+    """
+    Two copies of a model built by build(): predict() runs the front one
+    while sync() writes the model's current weights into the back one,
+    then swaps them. A background learner trains the model and syncs now
+    and then, the games never see weights in the middle of an update
+    """
+
+    def __init__(self, model, build):
+        self.front = build()
+        self.back = build()
+        self.front.set_weights(model.get_weights())
+        self.syncs = 0
+        self._lock = threading.Lock()  # held by predict() and the swap
+
+    def predict(self, inputs):
+        with self._lock:
+            return self.front.predict(inputs, verbose=0)
+
+    def sync(self, model):
+        self.back.set_weights(model.get_weights())
+        with self._lock:
+            self.front, self.back = self.back, self.front
+        self.syncs += 1
+
+
+def make_train_step(model, action_size):
+    """
+    One tf.function-compiled gradient step on a minibatch, with the
+    optimizer the model was compiled with: step(states, actions, targets,
+    weights) regresses Q(s, a) on the targets and returns the TD errors
+    targets - Q(s, a), for prioritized replay.
+
+    states may be a tuple of arrays for multi-input models. The loss is the
+    one fit() gets from targets equal to the predictions except for the
+    action taken: squared error of Q(s, a), averaged over the actions, each
+    sample scaled by its importance-sampling weight (all 1 when uniform)
+    """
+    tf = load_tensorflow()
+    optimizer = model.optimizer
+    optimizer.build(model.trainable_variables)
+
+    def descend(states, actions, targets, weights):
+        with tf.GradientTape() as tape:
+            q_values = model(states, training=True)
+            errors = targets - tf.gather(q_values, actions, axis=1, batch_dims=1)
+            loss = tf.reduce_mean(weights * tf.square(errors)) / action_size
+        gradients = tape.gradient(loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        return errors
+
+    return tf.function(descend, reduce_retracing=True)
+
+
+def make_max_q(model):
+    """tf.function-compiled max over the actions of model(states)"""
+    tf = load_tensorflow()
+
+    def max_q(states):
+        return tf.reduce_max(model(states, training=False), axis=1)
+
+    return tf.function(max_q, reduce_retracing=True)
@@ -1,16 +1,26 @@
 from datetime import datetime
 import random
 
+from modules.events import player_events
+
 class RandomAI:
     def __init__(self, name, params = None):
-        random.seed()
         self.name = name
         self.type = 'random'
         
         if params != None:
             self.print_info = params['print_info']
+            seed = params.get('seed')
         else:
             self.print_info = False
+            seed = None
+        
+        self.rng = random.Random(seed)
+        
+        self.events = player_events(self.print_info)
+    
+    def seed(self, seed):
+        self.rng.seed(seed)
     
     def act(self, observation):
         if observation['event_name'] == 'GameStart':
@@ -27,8 +37,7 @@ class RandomAI:
             if self.print_info:
                 print(observation)
 
-            hand = observation['data']['hand']
-            choose_card = random.randrange(len(observation['data']['hand']))
+            choose_card = self.rng.randrange(observation['data']['hand_size'])
             if self.print_info:
                 print(self.name, ' choose card: ', choose_card)
 
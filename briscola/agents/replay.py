@@ -0,0 +1,310 @@
+"""
+Replay memory in preallocated NumPy arrays
+A transition is encoded once, when it is stored, into fixed-shape slots
+(variable-length card rows are zero-padded); a minibatch is an index
+draw and one fancy-indexing read per field, no per-sample Python.
+PrioritizedReplayBuffer draws slots in proportion to their TD errors.
+With a directory the arrays are .npy memory maps, a run resumes with the
+replay memory of the previous one
+"""
+import os
+import json
+
+import numpy as np
+
+# Card rows of a 'state' observation (v1, v2): the briscola, up to 4 cards
+# on the table and up to 3 in hand
+MAX_STATE_ROWS = 8
+
+HEADER_FILE = 'header.json'
+
+
+def _open_array(path, shape, dtype, keep):
+    # reuse the file of a previous run when it has the right layout
+    if keep and os.path.exists(path):
+        array = np.load(path, mmap_mode='r+')
+        if array.shape == shape and array.dtype == dtype:
+            return array
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of transitions, one array of shape (capacity, *shape) per
+    field: fields = {name: (shape, dtype)}. Once full, append() overwrites
+    the oldest transition. Shadow agents share the buffer of their main
+    agent.
+
+    The stored transitions are the size slots before the cursor (ring
+    order), sample() draws among them.
+
+    directory: keep the arrays in memory-mapped .npy files there (larger
+    than RAM if needed), with HEADER_FILE holding the cursor, the size and
+    the learner state of the last flush(). Opening a directory with a
+    header resumes that buffer, the transitions stored after its last
+    flush are lost. Slots the header counts are never overwritten before
+    the header gives them up: append() first rewrites it with a smaller
+    size, reserve_fraction of the capacity at a time
+    """
+
+    def __init__(self, capacity, fields, directory=None, reserve_fraction=1 / 16):
+        self.capacity = capacity
+        self.directory = directory
+        self.layout = {name: [list(shape), np.dtype(dtype).str] for name, (shape, dtype) in fields.items()}
+        self.size = 0
+        self.cursor = 0  # slot of the next transition
+        self.state = {}  # learner state saved with the last flush
+        # header on disk: cursor and size of the last flush, slots written
+        # since then and slots after that cursor the header leaves out
+        self._flushed = (0, 0)
+        self._written = 0
+        self._reserved = 0
+        self._reserve = max(1, int(capacity * reserve_fraction))
+
+        if directory is None:
+            self.arrays = {name: np.zeros((capacity,) + tuple(shape), dtype=dtype)
+                           for name, (shape, dtype) in fields.items()}
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        header = self._read_header()
+        if header is not None:
+            if header['capacity'] != capacity or header['fields'] != self.layout:
+                raise ValueError(f"{directory} holds a replay memory with other fields or capacity")
+            self.size = header['size']
+            self.cursor = header['cursor']
+            self.state = header['state']
+            self._flushed = (self.cursor, self.size)
+        self.arrays = {name: _open_array(os.path.join(directory, name + '.npy'), (capacity,) + tuple(shape),
+                                         np.dtype(dtype), header is not None)
+                       for name, (shape, dtype) in fields.items()}
+
+    def _read_header(self):
+        path = os.path.join(self.directory, HEADER_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def flush(self, state=None):
+        """
+        Write the arrays back to their files, then replace the header in
+        one rename: after a crash the header only counts slots that were
+        flushed and not overwritten since. state: learner state to resume
+        with (epsilon, ...). No-op in memory
+        """
+        if self.directory is None:
+            return
+        for array in self.arrays.values():
+            array.flush()
+        if state is not None:
+            self.state = dict(state)
+        self._flushed = (self.cursor, self.size)
+        self._written = 0
+        self._reserved = 0
+        self._write_header(self.cursor, self.size)
+
+    def _write_header(self, cursor, size):
+        header = {'capacity': self.capacity, 'size': size, 'cursor': cursor,
+                  'fields': self.layout, 'state': self.state}
+        path = os.path.join(self.directory, HEADER_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _reserve_slot(self):
+        # the next slot is the oldest one the header counts: give up the
+        # next reserve slots in the header before writing any of them
+        cursor, size = self._flushed
+        if self._written < self._reserved or size + self._written < self.capacity:
+            return
+        self._reserved = min(self._written + self._reserve, self.capacity)
+        self._write_header(cursor, min(size, self.capacity - self._reserved))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Memory taken by the arrays, allocated in full up front"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def append(self, **values):
+        """
+        Store one transition, returns its slot. Arrays with fewer rows than
+        their field (a hand of 1-2 cards) are zero-padded
+        """
+        index = self.cursor
+        if self.directory is not None:
+            self._reserve_slot()
+            self._written += 1
+        for name, value in values.items():
+            array = self.arrays[name]
+            if array.ndim > 1:
+                value = np.asarray(value, dtype=array.dtype)
+                if value.shape != array.shape[1:]:
+                    value = value.reshape((-1,) + array.shape[2:])
+                    if len(value) > array.shape[1]:
+                        raise ValueError(f"{len(value)} rows do not fit the {name} field ({array.shape[1]} rows)")
+                    array[index, len(value):] = 0
+                    array[index, :len(value)] = value
+                    continue
+            array[index] = value
+
+        self.cursor = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return index
+
+    def slots(self):
+        """Slots of the stored transitions, oldest first"""
+        return (self.cursor - self.size + np.arange(self.size)) % self.capacity
+
+    def sample(self, batch_size, rng):
+        """batch_size slots drawn uniformly with replacement by a NumPy Generator"""
+        return (self.cursor - self.size + rng.integers(self.size, size=batch_size)) % self.capacity
+
+    def weights(self, indices):
+        """Importance-sampling weights of sampled slots, all 1 for uniform sampling"""
+        return np.ones(len(indices), dtype=np.float32)
+
+    def update_priorities(self, indices, errors):
+        """TD errors of the slots just trained on, unused by uniform sampling"""
+
+    def batch(self, indices, *names):
+        """The given fields of the transitions at indices"""
+        return tuple(self.arrays[name][indices] for name in names)
+
+    def rows(self, indices, name, lengths):
+        """Card rows of a padded field, cut to the longest of the batch"""
+        return self.arrays[name][indices, :self.arrays[lengths][indices].max()]
+
+
+class SumTree:
+    """
+    Binary tree of sums over capacity leaf priorities, in one array
+    (node i has children 2i and 2i + 1, leaves start at self.leaves).
+    Updates and prefix-sum searches handle a whole batch per tree level,
+    O(log capacity) NumPy operations per call
+    """
+
+    def __init__(self, capacity):
+        self.leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.leaves + indices]
+
+    def update(self, indices, priorities):
+        nodes = self.leaves + np.asarray(indices)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Leaf of every value in [0, total): the first whose prefix sum exceeds it"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= left * right
+            nodes = 2 * nodes + right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay: a slot is drawn with probability
+    p^alpha / sum(p^alpha), p = |TD error| + epsilon, new transitions get
+    the largest priority so far. weights() corrects the bias with
+    importance sampling, (N * P(i))^-beta scaled by the largest of the
+    batch, beta going linearly to 1 over beta_steps minibatches
+    """
+
+    def __init__(self, capacity, fields, directory=None, alpha=0.6, beta=0.4, beta_steps=1000, epsilon=1e-3,
+                 reserve_fraction=1 / 16):
+        super().__init__(capacity, fields, directory, reserve_fraction)
+        self.alpha = alpha
+        self.beta_start = beta
+        self.beta_steps = beta_steps
+        self.epsilon = epsilon
+        self.priorities = SumTree(capacity)
+        self.max_priority = 1.0
+        self.samples = 0  # minibatches drawn, for the beta schedule
+
+        # priorities are not saved, resumed transitions start equal
+        if self.size:
+            self.priorities.update(self.slots(), self.max_priority)
+
+    @property
+    def beta(self):
+        return min(1.0, self.beta_start + (1.0 - self.beta_start) * self.samples / self.beta_steps)
+
+    def append(self, **values):
+        index = super().append(**values)
+        self.priorities.update([index], self.max_priority)
+        return index
+
+    def sample(self, batch_size, rng):
+        """One draw in each of batch_size equal segments of the priority mass"""
+        self.samples += 1
+        segment = self.priorities.total / batch_size
+        values = (np.arange(batch_size) + rng.random(batch_size)) * segment
+        indices = self.priorities.find(values)
+        # rounding can land past the last stored slot, take the newest one
+        return np.where(self.priorities.get(indices) > 0, indices, (self.cursor - 1) % self.capacity)
+
+    def weights(self, indices):
+        probabilities = self.priorities.get(indices) / self.priorities.total
+        weights = (self.size * probabilities) ** -self.beta
+        return (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, indices, errors):
+        priorities = (np.abs(np.asarray(errors, dtype=np.float64)) + self.epsilon) ** self.alpha
+        self.priorities.update(indices, priorities)
+        self.max_priority = max(self.max_priority, priorities.max())
+
+
+class TargetCache:
+    """
+    max_a' Q_target(s', a') of every slot of a ReplayBuffer, computed the
+    first time the slot is sampled and valid until the next target sync:
+    invalidate() moves to a new generation, a value counts only if it was
+    computed in the current one. forget() drops a slot that is
+    overwritten. Shadow agents share it with the buffer
+    """
+
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.generations = np.full(capacity, -1, dtype=np.int64)
+        self.generation = 0  # target syncs so far
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Drop every cached value, the target network changed"""
+        self.generation += 1
+
+    def forget(self, index):
+        self.generations[index] = -1
+
+    def next_values(self, indices, compute):
+        """
+        Cached values of the slots at indices, compute(slots) returns the
+        values of the ones missing in one batch
+        """
+        missing = np.unique(indices[self.generations[indices] != self.generation])
+        if len(missing):
+            self.values[missing] = compute(missing)
+            self.generations[missing] = self.generation
+        self.misses += len(missing)
+        self.hits += len(indices) - len(missing)
+        return self.values[indices]
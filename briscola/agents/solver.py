@@ -0,0 +1,74 @@
+"""
+Endgame solver agent
+Plays the greedy rule while there are cards in the deck and the exact
+point-optimal card (modules.solver, or the 2-player tablebase of
+modules.tablebase) once the deck is exhausted
+"""
+import random
+
+from modules.events import PLAY_TURN
+from modules.pool import scripted_action
+from modules.solver import EndgameSolver
+from modules.tablebase import Tablebase
+
+
+class SolverAgent:
+    """
+    Reads the position from the engine state of the game it plays, so it
+    needs the env (needs_env): params['env'] or agent.env = env.unwrapped
+    before the first game. With 2 players the endgame hands are known from the cards
+    played, with 3-4 players the solver also sees how the unseen cards are
+    split between the opponents
+
+    params['tablebase']: path of a tablebase built by build_tablebase(),
+    looked up instead of searching in 2-player games
+    """
+
+    def __init__(self, name, params=None):
+        self.name = name
+        self.type = 'solver'
+        self.needs_env = True
+
+        if params is not None:
+            self.print_info = params.get('print_info', False)
+            self.env = params.get('env')
+            tablebase = params.get('tablebase')
+            seed = params.get('seed')
+        else:
+            self.print_info = False
+            self.env = None
+            tablebase = None
+            seed = None
+
+        self.rng = random.Random(seed)
+        self.solver = EndgameSolver()
+        self.tablebase = Tablebase(tablebase) if tablebase else None
+
+        self.events = {PLAY_TURN}
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def act(self, observation):
+        if observation['event_name'] != 'PlayTurn':
+            return None
+        if self.env is None:
+            raise ValueError("SolverAgent needs the env it plays in (params['env'] or agent.env)")
+
+        state = self.env.state
+        seat = observation['data']['seat']
+        if state.deck_remaining() == 0:
+            solver = self.tablebase if self.tablebase is not None and state.num_players == 2 else self.solver
+            choose_card, value = solver.solve(state, seat)
+            if self.print_info:
+                print(self.name, ' solved endgame: card ', choose_card, ' takes ', value, ' points')
+        else:
+            choose_card = scripted_action('greedy', state, seat, self.rng)
+
+        return {
+                "event_name" : "PlayTurn_Action",
+                "data" : {
+                    'playerName': self.name,
+                    'action': {'card': choose_card}
+                }
+            }
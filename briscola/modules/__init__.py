@@ -1,8 +1,14 @@
 from .briscola import *
+from .vec_env import BriscolaVecEnv
+from .runner import GameRunner, GameResult
 
 from gymnasium.envs.registration import register
 
 register(
     id = 'Briscola-v2',
     entry_point = 'modules.briscola:BriscolaEnv'
-)
\ No newline at end of file
+)
+register(
+    id = 'BriscolaSingleAgent-v0',
+    entry_point = 'modules.single_agent:BriscolaSingleAgentEnv'
+)
@@ -1,102 +1,163 @@
-from .classes import Player
-from .classes import Card
+from .state import GameState
+from .seeding import GameSeeder, shuffled_deck
+from .counting import CardCounter, COUNTING_SIZE
+from .cards import suits, CARD_SUIT, CARD_VALUE, CARD_POINTS, CARD_NAME, CARD_FEATURES
+from .cards import PESO_TURNO, PESO_PERDITA, BONUS_ROUND, base_deck
 
 from gymnasium import Env
 
-import random
+from collections import namedtuple
+import numpy as np
+
+# Encodings built for the observations:
+# - 'all': every encoding, as lists (default)
+# - 'v3_arrays': only state_v3, written into reused NumPy buffers
+# - 'v1_list': only the v1/v2 state list
+# - 'human': only the readable hand, table and briscola
+OBSERVATION_MODES = ('all', 'v3_arrays', 'v1_list', 'human')
+
+# Compact records of the events folded by play(), seats are integers
+TrickOutcome = namedtuple('TrickOutcome', ['turn', 'leader', 'winner', 'points', 'cards'])
+RoundOutcome = namedtuple('RoundOutcome', ['round', 'winner', 'points'])
+GameOutcome = namedtuple('GameOutcome', ['winner', 'wins'])
+
+# zero padding for 0..3 card slots
+_EMPTY_SLOTS = ((0,) * 9, (0,) * 6, (0,) * 3, ())
 
 # Reinforcement Learning Environment
 class BriscolaEnv(Env):
 
-    def __init__(self, playerNames):
+    def __init__(self, playerNames, observation_mode='all', root_seed=None, worker_id=0, card_counting=False):
         
-        self.players = [Player(player_name) for player_name in playerNames]
-        self.turn_players = self.players
-        self.turn_winner = -1
+        self.playerNames = list(playerNames)
+        self.num_players = len(self.playerNames)
+
+        # Whole game state, seats are indexes in playerNames
+        self.state = GameState(self.num_players)
+        self.rounds_to_win = self.state.rounds_to_win
 
-        self.deck = []
-        self.table = []
-        self.briscola = None
-        self.seme_briscola = None
+        # Cards shown on the table and current turn, a closed trick stays
+        # visible until ShowTurnEnd
+        self.table = self.state.table
+        self.turn = 0
+        self.trick = None  # undo record of the last closed trick
 
-        self.rounds_to_win = 3
+        # Deck and exploration streams of every game come from
+        # (root_seed, worker_id, game_index)
+        self.seeder = GameSeeder(root_seed, worker_id)
+        self.game_index = None
+        self.rng = None
 
-        self.event = None
-        self.round = 0
+        self._base_deck = base_deck(self.num_players)
 
-        self.turns = 0
-        self.turn = 0
+        self.event = None
 
+        if observation_mode not in OBSERVATION_MODES:
+            raise ValueError(f"Unknown observation mode: {observation_mode}")
+        self.observation_mode = observation_mode
+        self._readable = observation_mode in ('all', 'human')
+        self._v1 = observation_mode in ('all', 'v1_list')
+        self._v3 = observation_mode == 'all'
+
+        # card_counting appends the CardCounter features of the seat to play
+        # (public view on ShowTurnEnd) to the state_v3 context
+        self.counter = CardCounter(self.num_players) if card_counting else None
+        self.context_size = 15 + COUNTING_SIZE if card_counting else 15
+
+        # state_v3 buffers (hand then context), overwritten by the next
+        # event of the same kind: copy them to keep a state around
+        self._v3_arrays = observation_mode == 'v3_arrays'
+        self._play_buffer = np.zeros(9 + self.context_size, dtype=np.float32)
+        self._end_buffer = np.zeros(9 + self.context_size, dtype=np.float32)
+        self._play_state_v3 = {'hand': self._play_buffer[:9].reshape(3, 3), 'context': self._play_buffer[9:]}
+        self._end_state_v3 = {'hand': self._end_buffer[:9].reshape(3, 3), 'context': self._end_buffer[9:]}
+
+        # start()/play() API: broadcast listeners and folded events
+        self._listeners = {}
+        self.outcomes = []
+
+        # render text is formatted only when render() is called
         self.renderInfo = {'printFlag': False, 'Msg': ""}
         
         # Reward system parameters
-        self.PESO_TURNO = 0.5  # Weight for turn rewards
-        self.PESO_PERDITA = 0.2  # Penalty weight for losing with valuable cards
-        self.BONUS_ROUND = 100  # Bonus for winning the round
+        self.PESO_TURNO = PESO_TURNO
+        self.PESO_PERDITA = PESO_PERDITA
+        self.BONUS_ROUND = BONUS_ROUND
         
-        # Track cards played in current turn for reward calculation
-        self.turn_played_cards = {}  # {player_name: card}
+
+    @property
+    def round(self):
+        return self.state.round
+
+    @property
+    def briscola(self):
+        return self.state.briscola
 
 
     def _getPlayerList(self):
         data = []
-        for player in self.players:
-            data.append({'playerName': player.name})
+        for seat, name in enumerate(self.playerNames):
+            data.append({'seat': seat, 'playerName': name})
         return data
 
 
     def _getPlayerData(self):
         data = []
-        for player in self.players:
+        for seat, name in enumerate(self.playerNames):
             data.append(
                 {
-                    'playerName': player.name,
-                    'playerPoints': player.points,
-                    'playerWins': player.wins
+                    'seat': seat,
+                    'playerName': name,
+                    'playerPoints': self.state.points[seat],
+                    'playerWins': self.state.wins[seat]
                 })
         return data
 
 
+    def _cardToArray(self, card):
+        return [suits[CARD_SUIT[card]], CARD_VALUE[card]]
+
     def _getCardList(self, position):
         data = []
         for card in position:
-            data.append(card._toArray())
+            data.append([suits[CARD_SUIT[card]], CARD_VALUE[card]])
         return data
 
     def _getStateList(self, player_cards=[]):
         data = []
 
-        data.append(self.briscola._toNumerical() + [0])
+        data.append([CARD_SUIT[self.briscola], CARD_VALUE[self.briscola], 0])
         for card in self.table:
-            data.append(card._toNumerical() + [1])
+            data.append([CARD_SUIT[card], CARD_VALUE[card], 1])
         for card in player_cards:
-            data.append(card._toNumerical() + [2])
+            data.append([CARD_SUIT[card], CARD_VALUE[card], 2])
             
         return data
     
-    def _getMultiInputState(self, player_cards=[]):
+    def _getMultiInputState(self, player_cards=[], seat=None):
         """
         Returns state split into two parts for multi-input network:
         - hand: Cards in player's hand (variable length)
         - context: Global game context (fixed length)
+        seat selects the card counting view, None is the public one
         """
         # Input 1: Cards in hand only
         hand = []
         for card in player_cards:
             # Include suit, value, and points
-            hand.append([card.suit_numerical, card.value, card.points])
+            hand.append(list(CARD_FEATURES[card]))
         
         # Input 2: Global context (fixed size)
         context = []
         
         # Briscola info (3 values)
-        context.extend([self.briscola.suit_numerical, self.briscola.value, self.briscola.points])
+        context.extend(CARD_FEATURES[self.briscola])
         
         # Cards on table (up to 3 cards, each 3 values = 9 total)
         # Pad with zeros if less than 3 cards
         for i in range(3):
             if i < len(self.table):
-                context.extend([self.table[i].suit_numerical, self.table[i].value, self.table[i].points])
+                context.extend(CARD_FEATURES[self.table[i]])
             else:
                 context.extend([0, 0, 0])  # No card
         
@@ -106,348 +167,387 @@ class BriscolaEnv(Env):
         context.append(len(self.table))  # Number of cards on table (0-3)
         
         # Total context size: 3 + 9 + 3 = 15 values (fixed)
+        # plus COUNTING_SIZE card counting features when enabled
+        if self.counter is not None:
+            context.extend(self.counter.features(self.counter.public if seat is None else seat))
         
         return {'hand': hand, 'context': context}
 
-    # create deck of cards
-    def _createNewDeck(self):
-        deck = [Card(value, suit) for suit in range(4) for value in range(1, 11)]
+    def _fillMultiInputState(self, buffer, player_cards=[], seat=None):
+        """Same encoding as _getMultiInputState, padded and written into a preallocated array"""
+        features = []
+        for card in player_cards:
+            features.extend(CARD_FEATURES[card])
+        features.extend(_EMPTY_SLOTS[len(player_cards)])
 
-        if len(self.players) == 3:
-            deck.pop(1)
-    
-        random.shuffle(deck)
-        return deck
+        features.extend(CARD_FEATURES[self.briscola])
+        table = self.table[:3]
+        for card in table:
+            features.extend(CARD_FEATURES[card])
+        features.extend(_EMPTY_SLOTS[len(table)])
 
-    
-    # gives a card to a player
-    def _giveCards(self):
-        for player in self.turn_players:
-            player.handCard(self.deck.pop(0))
+        features.append(len(player_cards))
+        features.append(self.turn + 1)
+        features.append(len(self.table))
+        if self.counter is not None:
+            features.extend(self.counter.features(self.counter.public if seat is None else seat))
 
+        buffer[:] = features
 
-    def _evaluateTurn(self):
-        turn_points = 0
-        tmp_winner = -1
-    
-        # iterate through cards
-        for i, card in enumerate(self.table):
-            if i == 0:
-                high_card = card
-                tmp_winner = i
-            else:
-                if card.suit == self.seme_briscola:
-                    if high_card.suit == self.seme_briscola:
-                        if card.points > high_card.points:
-                            high_card = card
-                            tmp_winner = i
-                        else:
-                            if card.points == high_card.points:
-                                if card.value > high_card.value:
-                                    high_card = card
-                                    tmp_winner = i
-                    else:
-                        high_card = card
-                        tmp_winner = i
-                else:
-                    if card.suit == high_card.suit:
-                        if card.points > high_card.points:
-                            high_card = card
-                            tmp_winner = i
-                        else:
-                            if card.points == high_card.points:
-                                if card.value > high_card.value:
-                                    high_card = card
-                                    tmp_winner = i
-            turn_points += card.points
-
-        self.turn_winner = tmp_winner
-        self.turn_players[self.turn_winner].incrementPoints(turn_points)
-        return turn_points
+    # create deck of cards (ids 0..39)
+    def _createNewDeck(self):
+        return shuffled_deck(self.rng, self._base_deck).tolist()
+
+    def seat_seed(self, seat):
+        """Seed for the exploration of the agent at seat in the current game"""
+        return self.seeder.seat_seed(self.game_index, seat)
 
     
     # show cards played in current trick
-    def _printCurrentTurn(self):
+    def _printCurrentTurn(self, leader, table):
         turnStr = '\nCurrent table:\n'
-        for i, card in enumerate(self.table):
-            turnStr += "{0}: {1}\n".format(self.turn_players[i].name, str(card))
+        for i, card in enumerate(table):
+            seat = (leader + i) % self.num_players
+            turnStr += "{0}: {1}\n".format(self.playerNames[seat], CARD_NAME[card])
         
         return turnStr
 
 
-    def _event_GameStart(self):
+    def _setRenderMsg(self, formatter, *args):
+        self.renderInfo['printFlag'] = True
+        self.renderInfo['Msg'] = (formatter, args)
 
-        self.event_data_for_server = {}
-        self.event_data_for_client \
-        =   {
-                'event_name': self.event,
-                'broadcast': True,
-                'data': {
-                    'players' : self._getPlayerList()
-                }
-            }
-        
-        for player in self.players:
-            player.wins = 0
+    def _msgGameStart(self):
+        return '\n*** Briscola Start ***\n'
 
-        self.round = 0
+    def _msgNewRound(self, round, wins):
+        msg = '\n*** Start Round {0} ***\n'.format(round)
+        for seat, name in enumerate(self.playerNames):
+            msg += '{0}: {1}\n'.format(name, wins[seat])
+        return msg
 
-        self.renderInfo = {'printFlag': False, 'Msg': ''}
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = '\n*** Briscola Start ***\n'
+    def _msgShowTurnAction(self, leader, table):
+        return "\n" + self._printCurrentTurn(leader, table)
 
-    
-    def _event_NewRound(self):
+    def _msgShowTurnEnd(self, turn, winner, points, table):
+        msg = '\n*** Turn {0} ***\n'.format(turn)
+        msg += 'Winner: {0}\n'.format(winner)
+        msg += 'Points: {0}\n'.format(points)
+        msg += 'Table: {0}\n'.format(str([CARD_NAME[card] for card in table])[1:-1])
+        return msg
 
-        self.round += 1
-        self.turn_winner = -1
+    def _msgRoundEnd(self, round, round_winner, points):
+        msg = '\n*** Round {0} End ***\n'.format(round)
+        msg += 'Winner: {0} gained: {1} points\n'.format(self.playerNames[round_winner], points[round_winner])
+        for seat, name in enumerate(self.playerNames):
+            msg += '{0}: {1}\n'.format(name, points[seat])
+        return msg
 
-        for player in self.players:
-            player.points = 0
-            
-        self.turn_players = self.players
-        self.turn_players.append(self.turn_players.pop(0))
+    def _msgGameOver(self, round, winner, wins):
+        msg = '\n*** Game Over ***\n'
+        for seat, name in enumerate(self.playerNames):
+            msg += '{0}: {1}\n'.format(name, wins[seat])
 
-        self.deck = self._createNewDeck()
+        msg += '\nRound: {0}\n'.format(round)
+        msg += 'Winner: {0}\n'.format(winner)
+        return msg
 
-        self.turns = int(len(self.deck) / len(self.players))
-        self.turn = 0
 
-        self.table = []
+    def _event_GameStart(self):
 
-        # give 3 cards to each player
-        for i in range(3):
-            self._giveCards()
+        self.event_data_for_client = self._observeGameStart()
         
-        # take the briscola card and place it under the deck
-        self.briscola = self.deck.pop(0)
-        self.seme_briscola = self.briscola.suit
-        self.deck.append(self.briscola)
+        self.state.reset_game()
 
+        self.renderInfo = {'printFlag': False, 'Msg': ''}
+        self._setRenderMsg(self._msgGameStart)
 
-        self.event_data_for_server = {'shift': 0}
-
-        self.event_data_for_client \
-        =   {   
-                'event_name': self.event,
-                'broadcast': True,
-                'data': {
-                    'players' : self._getPlayerData()
+    
+    def _observeGameStart(self):
+        return  {
+                    'event_name': 'GameStart',
+                    'broadcast': True,
+                    'data': {
+                        'players' : self._getPlayerList()
+                    }
                 }
-            }
 
+
+    def _event_NewRound(self):
+
+        self._startRound()
+        self.event_data_for_client = self._observeNewRound()
         self.event = 'PlayTurn'
 
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = '\n*** Start Round {0} ***\n'.format(self.round)
-        for p in self.players:
-            self.renderInfo['Msg'] += '{0}: {1}\n'.format(p.name, p.wins)
+
+    def _startRound(self):
+        self.state.new_round(self._createNewDeck())
+
+        self.table = self.state.table
+        self.turn = self.state.turn
+        self.trick = None
+        if self.counter is not None:
+            self.counter.new_round(self.state.deck, self.briscola, self.state.hands)
+
+        self._setRenderMsg(self._msgNewRound, self.round, list(self.state.wins))
         
 
+    def _observeNewRound(self):
+        return  {
+                    'event_name': 'NewRound',
+                    'broadcast': True,
+                    'data': {
+                        'players' : self._getPlayerData()
+                    }
+                }
+
+
     def _event_PlayTurn(self):
-        current_player = self.turn_players[self.event_data_for_server['shift']]
-
-        self.event_data_for_client \
-        =   {   'event_name' : self.event,
-                'broadcast' : False,
-                'data' : {
-                    'playerName': current_player.name,
-                    'hand': self._getCardList(current_player.hand),
-                    'turn': self.turn + 1,
-                    'briscola': self.briscola._toArray(),
-                    'table': self._getCardList(self.table),
-                    'state': self._getStateList(current_player.hand),  # For v1, v2
-                    'state_v3': self._getMultiInputState(current_player.hand)  # For v3
+        self.event_data_for_client = self._observePlayTurn(self.state.current_seat())
+
+
+    def _observePlayTurn(self, seat):
+        hand = self.state.hands[seat]
+
+        data = {
+            'seat': seat,
+            'playerName': self.playerNames[seat],
+            'hand_size': len(hand),
+            'turn': self.turn + 1
+        }
+        if self._readable:
+            data['hand'] = self._getCardList(hand)
+            data['briscola'] = self._cardToArray(self.briscola)
+            data['table'] = self._getCardList(self.table)
+        if self._v1:
+            data['state'] = self._getStateList(hand)  # For v1, v2
+        if self._v3:
+            data['state_v3'] = self._getMultiInputState(hand, seat)  # For v3
+        elif self._v3_arrays:
+            self._fillMultiInputState(self._play_buffer, hand, seat)
+            data['state_v3'] = self._play_state_v3
+
+        return  {   'event_name' : 'PlayTurn',
+                    'broadcast' : False,
+                    'data' : data
                 }
-            }
 
 
     def _event_PlayTurn_Action(self, action_data):
-        current_player = self.turn_players[self.event_data_for_server['shift']]
-
         # player gives card selection
         card_index = action_data['data']['action']['card']
-        playedCard = current_player.playCard(card_index)
-        
-        # Track the card played by this player for reward calculation
-        self.turn_played_cards[current_player.name] = playedCard
-        
-        self.table.append(playedCard)
+        self._playCard(card_index)
 
-        self.event_data_for_server['shift'] += 1
         self.event = 'ShowTurnAction'
         self._event_ShowTurnAction()
 
 
-    def _event_ShowTurnAction(self):
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = "\n" + self._printCurrentTurn()
+    def _playCard(self, card_index):
+        undo = self.state.make_move(card_index)
         
-        self.event_data_for_client \
-        =   { 
-                'event_name' : self.event,
-                'broadcast' : True,
-                'data' : {
-                    'turn': self.turn + 1,
-                    'briscola': self.briscola._toArray(),
-                    'table': self._getCardList(self.table)
-                }
-            }
+        if undo[1] is None:
+            self.table = self.state.table
+        else:
+            # the trick is closed, keep it on the table until ShowTurnEnd
+            self.trick = undo
+            self.table = undo[1]
+        
+        if self.counter is not None:
+            self._countCards(undo)
+        
+        leader = self.trick[2] if self.trick is not None else self.state.leader
+        self._setRenderMsg(self._msgShowTurnAction, leader, list(self.table))
+
+
+    def _countCards(self, undo):
+        # the card played is seen by everyone, the cards drawn only by their owner
+        self.counter.played(self.table[-1])
+        if undo[1] is not None and undo[5]:
+            for seat, hand in enumerate(self.state.hands):
+                self.counter.mark(seat, hand[-1])
+
+
+    def _event_ShowTurnAction(self):
+        self.event_data_for_client = self._observeShowTurnAction()
         
-        if len(self.table) < 4:
+        if self.trick is None:
             self.event = 'PlayTurn'
         else:
             self.event = 'ShowTurnEnd'
 
 
+    def _observeShowTurnAction(self):
+        data = {'turn': self.turn + 1}
+        if self._readable:
+            data['briscola'] = self._cardToArray(self.briscola)
+            data['table'] = self._getCardList(self.table)
+
+        return  {
+                    'event_name' : 'ShowTurnAction',
+                    'broadcast' : True,
+                    'data' : data
+                }
+
+
     def _event_ShowTurnEnd(self):
         
-        points = self._evaluateTurn()
-        winner = self.turn_players[self.turn_winner].name
+        self.event_data_for_client = self._observeShowTurnEnd()
+        reward = self._rewardsByName(self._endTrick())
+
+        if not self.state.round_over():
+            self.event = 'PlayTurn'
+        else:
+            self.event = 'RoundEnd'
+
+        return reward
+
+
+    def _observeShowTurnEnd(self):
+        _, _, _, winner_seat, points, _ = self.trick
                  
-        self.event_data_for_client \
-        =   { 
-                'event_name' : self.event,
-                'broadcast' : True,
-                'data' : {
-                    'turn': self.turn + 1,
-                    'briscola': self.briscola._toArray(),
-                    'table': self._getCardList(self.table),
-                    'winner': winner,
-                    'points': points,
-                    'state': self._getStateList(),  # For v1, v2
-                    'state_v3': self._getMultiInputState()  # For v3
+        data = {
+            'turn': self.turn + 1,
+            'winner_seat': winner_seat,
+            'winner': self.playerNames[winner_seat],
+            'points': points
+        }
+        if self._readable:
+            data['briscola'] = self._cardToArray(self.briscola)
+            data['table'] = self._getCardList(self.table)
+        if self._v1:
+            data['state'] = self._getStateList()  # For v1, v2
+        if self._v3:
+            data['state_v3'] = self._getMultiInputState()  # For v3
+        elif self._v3_arrays:
+            self._fillMultiInputState(self._end_buffer)
+            data['state_v3'] = self._end_state_v3
+
+        return  {
+                    'event_name' : 'ShowTurnEnd',
+                    'broadcast' : True,
+                    'data' : data
                 }
-            }
 
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = '\n*** Turn {0} ***\n'.format(self.turn+1)
-        self.renderInfo['Msg'] += 'Winner: {0}\n'.format(winner)
-        self.renderInfo['Msg'] += 'Points: {0}\n'.format(points)
-        self.renderInfo['Msg'] += 'Table: {0}\n'.format(str([str(card) for card in self.table])[1:-1])
+
+    def _endTrick(self):
+        """Turn rewards by seat, then the trick leaves the table"""
+        _, trick, leader, winner_seat, points, _ = self.trick
+
+        self._setRenderMsg(self._msgShowTurnEnd, self.turn + 1, self.playerNames[winner_seat], points, list(self.table))
         
         # Calculate intelligent rewards
-        reward = {}
-        for player in self.players:
-            if player.name in self.turn_played_cards:
-                card_played = self.turn_played_cards[player.name]
-                card_value = card_played.points
+        reward = [0] * self.num_players
+        for i, card_played in enumerate(trick):
+            seat = (leader + i) % self.num_players
+            card_value = CARD_POINTS[card_played]
                 
-                if player.name == winner:
-                    # Won the turn: reward = (points_won - card_value) * weight
-                    # Good: win many points with low-value card
-                    # Bad: win few points with high-value card
-                    reward[player.name] = (points - card_value) * self.PESO_TURNO
-                else:
-                    # Lost the turn: small penalty based on card value
-                    # Losing with a valuable card is worse
-                    reward[player.name] = -card_value * self.PESO_PERDITA
+            if seat == winner_seat:
+                # Won the turn: reward = (points_won - card_value) * weight
+                # Good: win many points with low-value card
+                # Bad: win few points with high-value card
+                reward[seat] = (points - card_value) * self.PESO_TURNO
             else:
-                reward[player.name] = 0
+                # Lost the turn: small penalty based on card value
+                # Losing with a valuable card is worse
+                reward[seat] = -card_value * self.PESO_PERDITA
         
-        # Clear played cards for next turn
-        self.turn_played_cards = {}
+        # the winner already leads the next trick
+        self.trick = None
+        self.table = self.state.table
+        self.turn = self.state.turn
         
-        self.table = []
-        for i in range(self.turn_winner):
-            self.turn_players.append(self.turn_players.pop(0))
+        return reward
 
-        if len(self.deck) > 0:
-            self._giveCards()
 
-        self.turn += 1
-        if self.turn < self.turns:
-            self.event = 'PlayTurn'
-            self.event_data_for_server = {'shift': 0}
-        else:
-            self.event = 'RoundEnd'
-            self.event_data_for_server = {}
-
-        return reward
+    # the step() protocol keeps its rewards by player name
+    def _rewardsByName(self, reward):
+        return {name: reward[seat] for seat, name in enumerate(self.playerNames)}
 
 
     def _event_RoundEnd(self):
 
-        round_winner = max(self.players, key=lambda x:x.points)
-        round_winner.wins += 1
-
-        self.event_data_for_client \
-        =   { 
-                'event_name' : self.event,
-                'broadcast' : True,
-                'data' : {
-                    'players' : self._getPlayerData(),
-                    'round': self.round,
-                    'round_winner': round_winner.name
-                }
-            }
-
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = '\n*** Round {0} End ***\n'.format(self.round)
-        self.renderInfo['Msg'] += 'Winner: {0}\n'.format(round_winner)
-        for p in self.players:
-            self.renderInfo['Msg'] += '{0}: {1}\n'.format(p.name, p.points)
+        round_winner = self._endRound()
+        self.event_data_for_client = self._observeRoundEnd(round_winner)
         
         # Calculate round bonus rewards
-        reward = {}
-        for player in self.players:
-            if player.name == round_winner.name:
-                reward[player.name] = self.BONUS_ROUND
-            else:
-                reward[player.name] = 0
+        reward = {name: 0 for name in self.playerNames}
+        reward[self.playerNames[round_winner]] = self.BONUS_ROUND
         
         # new round if no one has lost
-        if round_winner.wins < self.rounds_to_win:
+        if not self.state.game_over():
             self.event = 'NewRound'
-            self.event_data_for_server = {}
         else:
             self.event = 'GameOver'
-            self.event_data_for_server = {}
         
         return reward
 
 
-    def _event_GameOver(self):
-        
-        winner = max(self.players, key=lambda x:x.wins)
-        
-        self.event_data_for_client \
-        =   { 
-                'event_name' : self.event,
-                'broadcast' : True,
-                'data' : {
-                    "players" : self._getPlayerData(),
-                    'game_winner': winner.name
+    def _endRound(self):
+        round_winner = self.state.end_round()
+        self._setRenderMsg(self._msgRoundEnd, self.round, round_winner, list(self.state.points))
+        return round_winner
+
+
+    def _observeRoundEnd(self, round_winner):
+        return  {
+                    'event_name' : 'RoundEnd',
+                    'broadcast' : True,
+                    'data' : {
+                        'players' : self._getPlayerData(),
+                        'round': self.round,
+                        'round_winner_seat': round_winner,
+                        'round_winner': self.playerNames[round_winner]
+                    }
                 }
-            }
 
-        self.renderInfo['printFlag'] = True
-        self.renderInfo['Msg'] = '\n*** Game Over ***\n'
-        for p in self.players:
-            self.renderInfo['Msg'] += '{0}: {1}\n'.format(p.name, p.wins)
+
+    def _event_GameOver(self):
         
-        self.renderInfo['Msg'] += '\nRound: {0}\n'.format(self.round)
-        self.renderInfo['Msg'] += 'Winner: {0}\n'.format(winner.name)
+        self.event_data_for_client = self._observeGameOver()
+        self._setRenderMsg(self._msgGameOver, self.round, self.playerNames[self._gameWinner()], list(self.state.wins))
         
         self.event = None
 
 
+    def _gameWinner(self):
+        wins = self.state.wins
+        return wins.index(max(wins))
+
+
+    def _observeGameOver(self):
+        return  {
+                    'event_name' : 'GameOver',
+                    'broadcast' : True,
+                    'data' : {
+                        "players" : self._getPlayerData(),
+                        'game_winner_seat': self._gameWinner(),
+                        'game_winner': self.playerNames[self._gameWinner()]
+                    }
+                }
+
+
     def reset(self, seed=None, options=None):
+        # a seed restarts the stream of games, options['game_index'] jumps to a game
         if seed is not None:
-            random.seed(seed)
+            self.seeder = GameSeeder(seed, self.seeder.worker_id)
+        if options is not None and 'game_index' in options:
+            self.seeder.game_index = options['game_index']
+
+        self.game_index = self.seeder.next_game()
+        self.rng = self.seeder.deck_rng(self.game_index)
         
         # Generate a full deck of cards and shuffle it
         self.event = 'GameStart'
         self._event_GameStart()
         observation = self.event_data_for_client
         self.event = 'NewRound'
-        self.event_data_for_server = {}
         
         return observation, {}
                 
     def render(self, mode = "human"):
         if self.renderInfo['printFlag']:
-            print(self.renderInfo['Msg'])
+            formatter, args = self.renderInfo['Msg']
+            print(formatter(*args))
             self.renderInfo['printFlag'] = False
             self.renderInfo['Msg'] = ""
     
@@ -484,4 +584,97 @@ class BriscolaEnv(Env):
 
 
         observation = self.event_data_for_client
-        return observation, reward, done, info
\ No newline at end of file
+        return observation, reward, done, info
+
+
+    def subscribe(self, event_name, callback):
+        """
+        Call callback(observation, reward) on a broadcast event during
+        start()/play(), reward is a list by seat or None.
+        Broadcast observations nobody subscribed to are never built.
+        """
+        self._listeners.setdefault(event_name, []).append(callback)
+
+    def unsubscribe(self, event_name, callback):
+        """Remove a callback given to subscribe()"""
+        listeners = self._listeners.get(event_name, [])
+        if callback in listeners:
+            listeners.remove(callback)
+        if not listeners:
+            self._listeners.pop(event_name, None)
+
+    def _notify(self, event_name, observe, *args, reward=None):
+        listeners = self._listeners.get(event_name)
+        if listeners:
+            observation = observe(*args)
+            for callback in listeners:
+                callback(observation, reward)
+
+
+    def start(self, seed=None, options=None):
+        """
+        Decision-point API: reset and advance to the first card to play
+        Returns: (seat, observation) where observation is the PlayTurn one
+        """
+        observation, _ = self.reset(seed, options)
+        for callback in self._listeners.get('GameStart', ()):
+            callback(observation, None)
+
+        self.outcomes = []
+        self._startRound()
+        self._notify('NewRound', self._observeNewRound)
+        self.event = 'PlayTurn'
+
+        seat = self.state.current_seat()
+        return seat, self._observePlayTurn(seat)
+
+
+    def play(self, card_index):
+        """
+        Decision-point API: the current seat plays the card at card_index and
+        the game advances straight to the next card to play
+
+        Returns: (next_seat, observation, rewards, done)
+        - rewards: list by seat, turn rewards plus round bonus
+        - observation: PlayTurn observation of next_seat, None when done
+        The folded events are in self.outcomes
+        """
+        self.outcomes = []
+        rewards = [0] * self.num_players
+
+        self._playCard(card_index)
+        self._notify('ShowTurnAction', self._observeShowTurnAction)
+
+        if self.trick is not None:
+            _, cards, leader, winner, points, _ = self.trick
+            self.outcomes.append(TrickOutcome(self.turn + 1, leader, winner, points, cards))
+
+            listeners = self._listeners.get('ShowTurnEnd')
+            observation = self._observeShowTurnEnd() if listeners else None
+            rewards = self._endTrick()
+            if listeners:
+                reward = list(rewards)
+                for callback in listeners:
+                    callback(observation, reward)
+
+            if self.state.round_over():
+                round_winner = self._endRound()
+                rewards[round_winner] += self.BONUS_ROUND
+                self.outcomes.append(RoundOutcome(self.round, round_winner, list(self.state.points)))
+                bonus = [0] * self.num_players
+                bonus[round_winner] = self.BONUS_ROUND
+                self._notify('RoundEnd', self._observeRoundEnd, round_winner, reward=bonus)
+
+                if self.state.game_over():
+                    game_winner = self._gameWinner()
+                    self.outcomes.append(GameOutcome(game_winner, list(self.state.wins)))
+                    self._notify('GameOver', self._observeGameOver)
+                    self._setRenderMsg(self._msgGameOver, self.round, self.playerNames[game_winner], list(self.state.wins))
+                    self.event = None
+                    return None, None, rewards, True
+
+                self._startRound()
+                self._notify('NewRound', self._observeNewRound)
+
+        seat = self.state.current_seat()
+        return seat, self._observePlayTurn(seat), rewards, False
@@ -0,0 +1,186 @@
+"""
+Canonical positions and Zobrist keys
+Briscola does not change when the three suits other than the briscola are
+swapped, or when a hand is reordered. Positions are relabelled so that the
+briscola is suit 0 and the other suits come in a canonical order, hands
+are sorted and the original card indexes are returned to map actions back.
+
+Zobrist keys hash where every card is, the leader and the cards left in
+the deck, and are updated incrementally by make/unmake move. Points are
+not part of the key: the remaining play of a position does not depend on
+them.
+"""
+import numpy as np
+
+from .cards import NUM_CARDS, NUM_SUITS, CARD_SUIT
+
+# Fixed seed, keys are stable across runs and processes
+_ZOBRIST_SEED = 20240531
+_MAX_PLAYERS = 4
+
+_rng = np.random.default_rng(_ZOBRIST_SEED)
+ZOBRIST_HAND = _rng.integers(0, 2**64, size=(_MAX_PLAYERS, NUM_CARDS), dtype=np.uint64).tolist()
+ZOBRIST_TABLE = _rng.integers(0, 2**64, size=(_MAX_PLAYERS, NUM_CARDS), dtype=np.uint64).tolist()
+ZOBRIST_DECK = _rng.integers(0, 2**64, size=(NUM_CARDS, NUM_CARDS), dtype=np.uint64).tolist()
+ZOBRIST_LEADER = _rng.integers(0, 2**64, size=_MAX_PLAYERS, dtype=np.uint64).tolist()
+del _rng
+
+
+def zobrist_hash(state):
+    """Zobrist key of a GameState, computed from scratch"""
+    key = ZOBRIST_LEADER[state.leader]
+    for seat, hand in enumerate(state.hands):
+        for card in hand:
+            key ^= ZOBRIST_HAND[seat][card]
+    for slot, card in enumerate(state.table):
+        key ^= ZOBRIST_TABLE[slot][card]
+    deck = state.deck
+    for position in range(state.deck_pos, len(deck)):
+        key ^= ZOBRIST_DECK[position][deck[position]]
+    return key
+
+
+def _move_delta(state, undo):
+    # XOR between the keys before and after the move, read on the state after it
+    P = state.num_players
+    if undo[1] is None:
+        slot = len(state.table) - 1
+        card = state.table[slot]
+        seat = (state.leader + slot) % P
+        return ZOBRIST_HAND[seat][card] ^ ZOBRIST_TABLE[slot][card]
+
+    _, trick, leader, winner, _, drew = undo
+    last = P - 1
+    delta = ZOBRIST_HAND[(leader + last) % P][trick[last]]
+    for slot in range(last):
+        delta ^= ZOBRIST_TABLE[slot][trick[slot]]
+    delta ^= ZOBRIST_LEADER[leader] ^ ZOBRIST_LEADER[winner]
+
+    if drew:
+        deck = state.deck
+        first = state.deck_pos - P
+        for i in range(P):
+            seat = (winner + i) % P
+            card = deck[first + i]
+            delta ^= ZOBRIST_DECK[first + i][card] ^ ZOBRIST_HAND[seat][card]
+    return delta
+
+
+def zobrist_make(state, index, key):
+    """state.make_move(index) with the key updated, returns (undo, key)"""
+    undo = state.make_move(index)
+    return undo, key ^ _move_delta(state, undo)
+
+
+def zobrist_unmake(state, undo, key):
+    """state.unmake_move(undo) with the key updated, returns the key"""
+    key ^= _move_delta(state, undo)
+    state.unmake_move(undo)
+    return key
+
+
+def _suit_order(briscola_suit, signatures):
+    # suit_map[suit] = canonical suit, the briscola first then by signature
+    others = sorted((signatures[suit], suit) for suit in range(NUM_SUITS) if suit != briscola_suit)
+    suit_map = [0] * NUM_SUITS
+    for new_suit, (_, suit) in enumerate(others, 1):
+        suit_map[suit] = new_suit
+    return suit_map
+
+
+def suit_map(state):
+    """
+    Canonical suit of every suit of a GameState
+
+    Each suit is described by where its cards are (hand of a seat, table
+    slot, deck position or gone), suits with the same description are
+    interchangeable and any order between them gives the same position
+    """
+    P = state.num_players
+    location = [0] * NUM_CARDS
+    for seat, hand in enumerate(state.hands):
+        for card in hand:
+            location[card] = 1 + seat
+    for slot, card in enumerate(state.table):
+        location[card] = 1 + P + slot
+    deck = state.deck
+    for position in range(state.deck_pos, len(deck)):
+        location[deck[position]] = 1 + 2 * P + position
+
+    signatures = [tuple(location[suit * 10:suit * 10 + 10]) for suit in range(NUM_SUITS)]
+    return _suit_order(state.briscola_suit, signatures)
+
+
+def canonical_state(state):
+    """
+    Relabelled clone of a GameState, with sorted hands
+
+    Returns: (canonical, order, suit_map)
+    - order[seat][i]: index in the original hand of card i of the
+      canonical hand, so canonical action i plays order[seat][i]
+    - suit_map[suit]: canonical suit of an original suit
+    """
+    mapping = suit_map(state)
+    relabel = [mapping[CARD_SUIT[card]] * 10 + card % 10 for card in range(NUM_CARDS)]
+
+    canonical = state.clone()
+    canonical.deck = [relabel[card] for card in state.deck]
+    canonical.briscola = relabel[state.briscola]
+    canonical.briscola_suit = 0
+    canonical.table = [relabel[card] for card in state.table]
+
+    order = []
+    for seat, hand in enumerate(state.hands):
+        indexes = sorted(range(len(hand)), key=lambda i: relabel[hand[i]])
+        order.append(indexes)
+        canonical.hands[seat] = [relabel[hand[i]] for i in indexes]
+
+    return canonical, order, mapping
+
+
+def canonical_key(state):
+    """Zobrist key of the canonical position, equal for suit-symmetric positions"""
+    return zobrist_hash(canonical_state(state)[0])
+
+
+def canonical_v3(hand, context):
+    """
+    Canonical state_v3 of the seat to play
+
+    hand: cards as [suit, value, points] rows, either the hand_size rows of
+    the 'all' observations or padded to 3 rows; context: 15 values, or 22
+    with card counting. Returns (hand, context, order) as float32 arrays of
+    the same shapes plus order[i], the original index of canonical card i.
+    hand.tobytes() + context.tobytes() is a key of the position
+    """
+    hand = np.array(hand, dtype=np.float32).reshape(-1, 3)
+    context = np.array(context, dtype=np.float32)
+    hand_count = int(context[12])
+    table_count = min(int(context[14]), 3)
+
+    cards = hand[:hand_count]
+    table = context[3:3 + 3 * table_count].reshape(-1, 3)
+    briscola_suit = int(context[0])
+    counting = len(context) > 15
+
+    signatures = []
+    for suit in range(NUM_SUITS):
+        signatures.append((
+            tuple(slot for slot in range(table_count) if table[slot, 0] == suit),
+            tuple(sorted(cards[cards[:, 0] == suit, 1].tolist())),
+            float(context[15 + suit]) if counting else 0.0
+        ))
+    mapping = np.array(_suit_order(briscola_suit, signatures), dtype=np.float32)
+
+    cards[:, 0] = mapping[cards[:, 0].astype(np.int64)]
+    order = sorted(range(hand_count), key=lambda i: (cards[i, 0], cards[i, 1]))
+    hand[:hand_count] = cards[order]
+
+    # table is a view of context
+    context[0] = 0
+    table[:, 0] = mapping[table[:, 0].astype(np.int64)]
+    if counting:
+        unseen = context[15:15 + NUM_SUITS].copy()
+        context[15 + mapping.astype(np.int64)] = unseen
+
+    return hand, context, order
@@ -0,0 +1,94 @@
+"""
+Integer card representation for the Briscola engine
+Cards are ids 0..39 (id = suit * 10 + value - 1), all card properties
+and trick resolution are precomputed lookup tables
+"""
+import numpy as np
+
+suits = ['Hearts', 'Diamonds', 'Spades', 'Clubs']
+
+NUM_CARDS = 40
+NUM_SUITS = 4
+
+# Rules and reward system parameters of every engine (BriscolaEnv,
+# BriscolaVecEnv, kernel.play_games)
+ROUNDS_TO_WIN = 3
+PESO_TURNO = 0.5  # Weight for turn rewards
+PESO_PERDITA = 0.2  # Penalty weight for losing with valuable cards
+BONUS_ROUND = 100  # Bonus for winning the round
+
+# Points of each value, every other value is worth 0
+_VALUE_POINTS = {1: 11, 3: 10, 8: 2, 9: 3, 10: 4}
+
+CARD_SUIT = tuple(card // 10 for card in range(NUM_CARDS))
+CARD_VALUE = tuple(card % 10 + 1 for card in range(NUM_CARDS))
+CARD_POINTS = tuple(_VALUE_POINTS.get(value, 0) for value in CARD_VALUE)
+
+# Strength of a card inside its suit: 2 < 4 < 5 < 6 < 7 < J < Q < K < 3 < A
+_SUIT_ORDER = sorted(range(1, 11), key=lambda value: (_VALUE_POINTS.get(value, 0), value))
+CARD_RANK = tuple(_SUIT_ORDER.index(value) for value in CARD_VALUE)
+
+# Encodings used by the observations
+CARD_NAME = tuple('{0} of {1}'.format(CARD_VALUE[card], suits[CARD_SUIT[card]]) for card in range(NUM_CARDS))
+CARD_FEATURES = tuple((CARD_SUIT[card], CARD_VALUE[card], CARD_POINTS[card]) for card in range(NUM_CARDS))
+
+
+def card_id(value, suit):
+    return suit * 10 + value - 1
+
+
+def base_deck(num_players):
+    """Card ids of the unshuffled deck, with 3 players the 2 of Hearts is removed"""
+    deck = np.arange(NUM_CARDS)
+    if num_players == 3:
+        deck = np.delete(deck, card_id(2, 0))
+    return deck
+
+
+def _strength(card, briscola_suit, lead_suit):
+    # briscola beats everything, then the lead suit, then the rank inside the suit
+    if CARD_SUIT[card] == briscola_suit:
+        return 20 + CARD_RANK[card]
+    if CARD_SUIT[card] == lead_suit:
+        return 10 + CARD_RANK[card]
+    return 0
+
+
+# TRICK_STRENGTH[briscola_suit][lead_suit][card]: the highest card on the table wins
+TRICK_STRENGTH = tuple(
+    tuple(
+        tuple(_strength(card, briscola_suit, lead_suit) for card in range(NUM_CARDS))
+        for lead_suit in range(NUM_SUITS))
+    for briscola_suit in range(NUM_SUITS))
+
+# BEATS[briscola_suit][lead_suit][a][b]: True if card a takes the trick from card b
+BEATS = tuple(
+    tuple(
+        tuple(
+            tuple(strength[a] > strength[b] for b in range(NUM_CARDS))
+            for a in range(NUM_CARDS))
+        for strength in by_lead)
+    for by_lead in TRICK_STRENGTH)
+
+
+# NumPy versions for the batched engine
+SUIT_TABLE = np.array(CARD_SUIT, dtype=np.int8)
+VALUE_TABLE = np.array(CARD_VALUE, dtype=np.int8)
+POINTS_TABLE = np.array(CARD_POINTS, dtype=np.int16)
+RANK_TABLE = np.array(CARD_RANK, dtype=np.int8)
+STRENGTH_TABLE = np.array(TRICK_STRENGTH, dtype=np.int8)
+BEATS_TABLE = np.array(BEATS, dtype=bool)
+
+# [suit, value, points] per card, the extra last row (index -1) is an empty slot
+FEATURE_TABLE = np.zeros((NUM_CARDS + 1, 3), dtype=np.float32)
+FEATURE_TABLE[:NUM_CARDS] = CARD_FEATURES
+
+
+def trick_winner(table, briscola_suit):
+    """Index in the table of the card that takes the trick"""
+    strength = TRICK_STRENGTH[briscola_suit][CARD_SUIT[table[0]]]
+    winner = 0
+    for i in range(1, len(table)):
+        if strength[table[i]] > strength[table[winner]]:
+            winner = i
+    return winner
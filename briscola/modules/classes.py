@@ -1,29 +1,35 @@
 # wrapper for the card class
-# init and string functions
-import random
-
-suits = ['Hearts', 'Diamonds', 'Spades', 'Clubs']
+# thin view over an integer card id, the engine only uses the ids
+from .cards import suits, card_id, CARD_SUIT, CARD_VALUE, CARD_POINTS, CARD_NAME
 
 ### TODO change all colors into suits
 class Card:
+    __slots__ = ('id',)
+
     def __init__(self, value, suit):
-        self.value = value
-        self.suit = suits[suit]
-        self.suit_numerical = suit
-        
-        # assign points to each value
-        if self.value == 1:
-            self.points = 11
-        elif self.value == 3:
-            self.points = 10
-        elif self.value == 8:
-            self.points = 2
-        elif self.value == 9:
-            self.points = 3
-        elif self.value == 10:
-            self.points = 4
-        else:
-            self.points = 0
+        self.id = card_id(value, suit)
+
+    @classmethod
+    def fromId(cls, card):
+        view = cls.__new__(cls)
+        view.id = card
+        return view
+
+    @property
+    def value(self):
+        return CARD_VALUE[self.id]
+
+    @property
+    def suit(self):
+        return suits[CARD_SUIT[self.id]]
+
+    @property
+    def suit_numerical(self):
+        return CARD_SUIT[self.id]
+
+    @property
+    def points(self):
+        return CARD_POINTS[self.id]
 
     def _toArray(self):
         return [self.suit, self.value]
@@ -32,7 +38,7 @@ class Card:
         return [self.suit_numerical, self.value]
 
     def __str__(self):
-        return str(self.value) + ' of ' + self.suit
+        return CARD_NAME[self.id]
 
 
 # class player
@@ -41,7 +47,7 @@ class Player:
     def __init__(self, name):
         self.name = name
         
-        self.hand = []
+        self.hand = []  # card ids
         self.points = 0
         self.wins = 0
         # self.team = team
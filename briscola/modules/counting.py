@@ -0,0 +1,90 @@
+"""
+Incremental card counting for the observations
+Every seat keeps a bitmask of the cards it has seen during the round and
+the features derived from it, both updated in O(1) when a card is seen
+"""
+from .cards import NUM_CARDS, NUM_SUITS, CARD_SUIT, CARD_POINTS
+
+# Features appended to the v3 context:
+# - unseen points of each suit (4)
+# - unseen briscole (1)
+# - ace and three of briscola not seen yet (2)
+COUNTING_SIZE = 7
+
+# Points of a full suit: A + 3 + K + Q + J
+_SUIT_POINTS = 30
+
+
+class CardCounter:
+    """
+    Cards seen during the current round, by view:
+    - views 0..num_players-1: a seat sees the played cards, the briscola
+      under the deck and every card it has held
+    - view num_players: public, only what every seat has seen
+
+    Cards missing from the deck (the 2 of Hearts with 3 players) count
+    as seen from the start
+    """
+
+    __slots__ = ('num_players', 'briscola_suit', 'seen', 'unseen_points', 'unseen_briscole')
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.briscola_suit = 0
+        self.seen = [0] * (num_players + 1)
+        self.unseen_points = [[_SUIT_POINTS] * NUM_SUITS for _ in range(num_players + 1)]
+        self.unseen_briscole = [10] * (num_players + 1)
+
+
+    @property
+    def public(self):
+        return self.num_players
+
+
+    def new_round(self, deck, briscola, hands):
+        """Reset the views for a new deal, hands are the dealt hands by seat"""
+        views = self.num_players + 1
+        self.briscola_suit = CARD_SUIT[briscola]
+        self.seen = [0] * views
+        self.unseen_points = [[_SUIT_POINTS] * NUM_SUITS for _ in range(views)]
+        self.unseen_briscole = [10] * views
+
+        in_deck = 0
+        for card in deck:
+            in_deck |= 1 << card
+        for card in range(NUM_CARDS):
+            if not in_deck & (1 << card):
+                self.played(card)
+
+        self.played(briscola)
+        for seat, hand in enumerate(hands):
+            for card in hand:
+                self.mark(seat, card)
+
+
+    def mark(self, view, card):
+        bit = 1 << card
+        if self.seen[view] & bit:
+            return
+        self.seen[view] |= bit
+
+        suit = CARD_SUIT[card]
+        self.unseen_points[view][suit] -= CARD_POINTS[card]
+        if suit == self.briscola_suit:
+            self.unseen_briscole[view] -= 1
+
+    def played(self, card):
+        """A card shown to everyone"""
+        for view in range(self.num_players + 1):
+            self.mark(view, card)
+
+
+    def features(self, view):
+        """COUNTING_SIZE features of a view"""
+        seen = self.seen[view]
+        ace = self.briscola_suit * 10
+        return self.unseen_points[view] + [
+            self.unseen_briscole[view],
+            0 if seen & (1 << ace) else 1,
+            0 if seen & (1 << (ace + 2)) else 1
+        ]
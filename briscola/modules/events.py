@@ -0,0 +1,25 @@
+"""
+Integer codes of the BriscolaEnv events
+Agents list the codes they consume in their 'events' attribute and the
+game runner delivers only those
+"""
+GAME_START = 0
+NEW_ROUND = 1
+PLAY_TURN = 2
+SHOW_TURN_ACTION = 3
+SHOW_TURN_END = 4
+ROUND_END = 5
+GAME_OVER = 6
+
+# event_name of the observations, indexed by code
+EVENT_NAMES = ('GameStart', 'NewRound', 'PlayTurn', 'ShowTurnAction', 'ShowTurnEnd', 'RoundEnd', 'GameOver')
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+
+# PlayTurn goes only to the seat that has to play, everything else to every listener
+BROADCAST_EVENTS = (GAME_START, NEW_ROUND, SHOW_TURN_ACTION, SHOW_TURN_END, ROUND_END, GAME_OVER)
+ALL_EVENTS = frozenset(range(len(EVENT_NAMES)))
+
+
+def player_events(print_info):
+    """Events of an agent that only needs its turns, the broadcasts too when it prints them"""
+    return ALL_EVENTS if print_info else frozenset((PLAY_TURN,))
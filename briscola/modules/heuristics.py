@@ -0,0 +1,102 @@
+"""
+Rule-based policies as NumPy array operations
+Every policy picks the card of the seat to play in a whole batch of games
+in one call, from card ids (BriscolaVecEnv), state_v3 features
+(BriscolaEnvPool, observations) or a GameState
+"""
+import numpy as np
+
+from .cards import NUM_CARDS, NUM_SUITS, SUIT_TABLE, POINTS_TABLE, RANK_TABLE, STRENGTH_TABLE
+
+# From the weakest to the strongest in 4-player games:
+# - 'discard': always throw the cheapest card
+# - 'greedy': take the trick with the cheapest card that wins it, else
+#   throw the cheapest card (same rule as modules.kernel.greedy_action)
+# - 'saver': like greedy, but a briscola only takes a trick worth
+#   SAVER_POINTS points or in the last SAVER_LATE tricks of the round
+HEURISTIC_POLICIES = ('discard', 'greedy', 'saver')
+
+SAVER_POINTS = 10
+SAVER_LATE = 3
+
+# COST_TABLE[briscola_suit][card]: keep briscole first, then points, then
+# strength inside the suit. The extra last column (card -1) is an empty slot
+_EMPTY_COST = 1 << 14
+COST_TABLE = np.full((NUM_SUITS, NUM_CARDS + 1), _EMPTY_COST, dtype=np.int32)
+for _suit in range(NUM_SUITS):
+    COST_TABLE[_suit, :NUM_CARDS] = ((SUIT_TABLE == _suit) * 1000 + POINTS_TABLE.astype(np.int32) * 10
+                                     + RANK_TABLE)
+
+
+def heuristic_actions(policy, hand, table, table_count, briscola_suit, turns_left):
+    """
+    Card index to play in every game of a batch
+
+    hand: (B, 3) card ids of the seat to play, -1 for empty slots
+    table: (B, T) card ids in play order, only the first table_count count
+    table_count, briscola_suit, turns_left: (B,) tricks left in the round,
+    the current one included
+    """
+    if policy not in HEURISTIC_POLICIES:
+        raise ValueError(f"Unknown heuristic policy '{policy}', expected one of {HEURISTIC_POLICIES}")
+
+    hand = np.asarray(hand, dtype=np.int64)
+    table = np.asarray(table, dtype=np.int64)
+    table_count = np.asarray(table_count, dtype=np.int64)
+    briscola_suit = np.asarray(briscola_suit, dtype=np.int64)
+
+    cost = COST_TABLE[briscola_suit[:, None], hand]
+    cheapest = cost.argmin(axis=1)
+    if policy == 'discard':
+        return cheapest
+
+    # strongest card on the table, the empty slots and an empty table count as -1
+    lead_suit = SUIT_TABLE[table[:, 0]].astype(np.int64)[:, None]
+    on_table = np.arange(table.shape[1]) < table_count[:, None]
+    strength = STRENGTH_TABLE[briscola_suit[:, None], lead_suit, table]
+    top = np.where(on_table, strength, -1).max(axis=1)
+
+    beats_top = STRENGTH_TABLE[briscola_suit[:, None], lead_suit, hand] > top[:, None]
+    wins = (hand >= 0) & (table_count[:, None] > 0) & beats_top
+    if policy == 'saver':
+        trick_points = np.where(on_table, POINTS_TABLE[table], 0).sum(axis=1)
+        spend = (trick_points >= SAVER_POINTS) | (np.asarray(turns_left) <= SAVER_LATE)
+        wins &= (SUIT_TABLE[hand] != briscola_suit[:, None]) | spend[:, None]
+
+    winner = np.where(wins, cost, _EMPTY_COST).argmin(axis=1)
+    return np.where(wins.any(axis=1), winner, cheapest)
+
+
+def features_to_cards(features):
+    """Card ids of [suit, value, points] rows (state_v3), -1 for padding rows"""
+    features = np.asarray(features)
+    value = features[..., 1].astype(np.int64)
+    return np.where(value > 0, features[..., 0].astype(np.int64) * 10 + value - 1, -1)
+
+
+def v3_actions(policy, hand, context, turns):
+    """
+    heuristic_actions() from padded state_v3 batches, hand: (B, 3, 3),
+    context: (B, 15 or more) like the observations of BriscolaEnvPool.
+    turns: tricks in a round (40 // num_players, 13 with 3 players)
+    """
+    context = np.asarray(context)
+    table = features_to_cards(context[:, 3:12].reshape(-1, 3, 3))
+    turns_left = turns - context[:, 13].astype(np.int64) + 1
+    return heuristic_actions(policy, features_to_cards(hand), table, context[:, 14].astype(np.int64),
+                             context[:, 0].astype(np.int64), turns_left)
+
+
+def vec_env_actions(policy, env):
+    """heuristic_actions() for the seat to play in every game of a BriscolaVecEnv"""
+    envs = np.arange(env.num_envs)
+    seat = (env.leader.astype(np.int64) + env.table_count) % env.num_players
+    return heuristic_actions(policy, env.hands[envs, seat], env.table, env.table_count,
+                             SUIT_TABLE[env.briscola], env.turns - env.turn)
+
+
+def state_action(policy, state, seat):
+    """heuristic_actions() for one GameState"""
+    hand = state.hands[seat]
+    return int(heuristic_actions(policy, [hand + [-1] * (3 - len(hand))], [state.table + [-1]],
+                                 [len(state.table)], [state.briscola_suit], [state.turns - state.turn])[0])
@@ -0,0 +1,383 @@
+"""
+Compiled Briscola game kernel
+Plays whole games for array-based policies (random, greedy and an exported
+DQNv3 network) in a single call. The kernel is compiled with Numba when it
+is installed and runs as plain Python otherwise, BriscolaEnv stays the
+reference implementation and the kernel deals the same games for the same
+(root_seed, worker_id, game_index)
+"""
+import collections
+
+import numpy as np
+
+from .cards import SUIT_TABLE, POINTS_TABLE, RANK_TABLE, STRENGTH_TABLE, FEATURE_TABLE
+from .cards import ROUNDS_TO_WIN, PESO_TURNO, PESO_PERDITA, BONUS_ROUND, base_deck
+from .seeding import GameSeeder
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # same call forms as numba.njit, the function is returned unchanged
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+# Seat policies understood by the kernel
+POLICY_RANDOM = 0
+POLICY_GREEDY = 1
+POLICY_NET = 2
+POLICIES = {'random': POLICY_RANDOM, 'greedy': POLICY_GREEDY, 'net': POLICY_NET}
+
+# Layers of the DQNv3 network, in the order the kernel reads their weights
+NET_LAYERS = ('hand_lstm', 'context_dense1', 'context_dense2', 'hidden1', 'hidden2', 'q_values')
+
+# Recorded states are state_v3 flattened: padded hand (3x3) then context (15)
+STATE_SIZE = 24
+
+
+GameBatch = collections.namedtuple(
+    'GameBatch', ['winners', 'wins', 'returns', 'states', 'actions', 'rewards', 'lengths'])
+GameBatch.__doc__ = """
+Result of play_games, the leading axes are (game, seat, decision):
+- winners: (G,) winning seat, wins: (G, P) rounds won by each seat
+- returns: (G, P) sum of the rewards of each seat
+- states, actions, rewards: (G, P, T, 24), (G, P, T), (G, P, T) trajectory
+  of each seat, the first lengths[g, seat] decisions are valid
+"""
+
+
+def pack_net(layer_weights):
+    """
+    Weights in kernel order from {layer name: [arrays]}, as returned by
+    DQNv3Agent.export_weights() (Keras layout, LSTM gates i, f, c, o)
+    """
+    net = []
+    for name in NET_LAYERS:
+        if name not in layer_weights:
+            raise ValueError(f"Missing weights of layer '{name}'")
+        net.extend(np.ascontiguousarray(w, dtype=np.float64) for w in layer_weights[name])
+    return tuple(net)
+
+
+def _empty_net():
+    # placeholder with the right types when no seat uses the network
+    matrix = np.zeros((1, 1))
+    vector = np.zeros(1)
+    return (matrix, matrix, vector) + (matrix, vector) * 5
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _affine(x, weights, bias):
+        out = bias.copy()
+        for i in range(x.shape[0]):
+            xi = x[i]
+            if xi != 0.0:
+                for j in range(out.shape[0]):
+                    out[j] += xi * weights[i, j]
+        return out
+else:
+    def _affine(x, weights, bias):
+        return x @ weights + bias
+
+
+@njit(cache=True)
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+@njit(cache=True)
+def _net_q_values(state, net):
+    """DQNv3 forward pass for one state_v3, same result as model.predict"""
+    (lstm_kernel, lstm_recurrent, lstm_bias,
+     context_w1, context_b1, context_w2, context_b2,
+     hidden_w1, hidden_b1, hidden_w2, hidden_b2, q_w, q_b) = net
+
+    # LSTM over the 3 padded hand slots, empty slots are zero rows like _pad_hand
+    units = lstm_recurrent.shape[0]
+    h = np.zeros(units)
+    c = np.zeros(units)
+    for t in range(3):
+        z = _affine(h, lstm_recurrent, _affine(state[3 * t:3 * t + 3], lstm_kernel, lstm_bias))
+        i = _sigmoid(z[:units])
+        f = _sigmoid(z[units:2 * units])
+        g = np.tanh(z[2 * units:3 * units])
+        o = _sigmoid(z[3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+
+    context = np.maximum(_affine(state[9:], context_w1, context_b1), 0.0)
+    context = np.maximum(_affine(context, context_w2, context_b2), 0.0)
+
+    hidden = np.maximum(_affine(np.concatenate((h, context)), hidden_w1, hidden_b1), 0.0)
+    hidden = np.maximum(_affine(hidden, hidden_w2, hidden_b2), 0.0)
+    return _affine(hidden, q_w, q_b)
+
+
+def q_values(state, net):
+    """
+    DQNv3 Q-values of one state_v3 flattened (padded hand then context)
+    from weights packed by pack_net, NumPy inference without TensorFlow
+    """
+    return _net_q_values(np.ascontiguousarray(state, dtype=np.float64), net)
+
+
+@njit(cache=True)
+def _discard_cost(card, briscola_suit):
+    # keep briscole first, then points, then strength inside the suit
+    return (SUIT_TABLE[card] == briscola_suit) * 1000 + POINTS_TABLE[card] * 10 + RANK_TABLE[card]
+
+
+@njit(cache=True)
+def greedy_action(hand, count, table, table_count, briscola_suit):
+    """Take the trick with the cheapest card that wins it, else throw the cheapest card"""
+    best = -1
+    best_cost = 1 << 30
+
+    if table_count > 0:
+        strength = STRENGTH_TABLE[briscola_suit, SUIT_TABLE[table[0]]]
+        top = 0
+        for i in range(table_count):
+            if strength[table[i]] > top:
+                top = strength[table[i]]
+        for k in range(count):
+            cost = _discard_cost(hand[k], briscola_suit)
+            if strength[hand[k]] > top and cost < best_cost:
+                best = k
+                best_cost = cost
+        if best >= 0:
+            return best
+
+    for k in range(count):
+        cost = _discard_cost(hand[k], briscola_suit)
+        if cost < best_cost:
+            best = k
+            best_cost = cost
+    return best
+
+
+@njit(cache=True)
+def _write_state(state, hand, count, briscola, table, table_count, turn):
+    # state_v3: hand rows (zero padded), briscola, 3 table slots, hand size, turn, table size
+    for k in range(3):
+        card = hand[k] if k < count else -1
+        state[3 * k:3 * k + 3] = FEATURE_TABLE[card]
+    state[9:12] = FEATURE_TABLE[briscola]
+    for i in range(3):
+        card = table[i] if i < table_count else -1
+        state[12 + 3 * i:15 + 3 * i] = FEATURE_TABLE[card]
+    state[21] = count
+    state[22] = turn + 1
+    state[23] = table_count
+
+
+@njit(cache=True)
+def _play_game(g, decks, policies, noise, epsilon, net, record,
+               states, actions, rewards, lengths, wins, winners, returns):
+    num_players = policies.shape[0]
+    deck_size = decks.shape[2]
+    dealt = 3 * num_players
+    turns = deck_size // num_players
+
+    hands = np.full((num_players, 3), -1, dtype=np.int64)
+    hand_count = np.zeros(num_players, dtype=np.int64)
+    table = np.full(4, -1, dtype=np.int64)
+    talon = np.empty(deck_size, dtype=np.int64)
+    points = np.zeros(num_players, dtype=np.int64)
+    step = np.zeros(num_players, dtype=np.int64)
+    state = np.zeros(STATE_SIZE, dtype=np.float32)
+
+    leader = 0
+    for round_index in range(decks.shape[1]):
+        deck = decks[g, round_index]
+
+        # the seat after the winner of the last trick leads the round
+        leader = (leader + 1) % num_players
+        points[:] = 0
+
+        # give 3 cards to each player, one at a time starting from the leader
+        hand_count[:] = 0
+        for k in range(dealt):
+            seat = (leader + k) % num_players
+            hands[seat, hand_count[seat]] = deck[k]
+            hand_count[seat] += 1
+
+        # take the briscola card and place it under the deck
+        briscola = deck[dealt]
+        briscola_suit = SUIT_TABLE[briscola]
+        talon[:dealt] = deck[:dealt]
+        talon[dealt:deck_size - 1] = deck[dealt + 1:]
+        talon[deck_size - 1] = briscola
+        deck_pos = dealt
+
+        for turn in range(turns):
+            for i in range(num_players):
+                seat = (leader + i) % num_players
+                count = hand_count[seat]
+                policy = policies[seat]
+                u = noise[g, seat, step[seat]]
+
+                if record or policy == POLICY_NET:
+                    _write_state(state, hands[seat], count, briscola, table, i, turn)
+
+                if policy == POLICY_GREEDY:
+                    action = greedy_action(hands[seat], count, table, i, briscola_suit)
+                elif policy == POLICY_NET and u >= epsilon:
+                    q_values = _net_q_values(state, net)
+                    action = 0
+                    for k in range(1, count):
+                        if q_values[k] > q_values[action]:
+                            action = k
+                elif policy == POLICY_NET:
+                    # exploring, u / epsilon is uniform again
+                    action = int(u / epsilon * count)
+                else:
+                    action = int(u * count)
+
+                if record:
+                    states[g, seat, step[seat]] = state
+                    actions[g, seat, step[seat]] = action
+                step[seat] += 1
+
+                # remove the played card, keeping the order of the others
+                table[i] = hands[seat, action]
+                for k in range(action, count - 1):
+                    hands[seat, k] = hands[seat, k + 1]
+                hands[seat, count - 1] = -1
+                hand_count[seat] = count - 1
+
+            strength = STRENGTH_TABLE[briscola_suit, SUIT_TABLE[table[0]]]
+            winning_pos = 0
+            trick_points = 0
+            for i in range(num_players):
+                trick_points += POINTS_TABLE[table[i]]
+                if strength[table[i]] > strength[table[winning_pos]]:
+                    winning_pos = i
+            winner = (leader + winning_pos) % num_players
+
+            # Same rewards as BriscolaEnv._endTrick
+            for i in range(num_players):
+                seat = (leader + i) % num_players
+                card_points = POINTS_TABLE[table[i]]
+                if i == winning_pos:
+                    reward = (trick_points - card_points) * PESO_TURNO
+                else:
+                    reward = -card_points * PESO_PERDITA
+                returns[g, seat] += reward
+                if record:
+                    rewards[g, seat, step[seat] - 1] += reward
+
+            points[winner] += trick_points
+            leader = winner
+            table[:] = -1
+
+            # everyone draws a card, starting from the trick winner
+            if deck_pos < deck_size:
+                for i in range(num_players):
+                    seat = (winner + i) % num_players
+                    hands[seat, hand_count[seat]] = talon[deck_pos + i]
+                    hand_count[seat] += 1
+                deck_pos += num_players
+
+        # Same round bonus as BriscolaEnv._endRound, ties go to the first in
+        # turn order from the last trick winner
+        round_winner = leader
+        for i in range(1, num_players):
+            seat = (leader + i) % num_players
+            if points[seat] > points[round_winner]:
+                round_winner = seat
+        wins[g, round_winner] += 1
+        returns[g, round_winner] += BONUS_ROUND
+        if record:
+            rewards[g, round_winner, step[round_winner] - 1] += BONUS_ROUND
+
+        if wins[g, round_winner] >= ROUNDS_TO_WIN:
+            winners[g] = round_winner
+            break
+
+    lengths[g] = step
+
+
+@njit(cache=True)
+def _play_games(decks, policies, noise, epsilon, net, record,
+                states, actions, rewards, lengths, wins, winners, returns):
+    for g in range(decks.shape[0]):
+        _play_game(g, decks, policies, noise, epsilon, net, record,
+                   states, actions, rewards, lengths, wins, winners, returns)
+
+
+def play_games(num_games, policies, net=None, epsilon=0.0, record=True,
+               root_seed=None, worker_id=0, first_game=0):
+    """
+    Play num_games complete games with one policy per seat
+
+    - policies: 'random', 'greedy' or 'net' for every seat, the number of
+      seats is the number of players
+    - net: weights from pack_net, required by 'net' seats, which play
+      epsilon-greedy
+    - record: keep the state, action and reward of every decision
+    - game g is game_index first_game + g of (root_seed, worker_id), its
+      decks are the ones BriscolaEnv deals and every seat draws its
+      randomness from its own seat stream
+
+    Returns a GameBatch
+    """
+    num_players = len(policies)
+    if num_players < 2 or num_players > 4:
+        raise ValueError("Briscola requires 2-4 players")
+
+    codes = []
+    for policy in policies:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}', expected one of {list(POLICIES)}")
+        codes.append(POLICIES[policy])
+    codes = np.array(codes, dtype=np.int64)
+
+    if net is None:
+        if POLICY_NET in codes:
+            raise ValueError("'net' seats require the network weights")
+        net = _empty_net()
+
+    deck = base_deck(num_players)
+    deck_size = len(deck)
+
+    # enough decks and decisions for the longest possible game
+    max_rounds = num_players * (ROUNDS_TO_WIN - 1) + 1
+    max_steps = max_rounds * (deck_size // num_players)
+
+    # same draws as consecutive shuffled_deck calls on each game's deck stream
+    seeder = GameSeeder(root_seed, worker_id)
+    keys = np.empty((num_games, max_rounds, deck_size))
+    noise = np.empty((num_games, num_players, max_steps))
+    for g in range(num_games):
+        game_index = first_game + g
+        keys[g] = seeder.deck_rng(game_index).random((max_rounds, deck_size))
+        for seat in range(num_players):
+            noise[g, seat] = seeder.seat_rng(game_index, seat).random(max_steps)
+    decks = deck[np.argsort(keys, axis=2)]
+
+    if record:
+        states = np.zeros((num_games, num_players, max_steps, STATE_SIZE), dtype=np.float32)
+        actions = np.zeros((num_games, num_players, max_steps), dtype=np.int64)
+        rewards = np.zeros((num_games, num_players, max_steps), dtype=np.float32)
+    else:
+        states = np.zeros((0, 0, 0, STATE_SIZE), dtype=np.float32)
+        actions = np.zeros((0, 0, 0), dtype=np.int64)
+        rewards = np.zeros((0, 0, 0), dtype=np.float32)
+
+    lengths = np.zeros((num_games, num_players), dtype=np.int64)
+    wins = np.zeros((num_games, num_players), dtype=np.int64)
+    winners = np.full(num_games, -1, dtype=np.int64)
+    returns = np.zeros((num_games, num_players), dtype=np.float64)
+
+    _play_games(decks, codes, noise, float(epsilon), net, record,
+                states, actions, rewards, lengths, wins, winners, returns)
+
+    if not record:
+        states = actions = rewards = None
+    return GameBatch(winners, wins, returns, states, actions, rewards, lengths)
@@ -0,0 +1,215 @@
+"""
+Asynchronous pool of Briscola games
+Worker processes run BriscolaEnv games and play the scripted seats
+themselves, the learner only receives the games waiting on one of its
+seats, as soon as they are ready
+"""
+import collections
+import ctypes
+import multiprocessing as mp
+import os
+import random
+
+import numpy as np
+
+from .briscola import BriscolaEnv
+from .kernel import greedy_action
+from .heuristics import HEURISTIC_POLICIES, state_action
+
+# Seat policies resolved inside the workers, None is a learner seat
+SCRIPTED_POLICIES = ('random',) + HEURISTIC_POLICIES
+
+
+def scripted_action(policy, state, seat, rng):
+    hand = state.hands[seat]
+    if policy == 'random':
+        return rng.randrange(len(hand))
+    if policy != 'greedy':
+        return state_action(policy, state, seat)
+    # the table gets a padding slot so that it is never an empty array
+    return greedy_action(np.array(hand), len(hand), np.array(state.table + [-1]),
+                         len(state.table), state.briscola_suit)
+
+
+def _worker(env_ids, player_names, seat_policies, root_seed, shared, commands, ready):
+    obs, seats, rewards, dones, winners = [np.frombuffer(array, dtype=dtype).reshape(shape)
+                                           for array, dtype, shape in shared]
+
+    # every game slot is its own seeding worker, so slots never share a stream
+    envs = {env_id: BriscolaEnv(player_names, observation_mode='v3_arrays',
+                                root_seed=root_seed, worker_id=env_id)
+            for env_id in env_ids}
+    rngs = {env_id: [random.Random() for _ in seat_policies] for env_id in env_ids}
+
+    def start(env_id):
+        env = envs[env_id]
+        seat, observation = env.start()
+        for s, rng in enumerate(rngs[env_id]):
+            rng.seed(env.seat_seed(s))
+        return seat, observation
+
+    def advance(env_id, action):
+        # play until a learner seat has to decide, restarting finished games
+        env = envs[env_id]
+        rewards[env_id] = 0
+        dones[env_id] = False
+        winners[env_id] = -1
+
+        if action is None:
+            seat, observation = start(env_id)
+        else:
+            seat, observation, reward, done = env.play(action)
+            rewards[env_id] += reward
+            if done:
+                dones[env_id] = True
+                winners[env_id] = env.outcomes[-1].winner
+                seat, observation = start(env_id)
+
+        while seat_policies[seat] is not None:
+            action = scripted_action(seat_policies[seat], env.state, seat, rngs[env_id][seat])
+            seat, observation, reward, done = env.play(action)
+            rewards[env_id] += reward
+            if done:
+                dones[env_id] = True
+                winners[env_id] = env.outcomes[-1].winner
+                seat, observation = start(env_id)
+
+        state = observation['data']['state_v3']
+        obs[env_id, :9] = state['hand'].reshape(9)
+        obs[env_id, 9:] = state['context']
+        seats[env_id] = seat
+
+    while True:
+        command = commands.recv()
+        if command is None:
+            break
+        ids, actions = command
+        for env_id, action in zip(ids, actions):
+            advance(env_id, action)
+        ready.put(ids)
+
+
+class BriscolaEnvPool:
+    """
+    EnvPool-style asynchronous Briscola games:
+    - seat_policies: one entry per seat, None for the seats played by the
+      learner, one of SCRIPTED_POLICIES for seats played inside the workers
+    - send(actions, env_ids) plays the learner's cards, recv() returns the
+      first batch_size games waiting on a learner decision, whichever worker
+      they come from
+
+    Observations are written by the workers into shared memory, recv()
+    returns (env_ids, seats, obs) with obs:
+    - hand: (B, 3, 3), context: (B, 15) the state_v3 of the seat to play
+    - rewards: (B, num_players) rewards of every seat since the last send
+    - done: (B,) the game ended since the last send, the observation is
+      already the first decision of the next game
+    - game_winner: (B,) winning seat of ended games, else -1
+
+    Game slot i deals the games of BriscolaEnv(root_seed, worker_id=i)
+    """
+
+    def __init__(self, num_envs, seat_policies, batch_size=None, num_workers=None, root_seed=None, context=None):
+        num_players = len(seat_policies)
+        if num_players < 2 or num_players > 4:
+            raise ValueError("Briscola requires 2-4 players")
+        for policy in seat_policies:
+            if policy is not None and policy not in SCRIPTED_POLICIES:
+                raise ValueError(f"Unknown seat policy '{policy}', expected None or one of {SCRIPTED_POLICIES}")
+        if all(policy is not None for policy in seat_policies):
+            raise ValueError("At least one seat must be played by the learner")
+
+        if batch_size is None:
+            batch_size = num_envs
+        if batch_size < 1 or batch_size > num_envs:
+            raise ValueError("batch_size must be between 1 and num_envs")
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        num_workers = min(num_workers, num_envs)
+
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+
+        # shared observation arrays, one row per game slot
+        specs = [(ctypes.c_float, np.float32, (num_envs, 24)),
+                 (ctypes.c_int8, np.int8, (num_envs,)),
+                 (ctypes.c_float, np.float32, (num_envs, num_players)),
+                 (ctypes.c_bool, np.bool_, (num_envs,)),
+                 (ctypes.c_int8, np.int8, (num_envs,))]
+        shared = [(mp.RawArray(ctype, int(np.prod(shape))), dtype, shape) for ctype, dtype, shape in specs]
+        self._obs, self._seats, self._rewards, self._dones, self._winners = [
+            np.frombuffer(array, dtype=dtype).reshape(shape) for array, dtype, shape in shared]
+
+        # game slot i is run by worker i % num_workers
+        player_names = ['Seat {0}'.format(seat) for seat in range(num_players)]
+        ctx = mp.get_context(context)
+        self._ready = ctx.SimpleQueue()
+        self._commands = []
+        self._workers = []
+        for w in range(num_workers):
+            parent, child = ctx.Pipe()
+            worker = ctx.Process(target=_worker, daemon=True,
+                                 args=(list(range(w, num_envs, num_workers)), player_names,
+                                       list(seat_policies), root_seed, shared, child, self._ready))
+            worker.start()
+            child.close()
+            self._commands.append(parent)
+            self._workers.append(worker)
+
+        self._pending = collections.deque()
+
+
+    def _dispatch(self, env_ids, actions):
+        by_worker = [([], []) for _ in range(self.num_workers)]
+        for env_id, action in zip(env_ids, actions):
+            ids, worker_actions = by_worker[env_id % self.num_workers]
+            ids.append(env_id)
+            worker_actions.append(action)
+        for w, command in enumerate(by_worker):
+            if command[0]:
+                self._commands[w].send(command)
+
+
+    def reset(self):
+        """Start a game in every slot, the first decisions come from recv()"""
+        self._pending.clear()
+        self._dispatch(range(self.num_envs), [None] * self.num_envs)
+
+
+    def send(self, actions, env_ids):
+        """Play actions[i] (card index) in game env_ids[i], the slot must come from recv()"""
+        env_ids = [int(env_id) for env_id in env_ids]
+        actions = [int(action) for action in actions]
+        for env_id, action in zip(env_ids, actions):
+            hand_size = self._obs[env_id, 21]
+            if action < 0 or action >= hand_size:
+                raise ValueError("Invalid card index for the current hand")
+        self._dispatch(env_ids, actions)
+
+
+    def recv(self):
+        """Wait for batch_size games waiting on a learner seat, returns (env_ids, seats, obs)"""
+        while len(self._pending) < self.batch_size:
+            self._pending.extend(self._ready.get())
+
+        env_ids = np.array([self._pending.popleft() for _ in range(self.batch_size)], dtype=np.int64)
+        state = self._obs[env_ids]
+        obs = {
+            'hand': state[:, :9].reshape(-1, 3, 3),
+            'context': state[:, 9:],
+            'rewards': self._rewards[env_ids],
+            'done': self._dones[env_ids],
+            'game_winner': self._winners[env_ids].astype(np.int64)
+        }
+        return env_ids, self._seats[env_ids].astype(np.int64), obs
+
+
+    def close(self):
+        for command in self._commands:
+            command.send(None)
+        for worker in self._workers:
+            worker.join()
+        self._commands = []
+        self._workers = []
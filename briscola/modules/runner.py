@@ -0,0 +1,101 @@
+"""
+Game loop shared by train.py, test.py and play.py
+Drives BriscolaEnv through the decision-point API and delivers to each
+agent only the events it declared
+"""
+from collections import namedtuple
+
+from .events import EVENT_NAMES, BROADCAST_EVENTS, ALL_EVENTS
+
+# Result of a game, lists are by seat
+GameResult = namedtuple('GameResult', ['winner', 'wins', 'points', 'rewards'])
+
+
+class GameRunner:
+    """
+    Plays games between agents seated in the order of the env's playerNames
+
+    - agent.events: set of event codes (modules.events) the agent consumes,
+      broadcasts go to agent.act(observation) only for these codes. The
+      agent of the seat that has to play is always asked for its card.
+      Agents without the attribute get every event
+    - subscribe(code, callback): callback(observation, reward) on a broadcast
+      event, reward is a list by seat or None
+    - on_decision(callback): callback(seat, observation, card) after every
+      card chosen
+    - close(): remove the runner's listeners from the env, before another
+      runner is built on it (they would keep delivering to these agents)
+    """
+
+    def __init__(self, env, agents):
+        if len(agents) != env.num_players:
+            raise ValueError(f"Expected {env.num_players} agents, got {len(agents)}")
+
+        self.env = env
+        self.agents = list(agents)
+        self._decision_hooks = []
+        self._env_callbacks = {}  # event code -> callback registered on the env
+
+        # listeners by event code, the env builds only the observations someone reads
+        self._listeners = [[] for _ in EVENT_NAMES]
+        for code in BROADCAST_EVENTS:
+            for agent in self.agents:
+                if code in getattr(agent, 'events', ALL_EVENTS):
+                    self.subscribe(code, self._deliver(agent))
+
+
+    @staticmethod
+    def _deliver(agent):
+        def callback(observation, reward):
+            agent.act(observation)
+        return callback
+
+
+    def subscribe(self, code, callback):
+        listeners = self._listeners[code]
+        if code not in self._env_callbacks:
+            # one env listener per event code, dispatching to this list
+            self._env_callbacks[code] = self._dispatch(listeners)
+            self.env.subscribe(EVENT_NAMES[code], self._env_callbacks[code])
+        listeners.append(callback)
+
+    def on_decision(self, callback):
+        self._decision_hooks.append(callback)
+
+    def close(self):
+        for code, callback in self._env_callbacks.items():
+            self.env.unsubscribe(EVENT_NAMES[code], callback)
+        self._env_callbacks = {}
+        self._listeners = [[] for _ in EVENT_NAMES]
+        self._decision_hooks = []
+
+
+    @staticmethod
+    def _dispatch(listeners):
+        def callback(observation, reward):
+            for listener in listeners:
+                listener(observation, reward)
+        return callback
+
+
+    def play_game(self, seed=None, options=None):
+        """Play a full game, every agent is reseeded from its seat stream"""
+        env = self.env
+        seat, observation = env.start(seed, options)
+        for agent_seat, agent in enumerate(self.agents):
+            agent.seed(env.seat_seed(agent_seat))
+
+        rewards = [0] * env.num_players
+        done = False
+        while not done:
+            action = self.agents[seat].act(observation)
+            card = action['data']['action']['card']
+            for hook in self._decision_hooks:
+                hook(seat, observation, card)
+
+            seat, observation, reward, done = env.play(card)
+            for i in range(env.num_players):
+                rewards[i] += reward[i]
+
+        winner, wins = env.outcomes[-1]
+        return GameResult(winner, wins, list(env.state.points), rewards)
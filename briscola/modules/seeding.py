@@ -0,0 +1,49 @@
+"""
+Independent random streams for reproducible parallel rollouts
+Every game is replayable from (root_seed, worker_id, game_index) alone:
+its deck and the exploration of each seat come from their own stream
+"""
+import numpy as np
+
+# Streams of a game, the agent sitting at seat s uses SEAT_STREAM + s
+DECK_STREAM = 0
+SEAT_STREAM = 1
+
+
+def game_seed_sequence(root_seed, worker_id, game_index, stream=DECK_STREAM):
+    return np.random.SeedSequence(root_seed, spawn_key=(worker_id, game_index, stream))
+
+
+def shuffled_deck(rng, base_deck):
+    """Same shuffle in BriscolaEnv and BriscolaVecEnv, so both deal the same games"""
+    return base_deck[np.argsort(rng.random(len(base_deck)))]
+
+
+class GameSeeder:
+    """
+    Hands out the random streams of consecutive games of one worker.
+    Workers only need a different worker_id to never share a stream.
+    """
+
+    def __init__(self, root_seed=None, worker_id=0):
+        if root_seed is None:
+            root_seed = np.random.SeedSequence().entropy
+        self.root_seed = root_seed
+        self.worker_id = worker_id
+        self.game_index = 0
+
+    def next_game(self):
+        game_index = self.game_index
+        self.game_index += 1
+        return game_index
+
+    def deck_rng(self, game_index):
+        return np.random.default_rng(game_seed_sequence(self.root_seed, self.worker_id, game_index))
+
+    def seat_rng(self, game_index, seat):
+        return np.random.default_rng(game_seed_sequence(self.root_seed, self.worker_id, game_index, SEAT_STREAM + seat))
+
+    def seat_seed(self, game_index, seat):
+        """Integer seed for the exploration of the agent at seat"""
+        seed_sequence = game_seed_sequence(self.root_seed, self.worker_id, game_index, SEAT_STREAM + seat)
+        return int(seed_sequence.generate_state(1, np.uint64)[0])
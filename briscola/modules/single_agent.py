@@ -0,0 +1,136 @@
+"""
+Single-agent Briscola environment
+One learning seat against opponents played inside the environment, with
+flat Box/Discrete spaces and an action mask, so that it runs under
+Stable-Baselines3 DummyVecEnv/SubprocVecEnv
+"""
+import random
+
+import numpy as np
+from gymnasium import Env, spaces
+
+from .briscola import BriscolaEnv
+from .pool import SCRIPTED_POLICIES, scripted_action
+
+
+class BriscolaSingleAgentEnv(Env):
+    """
+    BriscolaEnv seen from one seat:
+    - observation: state_v3 flattened, padded hand (3x3) then context (15)
+    - action: index of the card to play, an index past the end of the hand
+      plays the card at action % hand_size (see action_masks())
+    - reward: turn rewards and round bonus of the seat since its last card
+    - terminated when the game is over, info['game_winner'] is the winning seat
+
+    opponents: one policy for every other seat, in seat order, either
+    one of SCRIPTED_POLICIES ('random' or a modules.heuristics rule) or an agent with act(observation) like RandomAI or a
+    DQN agent loaded from a checkpoint (set its epsilon to 0 to freeze it).
+    Agents see the observations of BriscolaEnv, so their names are the
+    player names.
+    """
+
+    metadata = {'render_modes': ['human']}
+
+    def __init__(self, seat=0, opponents=('random', 'random', 'random'), observation_mode=None,
+                 root_seed=None, worker_id=0, render_mode=None):
+        num_players = len(opponents) + 1
+        if num_players < 2 or num_players > 4:
+            raise ValueError("Briscola requires 2-4 players")
+        if seat < 0 or seat >= num_players:
+            raise ValueError(f"Seat {seat} out of range for {num_players} players")
+
+        self.seat = seat
+        self.num_players = num_players
+        self.render_mode = render_mode
+
+        # policy of every seat, None is the learning seat
+        self.policies = list(opponents)
+        self.policies.insert(seat, None)
+
+        player_names = []
+        for s, policy in enumerate(self.policies):
+            if policy is None:
+                player_names.append('Agent')
+            elif isinstance(policy, str):
+                if policy not in SCRIPTED_POLICIES:
+                    raise ValueError(f"Unknown opponent '{policy}', expected an agent or one of {SCRIPTED_POLICIES}")
+                player_names.append('Seat {0}'.format(s))
+            else:
+                player_names.append(policy.name)
+
+        # agents read the full observations, scripted seats only the game state
+        if observation_mode is None:
+            scripted = all(policy is None or isinstance(policy, str) for policy in self.policies)
+            observation_mode = 'v3_arrays' if scripted else 'all'
+
+        self.game = BriscolaEnv(player_names, observation_mode=observation_mode,
+                                root_seed=root_seed, worker_id=worker_id)
+        self._rngs = [random.Random() for _ in self.policies]
+
+        self.observation_space = spaces.Box(low=0, high=20, shape=(24,), dtype=np.float32)
+        self.action_space = spaces.Discrete(3)
+
+        self._hand_size = 0
+
+
+    def _encode(self, observation):
+        state = observation['data']['state_v3']
+        encoded = np.zeros(24, dtype=np.float32)
+        hand = np.asarray(state['hand'], dtype=np.float32).reshape(-1)
+        encoded[:len(hand)] = hand
+        encoded[9:] = state['context']
+        return encoded
+
+
+    def _opponent_action(self, seat, observation):
+        policy = self.policies[seat]
+        if isinstance(policy, str):
+            return scripted_action(policy, self.game.state, seat, self._rngs[seat])
+        return policy.act(observation)['data']['action']['card']
+
+
+    def _advance(self, seat, observation, reward, done):
+        # opponents play until it's the agent's turn or the game is over
+        while not done and seat != self.seat:
+            seat, observation, rewards, done = self.game.play(self._opponent_action(seat, observation))
+            reward += rewards[self.seat]
+
+        if done:
+            self._hand_size = 0
+            info = {'game_winner': self.game.outcomes[-1].winner, 'wins': self.game.outcomes[-1].wins}
+            return np.zeros(24, dtype=np.float32), reward, True, info
+
+        self._hand_size = observation['data']['hand_size']
+        return self._encode(observation), reward, False, {}
+
+
+    def action_masks(self):
+        """Cards that can be played, for maskable policies"""
+        return np.arange(3) < self._hand_size
+
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+
+        seat, observation = self.game.start(seed, options)
+        for s, policy in enumerate(self.policies):
+            self._rngs[s].seed(self.game.seat_seed(s))
+            if policy is not None and not isinstance(policy, str):
+                policy.seed(self.game.seat_seed(s))
+
+        observation, _, _, info = self._advance(seat, observation, 0, False)
+        return observation, info
+
+
+    def step(self, action):
+        if self._hand_size == 0:
+            raise ValueError("The game is over, call reset()")
+
+        action = int(action) % self._hand_size
+        seat, observation, rewards, done = self.game.play(action)
+        observation, reward, terminated, info = self._advance(seat, observation, rewards[self.seat], done)
+        return observation, float(reward), terminated, False, info
+
+
+    def render(self):
+        self.game.render()
@@ -0,0 +1,167 @@
+"""
+Exact endgame solver
+Once the deck is exhausted the last tricks are a small perfect-information
+game: alpha-beta search over GameState make/unmake move, with move
+ordering and a transposition table on Zobrist keys (modules/canonical.py)
+"""
+from .cards import CARD_SUIT, CARD_POINTS, CARD_RANK, TRICK_STRENGTH, trick_winner
+from .canonical import zobrist_hash, zobrist_make, zobrist_unmake
+
+# Transposition table bounds
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Above any number of points left in a round
+_INFINITY = 1000
+
+
+class EndgameSolver:
+    """
+    Point-optimal play once the deck is exhausted
+
+    The value of a position for a seat is the number of points the seat
+    takes from the cards still in the hands and on the table. With 2
+    players it is exact minimax; with 3-4 players every other seat plays
+    against the seat (paranoid search), so the value is what the seat can
+    guarantee.
+
+    The transposition table is kept between calls: values do not depend on
+    the points already taken, so positions of the same round and of later
+    rounds are reused. It is cleared when it reaches max_entries
+    """
+
+    def __init__(self, max_entries=1000000):
+        self.max_entries = max_entries
+        self.table = {}
+        self.nodes = 0
+
+
+    def clear(self):
+        self.table = {}
+
+
+    def _check(self, state):
+        if state.deck_remaining() > 0:
+            raise ValueError("The deck is not exhausted, the position is not an endgame")
+        if state.round_over():
+            raise ValueError("The round is over")
+        if len(self.table) >= self.max_entries:
+            self.table = {}
+
+
+    def solve(self, state, seat=None):
+        """
+        Best move of the seat to play, seat is the point of view (default:
+        the seat to play). Returns (index, value): index in the hand of the
+        seat to play and points taken by seat with optimal play
+        """
+        self._check(state)
+        state = state.clone()
+        if seat is None:
+            seat = state.current_seat()
+
+        value, index = self._search(state, seat, zobrist_hash(state), -_INFINITY, _INFINITY)
+        return index, value
+
+
+    def move_values(self, state, seat=None):
+        """Exact value for seat of every card the seat to play can play, by hand index"""
+        self._check(state)
+        state = state.clone()
+        if seat is None:
+            seat = state.current_seat()
+
+        key = zobrist_hash(state)
+        values = []
+        for index in range(len(state.hands[state.current_seat()])):
+            undo, child = zobrist_make(state, index, key)
+            gained = undo[4] if undo[1] is not None and undo[3] == seat else 0
+            value, _ = self._search(state, seat, child, -_INFINITY, _INFINITY)
+            values.append(gained + value)
+            zobrist_unmake(state, undo, child)
+        return values
+
+
+    def _ordered_moves(self, state, best):
+        hand = state.hands[state.current_seat()]
+        table = state.table
+
+        # follow with the strongest card first, lead with the points first
+        if table:
+            strength = TRICK_STRENGTH[state.briscola_suit][CARD_SUIT[table[0]]]
+            moves = sorted(range(len(hand)), key=lambda i: (-strength[hand[i]], -CARD_POINTS[hand[i]]))
+        else:
+            moves = sorted(range(len(hand)), key=lambda i: (-CARD_POINTS[hand[i]], -CARD_RANK[hand[i]]))
+
+        if best is not None and best in moves:
+            moves.remove(best)
+            moves.insert(0, best)
+        return moves
+
+
+    def _last_trick(self, state, seat):
+        # every hand holds its last card, the trick is forced
+        P = state.num_players
+        leader = state.leader
+        cards = state.table + [state.hands[(leader + i) % P][0] for i in range(len(state.table), P)]
+        if (leader + trick_winner(cards, state.briscola_suit)) % P != seat:
+            return 0
+        return sum(CARD_POINTS[card] for card in cards)
+
+
+    def _search(self, state, seat, key, alpha, beta):
+        """(value, best index) of the position for seat, fail-soft alpha-beta"""
+        if state.round_over():
+            return 0, None
+        self.nodes += 1
+        if state.turn == state.turns - 1:
+            return self._last_trick(state, seat), 0
+
+        # the key does not depend on the order of the hand, entries keep the
+        # best card and not its index
+        hand = state.hands[state.current_seat()]
+        entry_key = (key, seat, state.briscola_suit)
+        entry = self.table.get(entry_key)
+        best_index = None
+        if entry is not None:
+            value, flag, best_card = entry
+            best_index = hand.index(best_card)
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value, best_index
+
+        alpha_start, beta_start = alpha, beta
+        maximizing = state.current_seat() == seat
+        best = -_INFINITY if maximizing else _INFINITY
+
+        for index in self._ordered_moves(state, best_index):
+            undo, child = zobrist_make(state, index, key)
+            gained = undo[4] if undo[1] is not None and undo[3] == seat else 0
+            value, _ = self._search(state, seat, child, alpha - gained, beta - gained)
+            value += gained
+            zobrist_unmake(state, undo, child)
+
+            if maximizing:
+                if value > best:
+                    best, best_index = value, index
+                alpha = max(alpha, best)
+            else:
+                if value < best:
+                    best, best_index = value, index
+                beta = min(beta, best)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_start:
+            flag = UPPER
+        elif best >= beta_start:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[entry_key] = (best, flag, hand[best_index])
+        return best, best_index
+
+
+def solve(state, seat=None):
+    """EndgameSolver().solve(state, seat) with a fresh transposition table"""
+    return EndgameSolver().solve(state, seat)
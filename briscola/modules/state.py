@@ -0,0 +1,175 @@
+"""
+Compact Briscola game state
+Fixed-size slots with O(1) make/unmake move and cheap clone, used by
+BriscolaEnv and by search-based agents
+"""
+from .cards import CARD_SUIT, CARD_POINTS, ROUNDS_TO_WIN, trick_winner
+
+
+class GameState:
+    """
+    Full state of a Briscola game, seats are integers 0..num_players-1
+
+    - deck: card ids in draw order, the briscola is the last card. The list
+      is never modified after the deal, deck_pos is the next card to draw,
+      so clones can share it
+    - hands: one list of card ids per seat, in the order they were received
+    - table: cards played in the current trick, table[i] belongs to seat
+      (leader + i) % num_players
+    """
+
+    __slots__ = ('num_players', 'rounds_to_win', 'deck', 'deck_pos', 'briscola', 'briscola_suit',
+                 'hands', 'table', 'leader', 'turn', 'turns', 'round',
+                 'points', 'wins')
+
+    def __init__(self, num_players, rounds_to_win=ROUNDS_TO_WIN):
+        self.num_players = num_players
+        self.rounds_to_win = rounds_to_win
+
+        self.deck = []
+        self.deck_pos = 0
+        self.briscola = None
+        self.briscola_suit = None
+
+        self.hands = [[] for _ in range(num_players)]
+        self.table = []
+        self.leader = 0
+
+        self.turn = 0
+        self.turns = 0
+        self.round = 0
+
+        self.points = [0] * num_players
+        self.wins = [0] * num_players
+
+
+    def clone(self):
+        other = GameState.__new__(GameState)
+        other.num_players = self.num_players
+        other.rounds_to_win = self.rounds_to_win
+        other.deck = self.deck
+        other.deck_pos = self.deck_pos
+        other.briscola = self.briscola
+        other.briscola_suit = self.briscola_suit
+        other.hands = [hand[:] for hand in self.hands]
+        other.table = self.table[:]
+        other.leader = self.leader
+        other.turn = self.turn
+        other.turns = self.turns
+        other.round = self.round
+        other.points = self.points[:]
+        other.wins = self.wins[:]
+        return other
+
+
+    def current_seat(self):
+        return (self.leader + len(self.table)) % self.num_players
+
+    def deck_remaining(self):
+        return len(self.deck) - self.deck_pos
+
+    def round_over(self):
+        return self.turn >= self.turns
+
+    def game_over(self):
+        return max(self.wins) >= self.rounds_to_win
+
+
+    def reset_game(self):
+        self.round = 0
+        self.leader = 0
+        self.wins = [0] * self.num_players
+
+
+    def new_round(self, deck):
+        """
+        Deal a shuffled deck, the seat after the winner of the last trick
+        leads the round (seat 1 the first one)
+        """
+        P = self.num_players
+        dealt = 3 * P
+
+        self.round += 1
+        self.leader = (self.leader + 1) % P
+        self.turn = 0
+        self.turns = len(deck) // P
+        self.points = [0] * P
+        self.table = []
+
+        # give 3 cards to each player, one at a time starting from the leader
+        self.hands = [[] for _ in range(P)]
+        for k in range(dealt):
+            self.hands[(self.leader + k) % P].append(deck[k])
+
+        # take the briscola card and place it under the deck
+        self.briscola = deck[dealt]
+        self.briscola_suit = CARD_SUIT[self.briscola]
+        self.deck = deck[:dealt] + deck[dealt + 1:] + [self.briscola]
+        self.deck_pos = dealt
+
+
+    def end_round(self):
+        """
+        Give the round to the player with most points, ties go to the first
+        of them in turn order from the winner of the last trick
+        """
+        P = self.num_players
+        winner = max(((self.leader + i) % P for i in range(P)), key=self.points.__getitem__)
+        self.wins[winner] += 1
+        return winner
+
+
+    def make_move(self, index):
+        """
+        Current seat plays the card at index of its hand, a full table is
+        resolved and everyone draws a card
+
+        Returns the undo record for unmake_move:
+        - (index, None) if the trick is still open
+        - (index, trick, leader, winner, points, drew) if the card closed it
+        """
+        P = self.num_players
+        card = self.hands[(self.leader + len(self.table)) % P].pop(index)
+        self.table.append(card)
+
+        if len(self.table) < P:
+            return (index, None)
+
+        trick = self.table
+        leader = self.leader
+        winner = (leader + trick_winner(trick, self.briscola_suit)) % P
+        points = 0
+        for played in trick:
+            points += CARD_POINTS[played]
+
+        self.points[winner] += points
+        self.table = []
+        self.leader = winner
+        self.turn += 1
+
+        # everyone draws a card, starting from the trick winner
+        drew = self.deck_pos < len(self.deck)
+        if drew:
+            for i in range(P):
+                self.hands[(winner + i) % P].append(self.deck[self.deck_pos + i])
+            self.deck_pos += P
+
+        return (index, trick, leader, winner, points, drew)
+
+
+    def unmake_move(self, undo):
+        P = self.num_players
+
+        if undo[1] is not None:
+            index, trick, leader, winner, points, drew = undo
+            if drew:
+                self.deck_pos -= P
+                for i in range(P):
+                    self.hands[(winner + i) % P].pop()
+            self.turn -= 1
+            self.leader = leader
+            self.points[winner] -= points
+            self.table = trick
+
+        card = self.table.pop()
+        self.hands[(self.leader + len(self.table)) % P].insert(undo[0], card)
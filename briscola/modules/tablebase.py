@@ -0,0 +1,281 @@
+"""
+2-player endgame tablebase
+Every 2-player position left once the deck is exhausted (1 to 3 cards
+each) solved once, stored in a .npy file and read through a memory map,
+so a query is a few array reads instead of a search.
+
+Positions are relabelled so that the briscola is suit 0 and the other
+three suits come in the canonical order of modules.canonical (by the
+leader's cards, then the follower's), which makes one entry serve every
+suit permutation. Level k holds the positions where the leader is about
+to lead with k cards each, one row per canonical leader hand and one
+column per follower hand among the cards the leader does not hold: the
+number of points the leader takes from there with optimal play. Positions
+with a card on the table are one follower move away from level k - 1.
+
+Build it once with: python -m modules.tablebase [path]
+"""
+import os
+import sys
+from math import comb
+from itertools import combinations
+
+import numpy as np
+
+from .canonical import _suit_order
+from .cards import NUM_CARDS, NUM_SUITS, CARD_SUIT, CARD_POINTS, POINTS_TABLE, SUIT_TABLE, BEATS_TABLE
+
+DEFAULT_PATH = 'learning/tablebase_2p.npy'
+
+# Cards in each hand at the start of a level
+LEVELS = (1, 2, 3)
+
+# _BINOMIAL[n][i] = comb(n, i), for the colex rank of a hand
+_BINOMIAL = [[comb(n, i) for i in range(4)] for n in range(NUM_CARDS)]
+_BINOMIAL_TABLE = np.array(_BINOMIAL, dtype=np.int64)
+
+
+def hand_rank(cards):
+    """Colex rank of a set of cards among the sets of the same size"""
+    rank = 0
+    for i, card in enumerate(sorted(cards), 1):
+        rank += _BINOMIAL[card][i]
+    return rank
+
+
+def _subsets(k, num_cards=NUM_CARDS):
+    # every k-card hand of cards 0 .. num_cards - 1, row r has hand_rank r
+    subsets = np.zeros((comb(num_cards, k), k), dtype=np.int64)
+    for cards in combinations(range(num_cards), k):
+        subsets[hand_rank(cards)] = cards
+    return subsets
+
+
+def _suit_bits(cards):
+    # (m, NUM_SUITS) bitmasks of the values held in every suit, cards: (m, k)
+    bits = np.zeros((len(cards), NUM_SUITS), dtype=np.int64)
+    rows = np.arange(len(cards))
+    for i in range(cards.shape[1]):
+        bits[rows, cards[:, i] // 10] |= 1 << (cards[:, i] % 10)
+    return bits
+
+
+# Canonical leader hands: the non-briscola suits in increasing order of
+# their bitmasks. _LEADERS[k] lists them, _LEADER_INDEX[k][hand_rank] is
+# the row of a canonical hand (-1 for the others)
+_LEADERS = {}
+_LEADER_INDEX = {}
+_FOLLOWERS = {k: comb(NUM_CARDS - k, k) for k in LEVELS}
+_OFFSETS = {}
+_offset = 0
+for _k in LEVELS:
+    _hands = _subsets(_k)
+    _bits = _suit_bits(_hands)[:, 1:]
+    _canonical = (np.diff(_bits, axis=1) >= 0).all(axis=1)
+    _LEADERS[_k] = _hands[_canonical]
+    _LEADER_INDEX[_k] = np.where(_canonical, np.cumsum(_canonical) - 1, -1)
+    _OFFSETS[_k] = _offset
+    _offset += len(_LEADERS[_k]) * _FOLLOWERS[_k]
+TABLE_SIZE = _offset
+del _k, _hands, _bits, _canonical
+
+
+def position_index(leader_hand, follower_hand):
+    """Index of a position in the table, cards with the briscola as suit 0"""
+    signatures = [[0, 0] for _ in range(NUM_SUITS)]
+    for card in leader_hand:
+        signatures[CARD_SUIT[card]][0] |= 1 << (card % 10)
+    for card in follower_hand:
+        signatures[CARD_SUIT[card]][1] |= 1 << (card % 10)
+    suit_map = _suit_order(0, signatures)
+    leader = sorted(suit_map[CARD_SUIT[card]] * 10 + card % 10 for card in leader_hand)
+    follower = sorted(suit_map[CARD_SUIT[card]] * 10 + card % 10 for card in follower_hand)
+
+    # rank of the follower hand among the cards the leader does not hold
+    follower_rank = 0
+    for i, card in enumerate(follower, 1):
+        follower_rank += _BINOMIAL[card - sum(held < card for held in leader)][i]
+    k = len(leader_hand)
+    return _OFFSETS[k] + int(_LEADER_INDEX[k][hand_rank(leader)]) * _FOLLOWERS[k] + follower_rank
+
+
+def _ranks(hands):
+    # hand_rank of every row of sorted (m, k) card arrays
+    rank = _BINOMIAL_TABLE[hands[:, 0], 1]
+    for i in range(1, hands.shape[1]):
+        rank = rank + _BINOMIAL_TABLE[hands[:, i], i + 1]
+    return rank
+
+
+def _follower_ranks(follower, leader):
+    # rank of every follower hand among the cards its leader does not hold
+    shifted = follower.copy()
+    for i in range(leader.shape[1]):
+        shifted -= leader[:, i, None] < follower
+    return _ranks(shifted)
+
+
+def _position_indices(leader, follower):
+    # position_index of every row of two (m, k) card arrays
+    m, k = leader.shape
+    rows = np.arange(m)[:, None]
+    keys = (_suit_bits(leader) << 10 | _suit_bits(follower))[:, 1:]
+    suit_map = np.zeros((m, NUM_SUITS), dtype=np.int64)
+    suit_map[rows, np.argsort(keys, axis=1, kind='stable') + 1] = np.arange(1, NUM_SUITS)
+    leader = np.sort(suit_map[rows, leader // 10] * 10 + leader % 10, axis=1)
+    follower = np.sort(suit_map[rows, follower // 10] * 10 + follower % 10, axis=1)
+    return _OFFSETS[k] + _LEADER_INDEX[k][_ranks(leader)] * _FOLLOWERS[k] + _follower_ranks(follower, leader)
+
+
+def _level_indices(k):
+    # indices[hand_rank(leader), follower rank] of every pair of disjoint k-card hands
+    hands = _subsets(k)
+    columns = _subsets(k, NUM_CARDS - k)
+    cards = np.arange(NUM_CARDS)
+    followers = np.concatenate([np.setdiff1d(cards, hand)[columns] for hand in hands])
+    leaders = np.repeat(hands, len(columns), axis=0)
+    return _position_indices(leaders, followers).reshape(len(hands), len(columns))
+
+
+def _relabel(briscola_suit):
+    # card -> card with the briscola suit and suit 0 swapped
+    relabel = []
+    for card in range(NUM_CARDS):
+        suit = CARD_SUIT[card]
+        if suit == briscola_suit:
+            suit = 0
+        elif suit == 0:
+            suit = briscola_suit
+        relabel.append(suit * 10 + card % 10)
+    return relabel
+
+
+def build_tablebase(path=DEFAULT_PATH, verbose=False):
+    """Solve every level, from the last trick up, and write the table to path"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    values = np.zeros(TABLE_SIZE, dtype=np.uint8)
+
+    beats = BEATS_TABLE[0]  # beats[lead_suit][a][b]: a takes the trick from b
+    cards = np.arange(NUM_CARDS)
+    for k in LEVELS:
+        n = _FOLLOWERS[k]
+        leaders = _LEADERS[k]
+        # column c of a row: the hand_rank c hand of the cards the leader does not hold
+        columns = _subsets(k, NUM_CARDS - k)
+        level = values[_OFFSETS[k]:_OFFSETS[k] + len(leaders) * n].reshape(len(leaders), n)
+        if k > 1:
+            previous = _level_indices(k - 1)
+
+        for row, leader_hand in enumerate(leaders):
+            followers = np.setdiff1d(cards, leader_hand)[columns]
+            total = POINTS_TABLE[leader_hand].sum() + POINTS_TABLE[followers].sum(axis=1)
+
+            best = np.full(n, -1, dtype=np.int16)
+            for a, lead in enumerate(leader_hand):
+                leader_rest = np.broadcast_to(np.delete(leader_hand, a), (n, k - 1))
+                worst = np.full(n, np.iinfo(np.int16).max, dtype=np.int16)
+                for j in range(k):
+                    follow = followers[:, j]
+                    gain = POINTS_TABLE[lead] + POINTS_TABLE[follow]
+                    follower_wins = beats[SUIT_TABLE[lead], follow, lead]
+
+                    if k == 1:
+                        leader_value = np.where(follower_wins, 0, gain)
+                    else:
+                        follower_rest = np.delete(followers, j, axis=1)
+                        keeps_lead = values[previous[_ranks(leader_rest), _follower_ranks(follower_rest, leader_rest)]]
+                        loses_lead = values[previous[_ranks(follower_rest), _follower_ranks(leader_rest, follower_rest)]]
+                        leader_value = np.where(follower_wins, total - gain - loses_lead.astype(np.int16),
+                                                gain + keeps_lead.astype(np.int16))
+                    worst = np.minimum(worst, leader_value)
+                best = np.maximum(best, worst)
+            level[row] = best
+
+        if verbose:
+            print(f"Level {k}: {level.size} positions")
+
+    np.save(path, values)
+
+
+class Tablebase:
+    """
+    Read-only 2-player endgame tablebase, mapped from a file written by
+    build_tablebase(). Same queries as modules.solver.EndgameSolver
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.values = np.load(path, mmap_mode='r')
+        if self.values.shape != (TABLE_SIZE,):
+            raise ValueError(f"{path} is not a 2-player tablebase")
+
+
+    def leader_value(self, leader_hand, follower_hand):
+        """Points the leader takes with optimal play, cards with the briscola as suit 0"""
+        return int(self.values[position_index(leader_hand, follower_hand)])
+
+
+    def _after_trick(self, lead, follow, leader_rest, follower_rest):
+        # points of the leader of the trick lead / follow, then the rest of the round
+        gain = CARD_POINTS[lead] + CARD_POINTS[follow]
+        follower_wins = BEATS_TABLE[0, CARD_SUIT[lead], follow, lead]
+        if not leader_rest:
+            return 0 if follower_wins else gain
+        if follower_wins:
+            remaining = sum(CARD_POINTS[card] for card in leader_rest + follower_rest)
+            return remaining - self.leader_value(follower_rest, leader_rest)
+        return gain + self.leader_value(leader_rest, follower_rest)
+
+
+    def _check(self, state):
+        if state.num_players != 2:
+            raise ValueError("The tablebase covers 2-player games only")
+        if state.deck_remaining() > 0:
+            raise ValueError("The deck is not exhausted, the position is not an endgame")
+        if state.round_over():
+            raise ValueError("The round is over")
+
+
+    def move_values(self, state, seat=None):
+        """Exact value for seat of every card the seat to play can play, by hand index"""
+        self._check(state)
+        relabel = _relabel(state.briscola_suit)
+        leader = state.leader
+        leader_hand = [relabel[card] for card in state.hands[leader]]
+        follower_hand = [relabel[card] for card in state.hands[1 - leader]]
+        if seat is None:
+            seat = state.current_seat()
+
+        # leader values of every card of the seat to play
+        values = []
+        if not state.table:
+            for a, lead in enumerate(leader_hand):
+                leader_rest = leader_hand[:a] + leader_hand[a + 1:]
+                values.append(min(self._after_trick(lead, follow, leader_rest, follower_hand[:j] + follower_hand[j + 1:])
+                                  for j, follow in enumerate(follower_hand)))
+        else:
+            lead = relabel[state.table[0]]
+            for j, follow in enumerate(follower_hand):
+                values.append(self._after_trick(lead, follow, leader_hand, follower_hand[:j] + follower_hand[j + 1:]))
+
+        if seat == leader:
+            return values
+        total = sum(CARD_POINTS[card] for card in state.table + state.hands[0] + state.hands[1])
+        return [total - value for value in values]
+
+
+    def solve(self, state, seat=None):
+        """(index, value) of the best card of the seat to play, value for seat"""
+        if seat is None:
+            seat = state.current_seat()
+        values = self.move_values(state, seat)
+        if seat == state.current_seat():
+            value = max(values)
+        else:
+            value = min(values)
+        return values.index(value), value
+
+
+if __name__ == '__main__':
+    build_tablebase(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH, verbose=True)
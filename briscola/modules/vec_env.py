@@ -0,0 +1,248 @@
+"""
+Vectorized Briscola environment
+Runs thousands of independent games in lockstep as NumPy arrays
+"""
+import numpy as np
+
+from .cards import SUIT_TABLE, POINTS_TABLE, STRENGTH_TABLE, FEATURE_TABLE
+from .cards import ROUNDS_TO_WIN, PESO_TURNO, PESO_PERDITA, BONUS_ROUND, base_deck
+from .seeding import GameSeeder
+
+
+class BriscolaVecEnv:
+    """
+    Batched Briscola engine for self-play:
+    - Every deck, hand, table, score and turn pointer is an integer array
+      with a leading num_envs axis
+    - step() plays one card in every game, for the seat whose turn it is
+    - Completed tricks, rounds and games are resolved for the whole batch
+      at once, finished games are reset in place
+
+    Observations use the DQNv3 'state_v3' encoding, padded:
+    - hand: (num_envs, 3, 3) [suit, value, points] of the cards in hand
+    - context: (num_envs, 15) briscola, table and turn info
+    - seat: (num_envs,) seat that has to play the next card
+
+    Every game started gets the next game_index of the worker and deals
+    the same decks as BriscolaEnv(root_seed, worker_id) at that index
+    """
+
+    def __init__(self, num_envs, num_players=4, root_seed=None, worker_id=0):
+        if num_players < 2 or num_players > 4:
+            raise ValueError("Briscola requires 2-4 players")
+
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.seeder = GameSeeder(root_seed, worker_id)
+
+        self.rounds_to_win = ROUNDS_TO_WIN
+
+        # Reward system parameters
+        self.PESO_TURNO = PESO_TURNO
+        self.PESO_PERDITA = PESO_PERDITA
+        self.BONUS_ROUND = BONUS_ROUND
+
+        self.base_deck = base_deck(num_players).astype(np.int8)
+        self.deck_size = len(self.base_deck)
+        self.turns = self.deck_size // num_players
+
+        N = num_envs
+        P = num_players
+
+        # Deck order: dealt cards, talon, briscola at the bottom
+        self.deck = np.zeros((N, self.deck_size), dtype=np.int8)
+        self.deck_pos = np.zeros(N, dtype=np.int16)
+        self.briscola = np.zeros(N, dtype=np.int8)
+
+        # Cards are kept in the order they were received, -1 is an empty slot
+        self.hands = np.full((N, P, 3), -1, dtype=np.int8)
+        self.hand_count = np.zeros((N, P), dtype=np.int8)
+
+        # Cards on the table in play order, seat of table[i] is (leader + i) % P
+        self.table = np.full((N, 4), -1, dtype=np.int8)
+        self.table_count = np.zeros(N, dtype=np.int8)
+        self.leader = np.zeros(N, dtype=np.int8)
+
+        self.points = np.zeros((N, P), dtype=np.int16)
+        self.wins = np.zeros((N, P), dtype=np.int8)
+        self.round = np.zeros(N, dtype=np.int16)
+        self.turn = np.zeros(N, dtype=np.int16)
+
+        # game played by each env and the stream its decks come from
+        self.game_index = np.zeros(N, dtype=np.int64)
+        self._rngs = [None] * N
+
+        self._envs = np.arange(N)
+        self._seats = np.arange(P)
+
+
+    def _reset_games(self, envs):
+        for env in envs:
+            self.game_index[env] = self.seeder.next_game()
+            self._rngs[env] = self.seeder.deck_rng(self.game_index[env])
+
+        self.wins[envs] = 0
+        self.round[envs] = 0
+        self.leader[envs] = 0
+        self._new_round(envs)
+
+
+    def _new_round(self, envs):
+        n = len(envs)
+        if n == 0:
+            return
+
+        P = self.num_players
+        dealt = 3 * P
+
+        self.round[envs] += 1
+        self.turn[envs] = 0
+        self.points[envs] = 0
+        self.table[envs] = -1
+        self.table_count[envs] = 0
+
+        # the seat after the winner of the last trick leads the round
+        leader = (self.leader[envs] + 1) % P
+        self.leader[envs] = leader
+
+        # batched shuffle, with the keys drawn from each game's own stream
+        keys = np.empty((n, self.deck_size))
+        for row, env in enumerate(envs):
+            keys[row] = self._rngs[env].random(self.deck_size)
+        order = np.argsort(keys, axis=1)
+        shuffled = self.base_deck[order]
+
+        # give 3 cards to each player, one at a time starting from the leader
+        k = np.arange(dealt)
+        seats = (leader[:, None] + k % P) % P
+        hands = np.full((n, P, 3), -1, dtype=np.int8)
+        hands[np.arange(n)[:, None], seats, k // P] = shuffled[:, :dealt]
+        self.hands[envs] = hands
+        self.hand_count[envs] = 3
+
+        # take the briscola card and place it under the deck
+        self.briscola[envs] = shuffled[:, dealt]
+        self.deck[envs] = np.concatenate(
+            [shuffled[:, :dealt], shuffled[:, dealt + 1:], shuffled[:, dealt:dealt + 1]], axis=1)
+        self.deck_pos[envs] = dealt
+
+
+    def _resolve_tricks(self, envs, rewards, dones, winners):
+        P = self.num_players
+        table = self.table[envs, :P]
+        leader = self.leader[envs].astype(np.int64)
+
+        briscola_suit = SUIT_TABLE[self.briscola[envs]]
+        lead_suit = SUIT_TABLE[table[:, 0]]
+        strength = STRENGTH_TABLE[briscola_suit[:, None], lead_suit[:, None], table]
+        winning_pos = strength.argmax(axis=1)
+        winner = (leader + winning_pos) % P
+
+        card_points = POINTS_TABLE[table]
+        trick_points = card_points.sum(axis=1)
+
+        # Same rewards as BriscolaEnv._event_ShowTurnEnd
+        won = winning_pos[:, None] == self._seats
+        reward = np.where(won,
+                          (trick_points[:, None] - card_points) * self.PESO_TURNO,
+                          -card_points * self.PESO_PERDITA)
+        play_seats = (leader[:, None] + self._seats) % P
+        rewards[envs[:, None], play_seats] = reward
+
+        self.points[envs, winner] += trick_points
+        self.table[envs] = -1
+        self.table_count[envs] = 0
+        self.leader[envs] = winner
+        self.turn[envs] += 1
+
+        # everyone draws a card, starting from the trick winner
+        draw = envs[self.deck_pos[envs] < self.deck_size]
+        if len(draw) > 0:
+            draw_seats = (self.leader[draw, None].astype(np.int64) + self._seats) % P
+            cards = self.deck[draw[:, None], self.deck_pos[draw, None] + self._seats]
+            slots = self.hand_count[draw[:, None], draw_seats]
+            self.hands[draw[:, None], draw_seats, slots] = cards
+            self.hand_count[draw[:, None], draw_seats] += 1
+            self.deck_pos[draw] += P
+
+        # Same round bonus as BriscolaEnv._event_RoundEnd
+        ended = envs[self.turn[envs] == self.turns]
+        if len(ended) > 0:
+            # ties go to the first in turn order from the last trick winner
+            order = (self.leader[ended, None].astype(np.int64) + self._seats) % P
+            round_winner = order[np.arange(len(ended)), self.points[ended[:, None], order].argmax(axis=1)]
+            self.wins[ended, round_winner] += 1
+            rewards[ended, round_winner] += self.BONUS_ROUND
+
+            over = self.wins[ended, round_winner] >= self.rounds_to_win
+            finished = ended[over]
+            winners[finished] = round_winner[over]
+            dones[finished] = True
+
+            self._new_round(ended[~over])
+            self._reset_games(finished)
+
+
+    def _observe(self):
+        envs = self._envs
+        seat = (self.leader + self.table_count) % self.num_players
+
+        hand = FEATURE_TABLE[self.hands[envs, seat]]
+
+        context = np.empty((self.num_envs, 15), dtype=np.float32)
+        context[:, 0:3] = FEATURE_TABLE[self.briscola]
+        context[:, 3:12] = FEATURE_TABLE[self.table[:, :3]].reshape(self.num_envs, 9)
+        context[:, 12] = self.hand_count[envs, seat]
+        context[:, 13] = self.turn + 1
+        context[:, 14] = self.table_count
+
+        return {'seat': seat.astype(np.int64), 'hand': hand, 'context': context}
+
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seeder = GameSeeder(seed, self.seeder.worker_id)
+
+        self._reset_games(self._envs)
+        return self._observe()
+
+
+    def step(self, actions):
+        """
+        Play the card at index actions[i] for the current seat of every game
+
+        Returns: (observation, rewards, dones, info)
+        - rewards: (num_envs, num_players) turn rewards and round bonus
+        - dones: (num_envs,) games that ended with this step, already reset
+        - info['game_winner']: (num_envs,) winning seat of ended games, else -1
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        envs = self._envs
+        P = self.num_players
+
+        seat = (self.leader + self.table_count) % P
+        count = self.hand_count[envs, seat]
+        if np.any((actions < 0) | (actions >= count)):
+            raise ValueError("Invalid card index for the current hand")
+
+        # remove the played card, keeping the order of the others (like list.pop)
+        hand = self.hands[envs, seat]
+        card = hand[envs, actions]
+        slots = np.arange(3)
+        source = slots + (slots >= actions[:, None])
+        hand = np.where(source < 3, np.take_along_axis(hand, np.minimum(source, 2), axis=1), -1)
+        self.hands[envs, seat] = hand
+        self.hand_count[envs, seat] = count - 1
+
+        self.table[envs, self.table_count] = card
+        self.table_count += 1
+
+        rewards = np.zeros((self.num_envs, P), dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        winners = np.full(self.num_envs, -1, dtype=np.int64)
+
+        complete = np.flatnonzero(self.table_count == P)
+        if len(complete) > 0:
+            self._resolve_tricks(complete, rewards, dones, winners)
+
+        return self._observe(), rewards, dones, {'game_winner': winners}
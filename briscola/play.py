@@ -5,10 +5,8 @@ Human player vs AI
 import gymnasium as gym
 import os
 from modules import *
-from agents.human import Human
-from agents.random import RandomAI
-from agents.dqn_v1 import DQNAgent as DQNv1
-from agents.dqn_v2 import ImprovedDQNAgent as DQNv2
+from modules.events import BROADCAST_EVENTS
+import agents
 
 # ============================================================
 # CONFIGURATION - CHANGE THESE
@@ -36,31 +34,28 @@ print(f"You are playing as: {playersNameList[0]}")
 print()
 
 # Create agents based on configuration
-agent_list = [Human(playersNameList[0], {})]
+agent_list = [agents.create_agent('Human', playersNameList[0], {})]
 
 # Main opponent
 if OPPONENT_VERSION == 'v1':
-    main_opponent = DQNv1(playersNameList[1], {'print_info': False})
+    opponent_type = 'DQNv1'
     model_path = MODEL_PATH_V1
 elif OPPONENT_VERSION == 'v2':
-    main_opponent = DQNv2(playersNameList[1], {'print_info': False})
+    opponent_type = 'DQNv2'
     model_path = MODEL_PATH_V2
 else:
     raise ValueError(f"Unknown opponent version: {OPPONENT_VERSION}")
+main_opponent = agents.create_agent(opponent_type, playersNameList[1], {'print_info': False})
 
 agent_list.append(main_opponent)
 
 # Other opponents
 if OTHER_OPPONENTS == 'random':
-    agent_list.append(RandomAI(playersNameList[2], {'print_info': False}))
-    agent_list.append(RandomAI(playersNameList[3], {'print_info': False}))
+    agent_list.append(agents.create_agent('Random', playersNameList[2], {'print_info': False}))
+    agent_list.append(agents.create_agent('Random', playersNameList[3], {'print_info': False}))
 elif OTHER_OPPONENTS == 'ai':
-    if OPPONENT_VERSION == 'v1':
-        agent_list.append(DQNv1(playersNameList[2], {'print_info': False}))
-        agent_list.append(DQNv1(playersNameList[3], {'print_info': False}))
-    else:
-        agent_list.append(DQNv2(playersNameList[2], {'print_info': False}))
-        agent_list.append(DQNv2(playersNameList[3], {'print_info': False}))
+    agent_list.append(agents.create_agent(opponent_type, playersNameList[2], {'print_info': False}))
+    agent_list.append(agents.create_agent(opponent_type, playersNameList[3], {'print_info': False}))
 else:
     raise ValueError(f"Unknown opponent type: {OTHER_OPPONENTS}")
 
@@ -93,77 +88,52 @@ else:
     print("DQN Agent will play untrained\n")
 
 env = gym.make('Briscola-v2', playerNames=playersNameList, disable_env_checker=True)
+game = env.unwrapped
+runner = GameRunner(game, agent_list)
 
-observation, _ = env.reset()
-actions = {}
-states = {}
+def show_event(observation, reward):
+    game.render()
+    
+    if reward != None:
+        print('\nPoints earned this turn:')
+        for player_name, points in zip(playersNameList, reward):
+            if points > 0:
+                print(f'  {player_name}: {points} points')
+        print()
+
+for code in BROADCAST_EVENTS:
+    runner.subscribe(code, show_event)
 
 print("Game starting!\n")
 print("When it's your turn, you'll see your hand and can choose a card by entering 1, 2, or 3")
 print("="*60 + "\n")
 
 while True:
-    env.render()
-    
-    now_event = observation['event_name']
+    result = runner.play_game()
     
-    if now_event == 'PlayTurn':
-        playName = observation['data']['playerName']
-        states[playName] = observation['data']['state']
+    game.render()
+    print('\n' + '='*60)
+    print('GAME OVER!')
+    print('='*60)
     
-    IsBroadcast = observation['broadcast']
-    action = None
+    winner = playersNameList[result.winner]
+    print(f'\nWinner: {winner}')
     
-    if IsBroadcast == True:
-        for agent in agent_list:
-            agent.act(observation)
+    if winner == playersNameList[0]:
+        print("🎉 Congratulations! You won! 🎉")
+    elif winner == playersNameList[1]:
+        print(f"The AI beat you this time. Better luck next round!")
     else:
-        playName = observation['data']['playerName']
-        for agent in agent_list:
-            if agent.name == playName:
-                action = agent.act(observation)
-                if action:
-                    actions[action['data']['playerName']] = action['data']['action']['card']
+        print(f"{winner} won the game!")
     
-    observation, reward, done, info = env.step(action)
+    print()
     
-    if reward != None:
-        print('\nPoints earned this turn:')
-        for player_name, points in reward.items():
-            if points > 0:
-                print(f'  {player_name}: {points} points')
-        print()
-    
-    if done:
-        env.render()
-        print('\n' + '='*60)
-        print('GAME OVER!')
-        print('='*60)
-        
-        # Get winner from GameOver observation
-        if observation is not None and observation.get('event_name') == 'GameOver':
-            if 'data' in observation and 'game_winner' in observation['data']:
-                winner = observation['data']['game_winner']
-                print(f'\nWinner: {winner}')
-                
-                if winner == playersNameList[0]:
-                    print("🎉 Congratulations! You won! 🎉")
-                elif winner == playersNameList[1]:
-                    print(f"The AI beat you this time. Better luck next round!")
-                else:
-                    print(f"{winner} won the game!")
-        
-        print()
-        
-        # Ask to play again
-        play_again = input("Play another game? (y/n): ").lower()
-        if play_again == 'y':
-            print("\n" + "="*60)
-            print("Starting new game...")
-            print("="*60 + "\n")
-            observation, _ = env.reset()
-            actions = {}
-            states = {}
-        else:
-            print("\nThanks for playing! 👋\n")
-            break
\ No newline at end of file
+    # Ask to play again
+    play_again = input("Play another game? (y/n): ").lower()
+    if play_again == 'y':
+        print("\n" + "="*60)
+        print("Starting new game...")
+        print("="*60 + "\n")
+    else:
+        print("\nThanks for playing! 👋\n")
+        break
@@ -5,16 +5,16 @@ Simple player-based configuration
 import gymnasium as gym
 import os
 from modules import *
-from agents.random import RandomAI
-from agents.dqn_v1 import DQNAgent as DQNv1
-from agents.dqn_v2 import ImprovedDQNAgent as DQNv2
-from agents.dqn_v3 import DQNv3Agent as DQNv3
+from modules.events import SHOW_TURN_END, ROUND_END
+from modules.solver import EndgameSolver
+from modules.tablebase import Tablebase
+import agents
 
 # ============================================================
 # CONFIGURATION - CHANGE THESE
 # ============================================================
 
-# Configure each player - types: 'DQNv1', 'DQNv2', 'DQNv3', 'Random'
+# Configure each player - types: 'DQNv1', 'DQNv2', 'DQNv3', 'Solver', 'ISMCTS', 'Heuristic', 'Random'
 PLAYERS = [
     {'type': 'DQNv3', 'name': 'DQN v3', 'weights': 'learning/model_output_dqnv3/4_players/agent0_weights_final.weights.h5'},
     {'type': 'DQNv2', 'name': 'DQN v2', 'weights': 'learning/model_output_dqnv2/4_players/agent0_weights_final.weights.h5'},
@@ -25,26 +25,33 @@ PLAYERS = [
 # Number of test games
 NUM_GAMES = 100
 
+# Root of every random stream: game N is replayable from (ROOT_SEED, 0, N)
+ROOT_SEED = 0
+
+# Must match the CARD_COUNTING the DQNv3 models were trained with
+CARD_COUNTING = False
+
+# Compare every card played once the deck is exhausted with the exact
+# endgame solver and report the points each player loses there
+ENDGAME_ORACLE = False
+
+# 2-player games can look the endgame up in the tablebase built by
+# python -m modules.tablebase, for the oracle and the Solver agents
+ENDGAME_TABLEBASE = None  # e.g. 'learning/tablebase_2p.npy'
+
 # Debug mode - run single game with detailed output
 DEBUG_MODE = False  # Set to True to see detailed agent behavior
 
 # ============================================================
 
 def create_agent(player_config, debug=False):
-    """Create agent based on configuration"""
+    """Create agent based on configuration (agent modules load on demand)"""
     agent_type = player_config['type']
-    name = player_config['name']
     
-    if agent_type == 'DQNv1':
-        return DQNv1(name, {'print_info': debug})
-    elif agent_type == 'DQNv2':
-        return DQNv2(name, {'print_info': debug})
-    elif agent_type == 'DQNv3':
-        return DQNv3(name, {'print_info': debug})
-    elif agent_type == 'Random':
-        return RandomAI(name, {'print_info': False})
-    else:
-        raise ValueError(f"Unknown agent type: {agent_type}")
+    # Random agents never print
+    print_info = debug and agent_type != 'Random'
+    return agents.create_agent(agent_type, player_config['name'], {'print_info': print_info, 'card_counting': CARD_COUNTING,
+                                                                       'tablebase': ENDGAME_TABLEBASE})
 
 # Override settings if debug mode
 if DEBUG_MODE:
@@ -84,12 +91,21 @@ for idx, (agent, config) in enumerate(zip(agent_list, PLAYERS)):
                 print(f"✗ Warning: No weights specified for {agent.name}")
             print(f"  {agent.name} will play untrained")
 
-env = gym.make('Briscola-v2', playerNames=player_names, disable_env_checker=True)
+env = gym.make('Briscola-v2', playerNames=player_names, root_seed=ROOT_SEED, card_counting=CARD_COUNTING,
+               disable_env_checker=True)
+game = env.unwrapped
+runner = GameRunner(game, agent_list)
 
-# Statistics
-wins = {name: 0 for name in player_names}
-total_points = {name: 0 for name in player_names}
-total_rewards = {agent.name: [] for agent in agent_list if agent.type == 'learning'}
+# Agents that read the engine state (Solver, ISMCTS) get the game they play
+for agent in agent_list:
+    if getattr(agent, 'needs_env', False) and agent.env is None:
+        agent.env = game
+
+# Statistics, by seat (names are only printed)
+learning_seats = [seat for seat, agent in enumerate(agent_list) if agent.type == 'learning']
+wins = [0] * len(agent_list)
+total_points = [0] * len(agent_list)
+total_rewards = {seat: [] for seat in learning_seats}
 
 print()
 print("="*60)
@@ -102,6 +118,46 @@ for i, (agent, config) in enumerate(zip(agent_list, PLAYERS)):
 print("="*60)
 print()
 
+if ENDGAME_ORACLE:
+    if ENDGAME_TABLEBASE and len(PLAYERS) == 2:
+        oracle = Tablebase(ENDGAME_TABLEBASE)
+    else:
+        oracle = EndgameSolver()
+    endgame_loss = [0] * len(agent_list)
+    endgame_decisions = [0] * len(agent_list)
+    
+    def score_endgame(seat, observation, card):
+        # points given away by the card against optimal play
+        if game.state.deck_remaining() == 0:
+            values = oracle.move_values(game.state, seat)
+            endgame_loss[seat] += max(values) - values[card]
+            endgame_decisions[seat] += 1
+    
+    runner.on_decision(score_endgame)
+
+if DEBUG_MODE:
+    step_count = 0
+    
+    def show_decision(seat, observation, card):
+        global step_count
+        step_count += 1
+        agent = agent_list[seat]
+        print(f"\n--- Step {step_count} ---")
+        print(f"Event: {observation['event_name']}")
+        print(f"Current Player: {observation['data']['playerName']}")
+        print(f"Hand: {observation['data']['hand']}")
+        print(f"Table: {observation['data'].get('table', [])}")
+        print(f"Briscola: {observation['data'].get('briscola', 'N/A')}")
+        if agent.type == 'learning':
+            print(f"{agent.name} chose card index: {card}")
+    
+    def show_rewards(observation, reward):
+        print(f"Rewards: {dict(zip(player_names, reward))}")
+    
+    runner.on_decision(show_decision)
+    runner.subscribe(SHOW_TURN_END, show_rewards)
+    runner.subscribe(ROUND_END, show_rewards)
+
 for game_num in range(NUM_GAMES):
     if not DEBUG_MODE and (game_num + 1) % 10 == 0:
         print(f"Playing game {game_num + 1}/{NUM_GAMES}...")
@@ -111,98 +167,26 @@ for game_num in range(NUM_GAMES):
         print(f"GAME START")
         print(f"{'='*60}")
     
-    observation, _ = env.reset()
-    actions = {}
-    states = {}
-    game_reward = {agent.name: 0 for agent in agent_list if agent.type == 'learning'}
+    result = runner.play_game()
     
-    step_count = 0
+    wins[result.winner] += 1
+    for seat in range(len(agent_list)):
+        total_points[seat] += result.points[seat]
     
-    while True:
-        now_event = observation['event_name']
-        
-        if DEBUG_MODE and now_event == 'PlayTurn':
-            step_count += 1
-            print(f"\n--- Step {step_count} ---")
-            print(f"Event: {now_event}")
-            print(f"Current Player: {observation['data']['playerName']}")
-            print(f"Hand: {observation['data']['hand']}")
-            print(f"Table: {observation['data'].get('table', [])}")
-            print(f"Briscola: {observation['data'].get('briscola', 'N/A')}")
-        
-        if now_event == 'PlayTurn':
-            playName = observation['data']['playerName']
-            # Store appropriate state based on agent type
-            for agent in agent_list:
-                if agent.name == playName:
-                    if agent.__class__.__name__ == 'DQNv3Agent':
-                        states[playName] = observation['data']['state_v3']
-                    else:
-                        states[playName] = observation['data']['state']
-                    break
-        
-        IsBroadcast = observation['broadcast']
-        action = None
-        
-        if IsBroadcast == True:
-            for agent in agent_list:
-                agent.act(observation)
-        else:
-            playName = observation['data']['playerName']
-            for agent in agent_list:
-                if agent.name == playName:
-                    action = agent.act(observation)
-                    if action:
-                        actions[action['data']['playerName']] = action['data']['action']['card']
-                        
-                        if DEBUG_MODE and agent.type == 'learning':
-                            print(f"{agent.name} chose card index: {action['data']['action']['card']}")
-        
-        observation, reward, done, info = env.step(action)
-        
-        if DEBUG_MODE and reward is not None:
-            print(f"Rewards: {reward}")
-        
-        # Track rewards for learning agents
-        if reward is not None:
-            for agent in agent_list:
-                if agent.type == 'learning' and agent.name in reward:
-                    game_reward[agent.name] += reward[agent.name]
-        
-        # Capture game over data
-        if done and observation is not None:
-            if observation.get('event_name') == 'GameOver' and 'data' in observation:
-                if DEBUG_MODE:
-                    print(f"\n{'='*60}")
-                    print("GAME OVER")
-                    print(f"{'='*60}")
-                
-                if 'game_winner' in observation['data']:
-                    winner = observation['data']['game_winner']
-                    wins[winner] += 1
-                    
-                    if DEBUG_MODE:
-                        print(f"Winner: {winner}")
-                
-                if 'players' in observation['data']:
-                    for player_data in observation['data']['players']:
-                        name = player_data['playerName']
-                        points = player_data['playerPoints']
-                        total_points[name] += points
-                        
-                        if DEBUG_MODE:
-                            print(f"{name}: {points} points")
-        
-        if done:
-            break
+    if DEBUG_MODE:
+        print(f"\n{'='*60}")
+        print("GAME OVER")
+        print(f"{'='*60}")
+        print(f"Winner: {player_names[result.winner]}")
+        for seat, name in enumerate(player_names):
+            print(f"{name}: {result.points[seat]} points")
     
     # Record rewards
-    for agent in agent_list:
-        if agent.type == 'learning':
-            total_rewards[agent.name].append(game_reward[agent.name])
+    for seat in learning_seats:
+        total_rewards[seat].append(result.rewards[seat])
             
-            if DEBUG_MODE:
-                print(f"\nTotal reward for {agent.name}: {game_reward[agent.name]}")
+        if DEBUG_MODE:
+            print(f"\nTotal reward for {agent_list[seat].name}: {result.rewards[seat]}")
 
 # Print statistics
 print()
@@ -211,18 +195,22 @@ print("RESULTS")
 print("="*60)
 print(f"Games played: {NUM_GAMES}\n")
 
-for idx, (name, config) in enumerate(zip(player_names, PLAYERS)):
-    win_rate = (wins[name] / NUM_GAMES) * 100
-    avg_points = total_points[name] / NUM_GAMES
+for seat, (name, config) in enumerate(zip(player_names, PLAYERS)):
+    win_rate = (wins[seat] / NUM_GAMES) * 100
+    avg_points = total_points[seat] / NUM_GAMES
     
     print(f"{name} ({config['type']}):")
-    print(f"  Wins: {wins[name]} ({win_rate:.1f}%)")
+    print(f"  Wins: {wins[seat]} ({win_rate:.1f}%)")
     print(f"  Avg Points: {avg_points:.1f}")
     
     # Show average reward for learning agents
-    if name in total_rewards and total_rewards[name]:
-        avg_reward = sum(total_rewards[name]) / len(total_rewards[name])
+    if seat in total_rewards and total_rewards[seat]:
+        avg_reward = sum(total_rewards[seat]) / len(total_rewards[seat])
         print(f"  Avg Reward: {avg_reward:.2f}")
+    
+    if ENDGAME_ORACLE and endgame_decisions[seat]:
+        avg_loss = endgame_loss[seat] / endgame_decisions[seat]
+        print(f"  Endgame: {avg_loss:.2f} points lost per card ({endgame_decisions[seat]} cards)")
     print()
 
 # Performance analysis
@@ -230,15 +218,15 @@ print("="*60)
 print("PERFORMANCE ANALYSIS")
 print("="*60)
 
-learning_agents = [agent for agent in agent_list if agent.type == 'learning']
+learning_agents = [agent_list[seat] for seat in learning_seats]
 
 if learning_agents:
     random_baseline = NUM_GAMES / len(PLAYERS)  # Equal distribution
     
     print(f"Random baseline: {random_baseline:.0f} wins ({100/len(PLAYERS):.1f}%)\n")
     
-    for agent in learning_agents:
-        agent_wins = wins[agent.name]
+    for seat, agent in zip(learning_seats, learning_agents):
+        agent_wins = wins[seat]
         improvement = (agent_wins / random_baseline - 1) * 100
         
         print(f"{agent.name}:")
@@ -256,8 +244,8 @@ if len(learning_agents) == 2:
     print(f"HEAD-TO-HEAD: {learning_agents[0].name} vs {learning_agents[1].name}")
     print("="*60)
     
-    wins_0 = wins[learning_agents[0].name]
-    wins_1 = wins[learning_agents[1].name]
+    wins_0 = wins[learning_seats[0]]
+    wins_1 = wins[learning_seats[1]]
     
     print(f"{learning_agents[0].name}: {wins_0} wins ({wins_0/NUM_GAMES*100:.1f}%)")
     print(f"{learning_agents[1].name}: {wins_1} wins ({wins_1/NUM_GAMES*100:.1f}%)")
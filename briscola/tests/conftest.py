@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tests import the game modules the way the scripts in briscola/ do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
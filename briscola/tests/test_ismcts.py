@@ -0,0 +1,27 @@
+"""Determinizations of ISMCTSAgent only deal the cards the searching seat has not seen"""
+import random
+
+from agents.ismcts import _mask_cards, briscola_holder, determinize, unseen_mask
+from modules.briscola import BriscolaEnv
+
+
+def test_drawn_briscola_stays_with_its_holder():
+    rng = random.Random(3)
+    env = BriscolaEnv([f'Player {seat}' for seat in range(4)], root_seed=5)
+    pinned = 0
+    for _ in range(10):
+        seat, _ = env.start()
+        done = False
+        while not done:
+            state = env.state
+            unseen = _mask_cards(unseen_mask(state, seat))
+            assert state.briscola not in unseen
+            holder = briscola_holder(state, seat)
+            det = determinize(state, seat, unseen, rng)
+            assert [len(hand) for hand in det.hands] == [len(hand) for hand in state.hands]
+            assert sorted(sum(det.hands, []) + det.deck[det.deck_pos:]) == sorted(sum(state.hands, []) + state.deck[state.deck_pos:])
+            if holder is not None:
+                assert state.briscola in det.hands[holder]
+                pinned += 1
+            seat, _, _, done = env.play(rng.randrange(len(state.hands[seat])))
+    assert pinned > 0
@@ -0,0 +1,41 @@
+"""A resumed ReplayBuffer only holds whole transitions"""
+import numpy as np
+import pytest
+
+from agents.replay import PrioritizedReplayBuffer, ReplayBuffer
+
+FIELDS = {'a': ((), np.int64), 'rows': ((2, 1), np.int64)}
+
+
+def _append(buffer, value):
+    buffer.append(a=value, rows=[[value], [value]])
+
+
+def _crash(buffer, value):
+    # 'a' is written, then rows does not fit: the slot mixes two transitions
+    with pytest.raises(ValueError):
+        buffer.append(a=value, rows=[[value]] * 3)
+
+
+@pytest.mark.parametrize('buffer_type', [ReplayBuffer, PrioritizedReplayBuffer])
+@pytest.mark.parametrize('flushed, unflushed, resumed_size', [(3, 2, 3), (10, 1, 8), (10, 7, 2), (25, 40, 0)])
+def test_resume_after_crash(tmp_path, buffer_type, flushed, unflushed, resumed_size):
+    buffer = buffer_type(10, FIELDS, str(tmp_path), reserve_fraction=0.2)
+    for value in range(flushed):
+        _append(buffer, value)
+    buffer.flush({'epsilon': 0.5})
+    for value in range(flushed, flushed + unflushed):
+        _append(buffer, value)
+    _crash(buffer, -1)
+    del buffer
+
+    resumed = buffer_type(10, FIELDS, str(tmp_path))
+    slots = resumed.slots()
+    values, rows = resumed.batch(slots, 'a', 'rows')
+    assert len(resumed) == resumed_size
+    assert resumed.state == {'epsilon': 0.5}
+    assert (rows[:, :, 0] == values[:, None]).all()
+    # oldest first, ending with the last flushed transition
+    assert values.tolist() == list(range(flushed - len(resumed), flushed))
+    if resumed_size:
+        assert set(resumed.sample(64, np.random.default_rng(0))) <= set(slots)
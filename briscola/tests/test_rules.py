@@ -0,0 +1,77 @@
+"""Round rules shared by GameState (BriscolaEnv), BriscolaVecEnv and kernel.play_games"""
+import numpy as np
+import pytest
+
+from modules import BriscolaVecEnv
+from modules.briscola import BriscolaEnv
+from modules.kernel import play_games
+from modules.state import GameState
+
+
+@pytest.mark.parametrize('leader, points, winner', [
+    (2, [30, 30, 30, 30], 2),
+    (3, [40, 20, 40, 20], 0),
+    (1, [40, 20, 40, 20], 2),
+    (0, [10, 50, 50, 10], 1),
+])
+def test_tied_round_goes_to_first_in_turn_order_from_last_trick_winner(leader, points, winner):
+    state = GameState(4)
+    state.reset_game()
+    state.leader = leader
+    state.points = list(points)
+    assert state.end_round() == winner
+    assert state.wins[winner] == 1
+
+
+def _replay_env(num_players, root_seed, game_index, actions):
+    """Round winners and tied rounds of a kernel game replayed on BriscolaEnv"""
+    env = BriscolaEnv([f'Player {seat}' for seat in range(num_players)], root_seed=root_seed)
+    env.seeder.game_index = game_index
+    round_winners = []
+    ties = 0
+
+    def round_end(observation, reward):
+        nonlocal ties
+        points = sorted(player['playerPoints'] for player in observation['data']['players'])
+        ties += points[-1] == points[-2]
+        round_winners.append(observation['data']['round_winner_seat'])
+
+    env.subscribe('RoundEnd', round_end)
+    step = [0] * num_players
+    seat, _ = env.start()
+    done = False
+    while not done:
+        card = actions[seat, step[seat]]
+        step[seat] += 1
+        seat, _, _, done = env.play(card)
+    return round_winners, ties, list(env.state.wins)
+
+
+def _replay_vec_env(num_players, root_seed, game_index, actions):
+    env = BriscolaVecEnv(1, num_players, root_seed=root_seed)
+    env.seeder.game_index = game_index
+    obs = env.reset()
+    step = np.zeros(num_players, dtype=np.int64)
+    while True:
+        seat = obs['seat'][0]
+        card = actions[seat, step[seat]]
+        step[seat] += 1
+        wins = env.wins[0].copy()
+        obs, _, dones, info = env.step([card])
+        if dones[0]:
+            wins[info['game_winner'][0]] += 1
+            return list(wins)
+
+
+@pytest.mark.parametrize('num_players', [2, 3, 4])
+def test_engines_break_round_ties_alike(num_players):
+    games = 60
+    batch = play_games(games, ['random'] * num_players, root_seed=11)
+    ties = 0
+    for g in range(games):
+        round_winners, game_ties, wins = _replay_env(num_players, 11, g, batch.actions[g])
+        ties += game_ties
+        assert wins == list(batch.wins[g])
+        assert round_winners[-1] == batch.winners[g]
+        assert _replay_vec_env(num_players, 11, g, batch.actions[g]) == wins
+    assert ties > 0
@@ -0,0 +1,30 @@
+"""Positions of the 2-player tablebase"""
+import random
+
+import numpy as np
+
+from modules.tablebase import _OFFSETS, _FOLLOWERS, _LEADERS, _level_indices, _position_indices, position_index
+
+
+def _deal(rng, k):
+    cards = rng.sample(range(40), 2 * k)
+    return cards[:k], cards[k:]
+
+
+def test_levels_only_hold_disjoint_pairs_of_canonical_leader_hands():
+    for k in (1, 2):
+        rows = (np.unique(_level_indices(k)) - _OFFSETS[k]) // _FOLLOWERS[k]
+        assert np.unique(rows).tolist() == list(range(len(_LEADERS[k])))
+
+
+def test_suit_permutations_share_an_index():
+    rng = random.Random(0)
+    for _ in range(500):
+        k = rng.choice((1, 2, 3))
+        leader, follower = _deal(rng, k)
+        index = position_index(leader, follower)
+
+        suits = [0] + rng.sample((1, 2, 3), 3)
+        permuted = [[suits[card // 10] * 10 + card % 10 for card in hand] for hand in (leader, follower)]
+        assert position_index(*permuted) == index
+        assert _position_indices(np.array([leader]), np.array([follower]))[0] == index
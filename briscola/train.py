@@ -3,12 +3,13 @@ Unified Training Script for Briscola DQN Agents
 Simple player-based configuration
 """
 import gymnasium as gym
+import numpy as np
 import os
+import time
+from contextlib import nullcontext
 from modules import *
-from agents.random import RandomAI
-from agents.dqn_v1 import DQNAgent as DQNv1
-from agents.dqn_v2 import ImprovedDQNAgent as DQNv2
-from agents.dqn_v3 import DQNv3Agent as DQNv3
+from modules.events import SHOW_TURN_END
+import agents
 
 # ============================================================
 # CONFIGURATION - CHANGE THESE
@@ -32,6 +33,49 @@ BATCH_SIZE = 32
 # If True, all DQNv2 agents share one model, all DQNv3 share another
 SHARE_WEIGHTS = False
 
+# Root of every random stream: game N of a run is replayable from
+# (ROOT_SEED, 0, N). None draws a fresh root seed
+ROOT_SEED = None
+
+# Build only the encodings the agents read: 'v3_arrays' when every player
+# is DQNv3 or Random, 'all' otherwise
+OBSERVATION_MODE = 'v3_arrays' if all(p['type'] in ['DQNv3', 'Random'] for p in PLAYERS) else 'all'
+
+# Append the card counting features (modules/counting.py) to the v3
+# context, DQNv3 models trained with it need it in test.py too
+CARD_COUNTING = False
+
+# Sample the DQNv2/v3 replay memory by TD error (sum-tree prioritized
+# replay, agents/replay.py) instead of uniformly
+PRIORITIZED_REPLAY = False
+
+# Keep each learning agent's replay memory, epsilon and training count in
+# memory-mapped files next to its weights (.../4_players/replay_agent<seat>),
+# written every REPLAY_FLUSH_FREQUENCY episodes: the next run resumes them
+PERSIST_REPLAY = False
+REPLAY_FLUSH_FREQUENCY = 10
+
+# Actor/learner mode: NUM_ACTORS processes play the games with NumPy copies
+# of the DQNv3 learners (agents/actors.py) and stream the transitions to
+# this process, which trains once per game received and sends fresh
+# weights every WEIGHT_PUSH_FREQUENCY episodes. 0 plays and trains in turn
+NUM_ACTORS = 0
+WEIGHT_PUSH_FREQUENCY = 10
+
+# Exploration of the actors: None follows the learners' epsilon, 'apex'
+# fixes actor i's epsilon on a ladder from 0.4 down to 0.4^8, or a list
+# with one epsilon per actor
+ACTOR_EPSILONS = None
+
+# Pipelined mode: a background thread (agents/learner.py) stores the
+# transitions and trains while the games go on, UPDATES_PER_STEP
+# minibatches per transition of a learning agent, and the games act with
+# a copy of the networks swapped every ACTING_SYNC_FREQUENCY updates.
+# False trains every learning agent once after each episode
+LEARNER_THREAD = False
+UPDATES_PER_STEP = 0.02
+ACTING_SYNC_FREQUENCY = 20
+
 # Higher exploration for more diverse experiences
 EPSILON_OVERRIDE = None  # Set to 0.3 for 30% exploration, None to use default
 
@@ -46,21 +90,34 @@ RESUME_MODE = None  # 'auto', None, or dict with paths
 
 # ============================================================
 
-def create_agent(player_config):
-    """Create agent based on configuration"""
-    agent_type = player_config['type']
-    name = player_config['name']
-    
-    if agent_type == 'DQNv1':
-        return DQNv1(name, {'print_info': False})
-    elif agent_type == 'DQNv2':
-        return DQNv2(name, {'print_info': False})
-    elif agent_type == 'DQNv3':
-        return DQNv3(name, {'print_info': False})
-    elif agent_type == 'Random':
-        return RandomAI(name, {'print_info': False})
-    else:
-        raise ValueError(f"Unknown agent type: {agent_type}")
+def create_agent(player_config, seat=None):
+    """Create agent based on configuration (agent modules load on demand)"""
+    params = {'print_info': False, 'card_counting': CARD_COUNTING, 'prioritized_replay': PRIORITIZED_REPLAY}
+    if PERSIST_REPLAY and seat is not None:
+        params['replay_dir'] = f"learning/model_output_{player_config['type'].lower()}/4_players/replay_agent{seat}"
+    return agents.create_agent(player_config['type'], player_config['name'], params)
+
+def flush_replays():
+    """Write the persisted replay memories (shadow agents use their main agent's)"""
+    for agent in agent_list:
+        if agent.type == 'learning' and not getattr(agent, '_is_shadow', False):
+            agent.flush_replay()
+
+def resume_learner(agent):
+    """
+    With resumed weights, also resume the epsilon and training count saved
+    with a persisted replay memory, in every agent sharing that memory
+    """
+    if PERSIST_REPLAY:
+        for other in agent_list:
+            if getattr(other, 'memory', None) is agent.memory:
+                other.resume_learner()
+
+def keep_state(state):
+    """Copy a state_v3 that lives in the env's reused buffers"""
+    if isinstance(state, dict) and isinstance(state['hand'], np.ndarray):
+        return {'hand': state['hand'].copy(), 'context': state['context'].copy()}
+    return state
 
 def get_output_dir(players, share_weights=False):
     """Generate output directory name based on player configuration"""
@@ -113,13 +170,13 @@ if SHARE_WEIGHTS:
     agent_list = []
     shared_agents = {}  # Track first agent of each type
     
-    for p in PLAYERS:
+    for seat, p in enumerate(PLAYERS):
         agent_type = p['type']
         
         if agent_type in ['DQNv1', 'DQNv2', 'DQNv3']:
             if agent_type not in shared_agents:
                 # First agent of this type - create normally
-                agent = create_agent(p)
+                agent = create_agent(p, seat)
                 shared_agents[agent_type] = agent
                 agent_list.append(agent)
             else:
@@ -127,10 +184,12 @@ if SHARE_WEIGHTS:
                 main_agent = shared_agents[agent_type]
                 agent = create_agent(p)
                 
-                # Share model, target_model, memory
+                # Share model, target_model, memory (its own networks are never built)
                 agent.model = main_agent.model
                 agent.target_model = main_agent.target_model
                 agent.memory = main_agent.memory
+                if hasattr(main_agent, 'target_cache'):
+                    agent.target_cache = main_agent.target_cache
                 
                 # Mark as shadow agent
                 agent._is_shadow = True
@@ -150,7 +209,7 @@ if SHARE_WEIGHTS:
     print("="*60 + "\n")
 else:
     # Normal mode - separate weights
-    agent_list = [create_agent(p) for p in PLAYERS]
+    agent_list = [create_agent(p, seat) for seat, p in enumerate(PLAYERS)]
 
 # Determine output directory (only used when not sharing weights)
 if SHARE_WEIGHTS:
@@ -189,6 +248,7 @@ if RESUME_MODE is not None:
                         agent.load(weight_path)
                     else:
                         agent.model.load_weights(weight_path)
+                    resume_learner(agent)
                     print(f"  Epsilon: {agent.epsilon:.3f}")
                     
                     # Override epsilon if specified
@@ -221,6 +281,7 @@ if RESUME_MODE is not None:
                         agent.load(weight_path)
                     else:
                         agent.model.load_weights(weight_path)
+                    resume_learner(agent)
                     print(f"  Epsilon: {agent.epsilon:.3f}")
                     
                     # Override epsilon if specified
@@ -242,11 +303,18 @@ if EPSILON_OVERRIDE is not None:
                 agent._main_agent.epsilon = EPSILON_OVERRIDE
     print()
 
-env = gym.make('Briscola-v2', playerNames=player_names, disable_env_checker=True)
+env = gym.make('Briscola-v2', playerNames=player_names, observation_mode=OBSERVATION_MODE,
+               root_seed=ROOT_SEED, card_counting=CARD_COUNTING, disable_env_checker=True)
+game = env.unwrapped
+runner = GameRunner(game, agent_list)
+
+# Resolved once: seats of the learning agents and the encoding each one reads
+learning_seats = [seat for seat, agent in enumerate(agent_list) if agent.type == 'learning']
+state_keys = [getattr(agent, 'state_key', None) for agent in agent_list]
 
-# Statistics tracking
-episode_rewards = {agent.name: [] for agent in agent_list if agent.type == 'learning'}
-episode_wins = {agent.name: [] for agent in agent_list if agent.type == 'learning'}
+# Statistics tracking, by seat
+episode_rewards = {seat: [] for seat in learning_seats}
+episode_wins = {seat: [] for seat in learning_seats}
 
 print("="*60)
 print("TRAINING BRISCOLA AGENTS")
@@ -254,6 +322,7 @@ print("="*60)
 print(f"Episodes: {NUM_EPISODES}")
 print(f"Batch size: {BATCH_SIZE}")
 print(f"Save frequency: every {SAVE_FREQUENCY} episodes")
+print(f"Root seed: {game.seeder.root_seed}")
 
 # Show output directories for each agent type
 print("Output directories:")
@@ -265,110 +334,155 @@ print()
 print("Players:")
 for i, (agent, config) in enumerate(zip(agent_list, PLAYERS)):
     print(f"  {i+1}. {agent.name}: {config['type']}")
+    if hasattr(agent, 'memory') and not getattr(agent, '_is_shadow', False):
+        resumed = f", {len(agent.memory)} resumed" if len(agent.memory) else ""
+        print(f"     Replay memory: {agent.memory.capacity} transitions, {agent.memory.nbytes / 2**20:.1f} MB{resumed}")
 print("="*60)
 print()
 
+def remember_decision(seat, observation, card):
+    """Keep the state and card of the learning agents until their trick ends"""
+    if seat in learning_seats:
+        states[seat] = keep_state(observation['data'][state_keys[seat]])
+        actions[seat] = card
+
+def store_transition(seat, state, action, reward, next_state, done):
+    """Replay memory of the seat's agent, through the learner thread when it runs"""
+    if learner is None:
+        agent_list[seat].remember(state, action, reward, next_state, done)
+    else:
+        learner.store(seat, state, action, reward, next_state, done)
+
+def remember_turn(observation, reward):
+    """ShowTurnEnd listener: store the experiences of the learning agents"""
+    for seat in learning_seats:
+        if states[seat] is not None:
+            store_transition(
+                seat,
+                states[seat],
+                actions[seat],
+                reward[seat],
+                keep_state(observation['data'][state_keys[seat]]),
+                False
+            )
+            episode_reward[seat] += reward[seat]
+
+# The runner plays one env call per card, the only broadcast observation
+# built is ShowTurnEnd for the replay memory
+runner.on_decision(remember_decision)
+runner.subscribe(SHOW_TURN_END, remember_turn)
+
+pool = None
+if NUM_ACTORS > 0:
+    from agents.actors import ActorPool, apex_epsilons
+    from modules.kernel import pack_net
+
+    actor_epsilons = apex_epsilons(NUM_ACTORS) if ACTOR_EPSILONS == 'apex' else ACTOR_EPSILONS
+    pool = ActorPool(NUM_ACTORS, player_names, [p['type'] for p in PLAYERS], learning_seats,
+                     actor_epsilons, root_seed=game.seeder.root_seed, card_counting=CARD_COUNTING)
+    print(f"Actor/learner mode: {NUM_ACTORS} actors, weights pushed every {WEIGHT_PUSH_FREQUENCY} episodes")
+    print()
+
+def push_weights():
+    """Send the learners' current weights and epsilons to the actors"""
+    # read between two updates of the learner thread, never a half-applied one
+    with learner_pause:
+        nets = {seat: pack_net(agent_list[seat].export_weights()) for seat in learning_seats}
+        epsilons = {seat: agent_list[seat].epsilon for seat in learning_seats}
+    pool.push(nets, epsilons)
+
+def play_episode():
+    """Play one game here, or store one received from the actors; returns the winner"""
+    if pool is None:
+        return runner.play_game().winner
+
+    _, winner, batch = pool.recv()
+    for seat, (hands, contexts, cards, rewards, next_hands, next_contexts) in batch.items():
+        for i in range(len(cards)):
+            store_transition(seat, {'hand': hands[i], 'context': contexts[i]}, int(cards[i]), float(rewards[i]),
+                             {'hand': next_hands[i], 'context': next_contexts[i]}, False)
+        episode_reward[seat] += float(rewards.sum())
+    return winner
+
+learner = None
+if LEARNER_THREAD:
+    from agents.learner import LearnerThread
+
+    learner = LearnerThread({seat: agent_list[seat] for seat in learning_seats}, BATCH_SIZE,
+                            UPDATES_PER_STEP, ACTING_SYNC_FREQUENCY)
+    print(f"Learner thread: {UPDATES_PER_STEP} updates per transition, "
+          f"acting networks swapped every {ACTING_SYNC_FREQUENCY} updates")
+    print()
+
+# pauses the learner thread while the models are saved or the replay flushed
+learner_pause = learner.lock if learner is not None else nullcontext()
+
+if pool is not None:
+    push_weights()
+learner_updates = 0
+learner_time = 0.0
+start_time = time.perf_counter()
+
 for i_episode in range(NUM_EPISODES):
-    observation, _ = env.reset()
-    actions = {}
-    states = {}
+    actions = [None] * len(agent_list)
+    states = [None] * len(agent_list)
+    episode_reward = [0] * len(agent_list)
     
-    episode_reward = {agent.name: 0 for agent in agent_list if agent.type == 'learning'}
-    episode_winner = None
+    winner = play_episode()
     
-    while True:
-        now_event = observation['event_name']
-        
-        if now_event == 'PlayTurn':
-            playName = observation['data']['playerName']
-            # Store appropriate state based on agent type
-            for agent in agent_list:
-                if agent.name == playName:
-                    if agent.__class__.__name__ == 'DQNv3Agent':
-                        states[playName] = observation['data']['state_v3']
-                    else:
-                        states[playName] = observation['data']['state']
-                    break
-        
-        IsBroadcast = observation['broadcast']
-        action = None
-        
-        if IsBroadcast == True:
-            for agent in agent_list:
-                agent.act(observation)
-        else:
-            playName = observation['data']['playerName']
-            for agent in agent_list:
-                if agent.name == playName:
-                    action = agent.act(observation)
-                    if action:
-                        actions[action['data']['playerName']] = action['data']['action']['card']
-        
-        observation, reward, done, info = env.step(action)
-        
-        # Store experiences for learning agents
-        if observation is not None and observation['event_name'] == 'ShowTurnEnd':
-            for agent in agent_list:
-                if agent.type == 'learning' and agent.name in states:
-                    # Get appropriate next_state based on agent type
-                    if agent.__class__.__name__ == 'DQNv3Agent':
-                        next_state = observation['data']['state_v3']
-                    else:
-                        next_state = observation['data']['state']
-                    
-                    agent.remember(
-                        states[agent.name],
-                        actions[agent.name],
-                        reward[agent.name],
-                        next_state,
-                        done
-                    )
-                    episode_reward[agent.name] += reward[agent.name]
-        
-        # Capture game winner
-        if done and observation is not None:
-            if observation.get('event_name') == 'GameOver' and 'data' in observation:
-                if 'game_winner' in observation['data']:
-                    episode_winner = observation['data']['game_winner']
-        
-        if done:
-            break
-    
-    # Train all learning agents
-    for agent in agent_list:
-        if agent.type == 'learning':
+    # Train all learning agents (the learner thread trains on its own)
+    if learner is None:
+        train_start = time.perf_counter()
+        for seat in learning_seats:
+            agent = agent_list[seat]
             if len(agent.memory) > BATCH_SIZE:
                 agent.train(BATCH_SIZE)
+                learner_updates += 1
+        learner_time += time.perf_counter() - train_start
+    else:
+        learner_updates, learner_time = learner.updates, learner.busy_time
+    
+    if pool is not None and (i_episode + 1) % WEIGHT_PUSH_FREQUENCY == 0:
+        push_weights()
+    
+    if PERSIST_REPLAY and (i_episode + 1) % REPLAY_FLUSH_FREQUENCY == 0:
+        with learner_pause:
+            flush_replays()
     
     # Track statistics for learning agents
-    for agent in agent_list:
-        if agent.type == 'learning':
-            episode_rewards[agent.name].append(episode_reward[agent.name])
-            episode_wins[agent.name].append(1 if episode_winner == agent.name else 0)
+    for seat in learning_seats:
+        episode_rewards[seat].append(episode_reward[seat])
+        episode_wins[seat].append(1 if winner == seat else 0)
     
     # Print progress
     if (i_episode + 1) % PRINT_FREQUENCY == 0:
         print(f"Episode {i_episode + 1}/{NUM_EPISODES}")
         
-        for agent in agent_list:
-            if agent.type == 'learning':
-                recent_rewards = episode_rewards[agent.name][-PRINT_FREQUENCY:]
-                recent_wins = episode_wins[agent.name][-PRINT_FREQUENCY:]
+        for seat in learning_seats:
+            agent = agent_list[seat]
+            recent_rewards = episode_rewards[seat][-PRINT_FREQUENCY:]
+            recent_wins = episode_wins[seat][-PRINT_FREQUENCY:]
                 
-                avg_reward = sum(recent_rewards) / len(recent_rewards)
-                win_rate = sum(recent_wins) / len(recent_wins) * 100
+            avg_reward = sum(recent_rewards) / len(recent_rewards)
+            win_rate = sum(recent_wins) / len(recent_wins) * 100
                 
-                # Get epsilon from main agent if sharing weights
-                if hasattr(agent, '_main_agent'):
-                    epsilon = agent._main_agent.epsilon
-                else:
-                    epsilon = agent.epsilon
+            # Get epsilon from main agent if sharing weights
+            if hasattr(agent, '_main_agent'):
+                epsilon = agent._main_agent.epsilon
+            else:
+                epsilon = agent.epsilon
                 
-                print(f"  {agent.name}:")
-                print(f"    Avg Reward: {avg_reward:.2f}")
-                print(f"    Win Rate: {win_rate:.1f}%")
-                print(f"    Epsilon: {epsilon:.3f}")
-                print(f"    Memory: {len(agent.memory)}")
+            print(f"  {agent.name}:")
+            print(f"    Avg Reward: {avg_reward:.2f}")
+            print(f"    Win Rate: {win_rate:.1f}%")
+            print(f"    Epsilon: {epsilon:.3f}")
+            print(f"    Memory: {len(agent.memory)}")
+        if pool is not None or learner is not None:
+            elapsed = time.perf_counter() - start_time
+            if pool is not None:
+                games_per_second, transitions_per_second = pool.throughput()
+                print(f"  Actors: {games_per_second:.1f} games/s, {transitions_per_second:.0f} transitions/s")
+            print(f"  Learner: {learner_updates / elapsed:.1f} updates/s, busy {learner_time / elapsed * 100:.0f}%")
         print()
     
     # Save models periodically
@@ -382,16 +496,33 @@ for i_episode in range(NUM_EPISODES):
                 os.makedirs(type_output_dir + '/4_players/', exist_ok=True)
                 
                 save_path = type_output_dir + '/4_players/' + f'agent0_weights_{i_episode+1:04d}.weights.h5'
-                agent.save(save_path)
+                with learner_pause:
+                    agent.save(save_path)
                 print(f"✓ Saved {config['type']}: {save_path}")
                 saved_types.add(config['type'])
         print()
 
+if pool is not None:
+    games_per_second, transitions_per_second = pool.throughput()
+    pool.close()
+    print(f"Actors: {games_per_second:.1f} games/s, {transitions_per_second:.0f} transitions/s")
+    print()
+
+if learner is not None:
+    learner.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Learner: {learner.updates} updates ({learner.updates / elapsed:.1f}/s), "
+          f"busy {learner.busy_time / elapsed * 100:.0f}%")
+    print()
+
 # Save final models
 print("="*60)
 print("SAVING FINAL MODELS")
 print("="*60)
 
+if PERSIST_REPLAY:
+    flush_replays()
+
 # Always save each agent type to its own folder
 saved_types = set()
 for idx, (agent, config) in enumerate(zip(agent_list, PLAYERS)):
@@ -414,21 +545,21 @@ print()
 
 # Print overall statistics
 print("OVERALL STATISTICS:")
-for agent in agent_list:
-    if agent.type == 'learning':
-        overall_avg_reward = sum(episode_rewards[agent.name]) / len(episode_rewards[agent.name])
-        overall_win_rate = sum(episode_wins[agent.name]) / len(episode_wins[agent.name]) * 100
+for seat in learning_seats:
+    agent = agent_list[seat]
+    overall_avg_reward = sum(episode_rewards[seat]) / len(episode_rewards[seat])
+    overall_win_rate = sum(episode_wins[seat]) / len(episode_wins[seat]) * 100
         
-        # Get epsilon from main agent if sharing weights
-        if hasattr(agent, '_main_agent'):
-            final_epsilon = agent._main_agent.epsilon
-        else:
-            final_epsilon = agent.epsilon
+    # Get epsilon from main agent if sharing weights
+    if hasattr(agent, '_main_agent'):
+        final_epsilon = agent._main_agent.epsilon
+    else:
+        final_epsilon = agent.epsilon
         
-        print(f"\n{agent.name}:")
-        print(f"  Average Reward: {overall_avg_reward:.2f}")
-        print(f"  Win Rate: {overall_win_rate:.1f}%")
-        print(f"  Final Epsilon: {final_epsilon:.3f}")
+    print(f"\n{agent.name}:")
+    print(f"  Average Reward: {overall_avg_reward:.2f}")
+    print(f"  Win Rate: {overall_win_rate:.1f}%")
+    print(f"  Final Epsilon: {final_epsilon:.3f}")
 
 print("\n" + "="*60)
 print("\nTo test the trained agents, run:")